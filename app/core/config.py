@@ -15,6 +15,25 @@ class Settings(BaseSettings):
     database_url: str = "sqlite:///./app.db"
     openai_api_key: str = ""
     openai_model: str = "gpt-4o-mini"
+    openai_timeout_seconds: float = 30.0
+    openai_connect_timeout_seconds: float = 5.0
+    # Empty uses the SDK default; point at an OpenAI-compatible server (e.g. a local stand-in) otherwise.
+    openai_base_url: str = ""
+    openai_max_connections: int = 20
+    openai_max_retries: int = 3
+    openai_backoff_base_seconds: float = 0.5
+    openai_backoff_max_seconds: float = 8.0
+    llm_circuit_failure_threshold: int = 5
+    llm_circuit_reset_seconds: float = 30.0
+    # Adaptive (AIMD) limit on concurrent provider calls; callers over it queue up to the timeout.
+    llm_concurrency_initial: int = 8
+    llm_concurrency_min: int = 1
+    llm_concurrency_max: int = 32
+    llm_latency_target_seconds: float = 15.0
+    llm_queue_max: int = 100
+    llm_queue_timeout_seconds: float = 10.0
+    # When the queue is saturated: "degrade" serves the statistical report, "reject" returns 503 with Retry-After.
+    llm_overload_policy: Literal["degrade", "reject"] = "degrade"
 
     jwt_secret: str = "change-me"
     jwt_algorithm: str = "HS256"
@@ -28,6 +47,24 @@ class Settings(BaseSettings):
     retention_days: int = 30
     rate_limit_per_minute: int = 60
     ambiguity_windows_top_n: int = 5
+    ambiguity_merge_gap_minutes: int = 120
+    engagement_max_points: int = 200
+    bootstrap_resamples: int = 1000
+    # Batch analytics process-pool size; 0 uses one worker per CPU core.
+    analysis_workers: int = 0
+    # LLM evidence not found verbatim in the messages sent to the model: "drop" or "flag".
+    evidence_verification_mode: Literal["drop", "flag"] = "drop"
+    llm_cache_enabled: bool = True
+    llm_cache_ttl_seconds: int = 7 * 86400
+    llm_cache_max_entries: int = 5000
+    # Concurrent chunk-summary calls when compressing older context.
+    summary_concurrency: int = 4
+    # Estimated prompt-token budget for the analysis request; per-model overrides as a JSON object.
+    llm_context_budget_tokens: int = 6000
+    llm_model_context_budgets: dict[str, int] = {}
+    # Cross-process analysis lease: renewed every third of its lifetime while the holder runs.
+    analysis_lease_seconds: float = 120.0
+    analysis_lease_poll_seconds: float = 0.5
     auto_create_tables: bool = True
 
 
@@ -5,7 +5,7 @@ from sqlalchemy import engine_from_config, pool
 
 from app.core.config import get_settings
 from app.db.base import Base
-from app.models import excerpt, job, message, participant, report, upload, user  # noqa: F401
+from app.models import analysis_checkpoint, analysis_lease, conversation_session, daily_rollup, excerpt, job, llm_cache_entry, message, participant, report, upload, user  # noqa: F401
 
 config = context.config
 settings = get_settings()
@@ -0,0 +1,33 @@
+"""Conversation session index."""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002_conversation_sessions"
+down_revision = "0001_initial"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "conversation_sessions",
+        sa.Column("id", sa.String(length=36), primary_key=True),
+        sa.Column("upload_id", sa.String(length=36), sa.ForeignKey("uploads.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("seq", sa.Integer(), nullable=False),
+        sa.Column("start_ts", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("end_ts", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("first_message_id", sa.String(length=36), nullable=False),
+        sa.Column("last_message_id", sa.String(length=36), nullable=False),
+        sa.Column("initiator_id", sa.String(length=36), nullable=False),
+        sa.Column("message_count", sa.Integer(), nullable=False),
+        sa.Column("gap_seconds", sa.Float(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_conversation_sessions_upload_id", "conversation_sessions", ["upload_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_table("conversation_sessions")
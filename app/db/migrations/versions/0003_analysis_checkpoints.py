@@ -0,0 +1,30 @@
+"""Incremental analysis checkpoints."""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003_analysis_checkpoints"
+down_revision = "0002_conversation_sessions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "analysis_checkpoints",
+        sa.Column("id", sa.String(length=36), primary_key=True),
+        sa.Column("upload_id", sa.String(length=36), sa.ForeignKey("uploads.id", ondelete="CASCADE"), nullable=False, unique=True),
+        sa.Column("message_count", sa.Integer(), nullable=False),
+        sa.Column("last_message_id", sa.String(length=36), nullable=True),
+        sa.Column("last_ts", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("state_json", sa.JSON(), nullable=False),
+        sa.Column("llm_context_json", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_analysis_checkpoints_upload_id", "analysis_checkpoints", ["upload_id"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_table("analysis_checkpoints")
@@ -0,0 +1,18 @@
+"""Cache the finalized analysis result on the checkpoint."""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004_checkpoint_result_cache"
+down_revision = "0003_analysis_checkpoints"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("analysis_checkpoints", sa.Column("result_json", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("analysis_checkpoints", "result_json")
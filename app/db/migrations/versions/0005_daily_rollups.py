@@ -0,0 +1,34 @@
+"""Per-upload daily rollups maintained at ingest."""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005_daily_rollups"
+down_revision = "0004_checkpoint_result_cache"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "daily_rollups",
+        sa.Column("id", sa.String(length=36), primary_key=True),
+        sa.Column("upload_id", sa.String(length=36), sa.ForeignKey("uploads.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("participant_id", sa.String(length=36), sa.ForeignKey("participants.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("message_count", sa.Integer(), nullable=False),
+        sa.Column("session_starts", sa.Integer(), nullable=False),
+        sa.Column("reply_count", sa.Integer(), nullable=False),
+        sa.Column("reply_minutes_sum", sa.Float(), nullable=False),
+        sa.Column("reply_sketch", sa.JSON(), nullable=False),
+        sa.Column("gap_seconds", sa.Float(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.UniqueConstraint("upload_id", "day", "participant_id", name="uq_daily_rollups_upload_day_participant"),
+    )
+    op.create_index("ix_daily_rollups_upload_id", "daily_rollups", ["upload_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("daily_rollups")
@@ -0,0 +1,26 @@
+"""Highlight metadata on excerpts so report evidence is an indexed lookup."""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006_excerpt_index"
+down_revision = "0005_daily_rollups"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("excerpts", sa.Column("label", sa.String(length=255), nullable=False, server_default=""))
+    op.add_column("excerpts", sa.Column("highlight_type", sa.String(length=32), nullable=False, server_default="mixed_signal"))
+    op.add_column("excerpts", sa.Column("tags", sa.JSON(), nullable=False, server_default="[]"))
+    op.add_column("excerpts", sa.Column("position", sa.Integer(), nullable=False, server_default="0"))
+    op.create_index("ix_excerpts_upload_purpose_position", "excerpts", ["upload_id", "purpose", "position"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_excerpts_upload_purpose_position", table_name="excerpts")
+    op.drop_column("excerpts", "position")
+    op.drop_column("excerpts", "tags")
+    op.drop_column("excerpts", "highlight_type")
+    op.drop_column("excerpts", "label")
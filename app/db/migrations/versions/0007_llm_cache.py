@@ -0,0 +1,35 @@
+"""Persistent cache of LLM analysis responses keyed by payload fingerprint."""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007_llm_cache"
+down_revision = "0006_excerpt_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "llm_cache_entries",
+        sa.Column("id", sa.String(length=36), primary_key=True),
+        sa.Column("key", sa.String(length=64), nullable=False),
+        sa.Column("model", sa.String(length=128), nullable=False),
+        sa.Column("response_json", sa.JSON(), nullable=False),
+        sa.Column("hit_count", sa.Integer(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_used_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_llm_cache_entries_key", "llm_cache_entries", ["key"], unique=True)
+    op.create_index("ix_llm_cache_entries_expires_at", "llm_cache_entries", ["expires_at"])
+    op.create_index("ix_llm_cache_entries_last_used_at", "llm_cache_entries", ["last_used_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_llm_cache_entries_last_used_at", table_name="llm_cache_entries")
+    op.drop_index("ix_llm_cache_entries_expires_at", table_name="llm_cache_entries")
+    op.drop_index("ix_llm_cache_entries_key", table_name="llm_cache_entries")
+    op.drop_table("llm_cache_entries")
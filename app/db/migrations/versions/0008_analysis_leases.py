@@ -0,0 +1,32 @@
+"""Per-upload analysis leases for coalescing concurrent analyses across processes."""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008_analysis_leases"
+down_revision = "0007_llm_cache"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "analysis_leases",
+        sa.Column("id", sa.String(length=36), primary_key=True),
+        sa.Column("upload_id", sa.String(length=36), sa.ForeignKey("uploads.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("version", sa.String(length=255), nullable=False),
+        sa.Column("holder", sa.String(length=64), nullable=False),
+        sa.Column("status", sa.String(length=32), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("result_json", sa.JSON(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_analysis_leases_upload_id", "analysis_leases", ["upload_id"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_analysis_leases_upload_id", table_name="analysis_leases")
+    op.drop_table("analysis_leases")
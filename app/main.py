@@ -11,7 +11,12 @@ from app.core.config import get_settings
 from app.core.logging import configure_logging
 from app.db.base import Base
 from app.db.session import engine
-from app.routers import auth, compat, jobs, reports, uploads
+from app.services.analysis.batch import shutdown_analysis_executor
+from app.services.analysis.coalesce import coalesce_metrics
+from app.services.llm.cache import cache_metrics
+from app.services.llm.client import close_openai_client, limiter as llm_limiter
+from app.services.llm.repair import repair_metrics
+from app.routers import analytics, auth, compat, jobs, reports, uploads
 
 
 class RateLimiter:
@@ -57,16 +62,31 @@ def create_app() -> FastAPI:
     app.include_router(jobs.router)
     app.include_router(reports.router)
     app.include_router(compat.router)
+    app.include_router(analytics.router)
 
     @app.on_event("startup")
     def startup() -> None:
         if settings.auto_create_tables:
             Base.metadata.create_all(bind=engine)
 
+    @app.on_event("shutdown")
+    async def shutdown() -> None:
+        shutdown_analysis_executor()
+        await close_openai_client()
+
     @app.get("/health")
-    def health() -> dict:
+    async def health() -> dict:
         return {"status": "ok"}
 
+    @app.get("/metrics")
+    def metrics() -> dict:
+        return {
+            "llm_cache": cache_metrics(),
+            "llm_repair": repair_metrics(),
+            "analysis_coalescing": coalesce_metrics(),
+            "llm_limiter": llm_limiter.snapshot(),
+        }
+
     @app.get("/")
     def root() -> FileResponse:
         return FileResponse(Path("index.html"))
@@ -1,10 +1,15 @@
+from app.models.analysis_checkpoint import AnalysisCheckpoint
+from app.models.analysis_lease import AnalysisLease
+from app.models.conversation_session import ConversationSession
+from app.models.daily_rollup import DailyRollup
 from app.models.excerpt import Excerpt
 from app.models.job import Job
+from app.models.llm_cache_entry import LLMCacheEntry
 from app.models.message import Message
 from app.models.participant import Participant
 from app.models.report import Report
 from app.models.upload import Upload
 from app.models.user import User
 
-__all__ = ["User", "Upload", "Participant", "Message", "Job", "Report", "Excerpt"]
+__all__ = ["User", "Upload", "Participant", "Message", "Job", "Report", "Excerpt", "ConversationSession", "AnalysisCheckpoint", "DailyRollup", "LLMCacheEntry", "AnalysisLease"]
 
@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from sqlalchemy import JSON, DateTime, ForeignKey, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.db.base import Base
+from app.models.common import TimestampMixin, UUIDPrimaryKeyMixin
+
+
+class AnalysisCheckpoint(UUIDPrimaryKeyMixin, TimestampMixin, Base):
+    __tablename__ = "analysis_checkpoints"
+
+    upload_id: Mapped[str] = mapped_column(ForeignKey("uploads.id", ondelete="CASCADE"), nullable=False, unique=True, index=True)
+    message_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    last_message_id: Mapped[str | None] = mapped_column(String(36), nullable=True)
+    last_ts: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    state_json: Mapped[dict] = mapped_column(JSON, default=dict, nullable=False)
+    llm_context_json: Mapped[dict] = mapped_column(JSON, default=dict, nullable=False)
+    result_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+
+    upload = relationship("Upload", back_populates="checkpoint")
@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from sqlalchemy import JSON, DateTime, ForeignKey, String, Text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.db.base import Base
+from app.models.common import TimestampMixin, UUIDPrimaryKeyMixin
+
+
+class AnalysisLease(UUIDPrimaryKeyMixin, TimestampMixin, Base):
+    __tablename__ = "analysis_leases"
+
+    upload_id: Mapped[str] = mapped_column(ForeignKey("uploads.id", ondelete="CASCADE"), nullable=False, unique=True, index=True)
+    version: Mapped[str] = mapped_column(String(255), nullable=False)
+    holder: Mapped[str] = mapped_column(String(64), nullable=False)
+    status: Mapped[str] = mapped_column(String(32), nullable=False, default="running")
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    result_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    upload = relationship("Upload", back_populates="lease")
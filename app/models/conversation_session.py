@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.db.base import Base
+from app.models.common import TimestampMixin, UUIDPrimaryKeyMixin
+
+
+class ConversationSession(UUIDPrimaryKeyMixin, TimestampMixin, Base):
+    __tablename__ = "conversation_sessions"
+
+    upload_id: Mapped[str] = mapped_column(ForeignKey("uploads.id", ondelete="CASCADE"), nullable=False, index=True)
+    seq: Mapped[int] = mapped_column(Integer, nullable=False)
+    start_ts: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    end_ts: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    first_message_id: Mapped[str] = mapped_column(String(36), nullable=False)
+    last_message_id: Mapped[str] = mapped_column(String(36), nullable=False)
+    initiator_id: Mapped[str] = mapped_column(String(36), nullable=False)
+    message_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    gap_seconds: Mapped[float] = mapped_column(Float, nullable=False)
+
+    upload = relationship("Upload", back_populates="sessions")
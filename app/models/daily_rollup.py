@@ -0,0 +1,24 @@
+from datetime import date
+
+from sqlalchemy import JSON, Date, Float, ForeignKey, Integer, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.db.base import Base
+from app.models.common import TimestampMixin, UUIDPrimaryKeyMixin
+
+
+class DailyRollup(UUIDPrimaryKeyMixin, TimestampMixin, Base):
+    __tablename__ = "daily_rollups"
+    __table_args__ = (UniqueConstraint("upload_id", "day", "participant_id", name="uq_daily_rollups_upload_day_participant"),)
+
+    upload_id: Mapped[str] = mapped_column(ForeignKey("uploads.id", ondelete="CASCADE"), nullable=False, index=True)
+    day: Mapped[date] = mapped_column(Date, nullable=False)
+    participant_id: Mapped[str] = mapped_column(ForeignKey("participants.id", ondelete="CASCADE"), nullable=False)
+    message_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    session_starts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    reply_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    reply_minutes_sum: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
+    reply_sketch: Mapped[dict] = mapped_column(JSON, default=dict, nullable=False)
+    gap_seconds: Mapped[float] = mapped_column(Float, nullable=False)
+
+    upload = relationship("Upload", back_populates="rollups")
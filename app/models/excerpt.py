@@ -1,4 +1,4 @@
-from sqlalchemy import ForeignKey, String, Text
+from sqlalchemy import JSON, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -7,11 +7,15 @@ from app.models.common import TimestampMixin, UUIDPrimaryKeyMixin
 
 class Excerpt(UUIDPrimaryKeyMixin, TimestampMixin, Base):
     __tablename__ = "excerpts"
+    __table_args__ = (Index("ix_excerpts_upload_purpose_position", "upload_id", "purpose", "position"),)
 
     upload_id: Mapped[str] = mapped_column(ForeignKey("uploads.id", ondelete="CASCADE"), nullable=False, index=True)
     message_id: Mapped[str] = mapped_column(ForeignKey("messages.id", ondelete="CASCADE"), nullable=False, index=True)
     encrypted_excerpt: Mapped[str] = mapped_column(Text, nullable=False)
     purpose: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
+    label: Mapped[str] = mapped_column(String(255), default="", nullable=False)
+    highlight_type: Mapped[str] = mapped_column(String(32), default="mixed_signal", nullable=False)
+    tags: Mapped[list] = mapped_column(JSON, default=list, nullable=False)
+    position: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
 
     upload = relationship("Upload", back_populates="excerpts")
-
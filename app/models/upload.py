@@ -24,4 +24,8 @@ class Upload(UUIDPrimaryKeyMixin, TimestampMixin, Base):
     jobs = relationship("Job", back_populates="upload", cascade="all, delete-orphan")
     report = relationship("Report", back_populates="upload", uselist=False, cascade="all, delete-orphan")
     excerpts = relationship("Excerpt", back_populates="upload", cascade="all, delete-orphan")
+    sessions = relationship("ConversationSession", back_populates="upload", cascade="all, delete-orphan")
+    rollups = relationship("DailyRollup", back_populates="upload", cascade="all, delete-orphan")
+    checkpoint = relationship("AnalysisCheckpoint", back_populates="upload", uselist=False, cascade="all, delete-orphan")
+    lease = relationship("AnalysisLease", back_populates="upload", uselist=False, cascade="all, delete-orphan")
 
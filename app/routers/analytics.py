@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.session import get_db
+from app.models.upload import Upload
+from app.models.user import User
+from app.routers.deps import get_current_user
+from app.schemas.analytics import BatchAnalyticsRequest, BatchAnalyticsResponse
+from app.services.analysis.batch import run_batch_analytics
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+
+@router.post("/batch", response_model=BatchAnalyticsResponse)
+def batch_analytics(
+    payload: BatchAnalyticsRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> BatchAnalyticsResponse:
+    upload_ids = list(dict.fromkeys(payload.upload_ids))
+    owned = set(db.scalars(select(Upload.id).where(Upload.id.in_(upload_ids), Upload.owner_id == current_user.id)).all())
+    if len(owned) != len(upload_ids):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+    return BatchAnalyticsResponse.model_validate(run_batch_analytics(db, upload_ids))
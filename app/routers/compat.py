@@ -1,25 +1,37 @@
+import asyncio
 import json
 import logging
+import math
 import os
 import uuid
+from collections.abc import Callable
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile, status
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, UploadFile, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from app.core.config import get_settings
-from app.core.security import encrypt_text
 from app.db.session import get_db
+from app.models.daily_rollup import DailyRollup
+from app.models.excerpt import Excerpt
 from app.models.job import Job
 from app.models.message import Message
 from app.models.participant import Participant
 from app.models.report import Report
 from app.models.upload import Upload
-from app.services.parsing.chat_parser import parse_chat_file
+from app.services.ingest import store_parsed_messages
+from app.services.parsing.chat_parser import ParseResult, parse_chat_file
+from app.services.parsing.types import ParsedMessage
 from app.services.storage import ensure_upload_dir
-from app.services.analysis.runner import analyze_upload_and_store
+from app.services.analysis.coalesce import coalesced_analysis
+from app.services.analysis.pipeline import run_analysis
+from app.services.analysis.runner import ANALYSIS_MODES, analysis_version, analyze_upload_and_store_async
+from app.services.analysis.statistical import build_statistical_report
+from app.services.llm import LLMOverloadedError
+from app.services.llm.streaming import JSONFieldStream
 from app.services.analysis.highlights import enrich_report_for_ui
 from app.schemas.llm_report import LLMReport
 
@@ -91,7 +103,144 @@ async def compat_upload(
 
 
 @router.post("/uploads/{upload_id}/analyze")
-async def compat_analyze(upload_id: str, request: Request, db: Session = Depends(get_db)) -> dict:
+async def compat_analyze(
+    upload_id: str,
+    request: Request,
+    mode: str = Query("llm", pattern="^(llm|statistical|hybrid)$"),
+    refresh: bool = Query(False),
+    db: Session = Depends(get_db),
+) -> dict:
+    mode = await _requested_mode(request, upload_id, mode)
+    await _require_upload(db, upload_id)
+    headers = dict(request.headers)
+    try:
+        # Double-clicks and retries join the in-flight run instead of re-ingesting and calling the LLM again.
+        return await coalesced_analysis(
+            upload_id,
+            _compat_version(mode, refresh),
+            lambda flight_db: _reparse_and_analyze(flight_db, upload_id, headers, mode, refresh),
+        )
+    except HTTPException:
+        raise
+    except LLMOverloadedError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Analysis capacity is exhausted. Please retry shortly.",
+            headers={"Retry-After": str(math.ceil(exc.retry_after))},
+        ) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    except Exception as exc:  # noqa: BLE001
+        logger.exception("compat_analyze_failed", extra={"upload_id": upload_id})
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Analysis failed. Please retry.") from exc
+
+
+@router.post("/uploads/{upload_id}/analyze/stream")
+async def compat_analyze_stream(
+    upload_id: str,
+    request: Request,
+    mode: str = Query("llm", pattern="^(llm|statistical|hybrid)$"),
+    refresh: bool = Query(False),
+    db: Session = Depends(get_db),
+) -> StreamingResponse:
+    """Server-sent events for `compat_analyze`: `parsed`, `preview` (statistical report), `token` and `partial`
+    while the model streams, then `report` or `error`. Requests joining an in-flight analysis only get `report`."""
+    mode = await _requested_mode(request, upload_id, mode)
+    await _require_upload(db, upload_id)
+    headers = dict(request.headers)
+
+    async def events():
+        queue: asyncio.Queue[tuple[str, dict] | None] = asyncio.Queue()
+
+        def emit(event: str, data: dict) -> None:
+            queue.put_nowait((event, data))
+
+        task = asyncio.create_task(
+            coalesced_analysis(
+                upload_id,
+                _compat_version(mode, refresh),
+                lambda flight_db: _reparse_and_analyze(flight_db, upload_id, headers, mode, refresh, emit),
+            )
+        )
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while (item := await queue.get()) is not None:
+                yield _sse(*item)
+            result = task.result()
+        except HTTPException as exc:
+            # Parse failures carry a dict detail; the event stream reports only its message.
+            detail = exc.detail
+            if isinstance(detail, dict):
+                detail = detail.get("message", "Analysis failed. Please retry.")
+            yield _sse("error", {"detail": detail})
+            return
+        except LLMOverloadedError as exc:
+            yield _sse(
+                "error",
+                {"detail": "Analysis capacity is exhausted. Please retry shortly.", "retry_after": math.ceil(exc.retry_after)},
+            )
+            return
+        except ValueError as exc:
+            yield _sse("error", {"detail": str(exc)})
+            return
+        except Exception:  # noqa: BLE001
+            logger.exception("compat_analyze_failed", extra={"upload_id": upload_id})
+            yield _sse("error", {"detail": "Analysis failed. Please retry."})
+            return
+        finally:
+            # Only stops this stream waiting; the shared analysis run carries on for other callers.
+            if not task.done():
+                task.cancel()
+        yield _sse("report", result)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+async def _require_upload(db: Session, upload_id: str) -> None:
+    if not await asyncio.to_thread(_upload_exists, db, upload_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+
+
+def _upload_exists(db: Session, upload_id: str) -> bool:
+    exists = db.scalar(select(Upload.id).where(Upload.id == upload_id)) is not None
+    # Release the connection before the analysis (or a coalesced one) is awaited.
+    db.commit()
+    return exists
+
+
+def _compat_version(mode: str, refresh: bool) -> str:
+    # The compat response also carries the parse overview, so it never shares a result with /uploads analyses.
+    return f"compat:{analysis_version(mode, refresh)}"
+
+
+async def _reparse_and_analyze(
+    db: Session,
+    upload_id: str,
+    headers: dict,
+    mode: str,
+    refresh: bool,
+    emit: Callable[[str, dict], None] | None = None,
+) -> dict:
+    # Re-parsing is blocking file and database work; keep it off the event loop.
+    parsed, participant_names = await asyncio.to_thread(_reparse_upload, db, upload_id, headers)
+    overview = _parse_overview(parsed, participant_names)
+    on_delta = None
+    if emit is not None:
+        emit("parsed", {**overview, "counts": {"total_lines": parsed.total_lines, "matched_lines": parsed.matched_lines}})
+        preview = await asyncio.to_thread(_statistical_preview, db, upload_id)
+        emit("preview", _ui_report(preview))
+        fields = JSONFieldStream()
+
+        async def on_delta(text: str) -> None:
+            emit("token", {"text": text})
+            for name, value in fields.feed(text):
+                emit("partial", {"field": name, "value": value})
+
+    report_payload = await analyze_upload_and_store_async(db, upload_id, mode=mode, refresh=refresh, on_delta=on_delta)
+    return {"status": "succeeded", **overview, **_ui_report(report_payload)}
+
+
+async def _requested_mode(request: Request, upload_id: str, mode: str) -> str:
     raw_body = await request.body()
     parsed_body = None
     if raw_body:
@@ -102,6 +251,9 @@ async def compat_analyze(upload_id: str, request: Request, db: Session = Depends
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid JSON body.") from exc
         if not isinstance(parsed_body, dict):
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Request body must be a JSON object.")
+        mode = str(parsed_body.get("mode", mode))
+        if mode not in ANALYSIS_MODES:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unsupported analysis mode: {mode}")
 
     if os.getenv("DEBUG_PARSE") == "1":
         logger.info(
@@ -112,12 +264,42 @@ async def compat_analyze(upload_id: str, request: Request, db: Session = Depends
                 "body": parsed_body if parsed_body is not None else raw_body.decode("utf-8", errors="replace"),
             },
         )
+    return mode
 
+
+def _statistical_preview(db: Session, upload_id: str) -> dict:
+    return build_statistical_report(run_analysis(db, upload_id))
+
+
+def _ui_report(report_payload: dict) -> dict:
+    result = LLMReport.model_validate(_normalize_report_payload(report_payload)).model_dump(mode="json")
+    return enrich_report_for_ui(result, top_n=10)
+
+
+def _parse_overview(parsed: ParseResult, participant_names: list[str]) -> dict:
+    sample_messages = [
+        {
+            "ts": (row.ts.astimezone(timezone.utc).isoformat() if row.ts else None),
+            "sender": row.sender or "Unknown",
+            "text": row.text,
+        }
+        for row in parsed.messages[:3]
+    ]
+    return {"message_count": len(parsed.messages), "participants": participant_names, "sample_messages": sample_messages}
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=True, default=str)}\n\n"
+
+
+def _reparse_upload(db: Session, upload_id: str, headers: dict) -> tuple[ParseResult, list[str]]:
     upload = db.scalar(select(Upload).where(Upload.id == upload_id))
     if not upload:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
 
     # Rebuild parsed message rows from raw upload on each analyze request.
+    db.query(DailyRollup).filter(DailyRollup.upload_id == upload.id).delete()
+    db.query(Excerpt).filter(Excerpt.upload_id == upload.id).delete()
     db.query(Message).filter(Message.upload_id == upload.id).delete()
     db.query(Participant).filter(Participant.upload_id == upload.id).delete()
     db.commit()
@@ -132,7 +314,7 @@ async def compat_analyze(upload_id: str, request: Request, db: Session = Depends
             "compat_analyze_parse_debug",
             extra={
                 "upload_id": upload.id,
-                "headers": dict(request.headers),
+                "headers": headers,
                 "file_path": upload.file_path,
                 "parse_stats": {
                     "total_lines": parsed.total_lines,
@@ -157,31 +339,22 @@ async def compat_analyze(upload_id: str, request: Request, db: Session = Depends
             },
         )
 
-    participants_by_name: dict[str, Participant] = {}
     base_ts = datetime.now(timezone.utc)
-    for idx, row in enumerate(parsed.messages):
-        sender_name = (row.sender or "Unknown").strip() or "Unknown"
-        participant = participants_by_name.get(sender_name)
-        if participant is None:
-            participant = Participant(upload_id=upload.id, display_name=sender_name, normalized_id=sender_name.lower().strip())
-            db.add(participant)
-            db.flush()
-            participants_by_name[sender_name] = participant
-
-        msg_ts = row.ts.astimezone(timezone.utc) if row.ts else (base_ts + timedelta(seconds=idx))
-        db.add(
-            Message(
-                upload_id=upload.id,
-                ts=msg_ts,
-                sender_id=participant.id,
-                encrypted_text=encrypt_text(row.text),
-                metadata_json={"inferred": bool(row.inferred)},
-            )
+    rows = [
+        ParsedMessage(
+            ts=row.ts.astimezone(timezone.utc) if row.ts else (base_ts + timedelta(seconds=idx)),
+            sender=(row.sender or "Unknown").strip() or "Unknown",
+            text=row.text,
+            metadata={"inferred": bool(row.inferred)},
         )
+        for idx, row in enumerate(parsed.messages)
+    ]
+    store_parsed_messages(db, upload, rows)
+    participant_names = sorted({row.sender for row in rows})
     upload.status = "parsed"
     upload.parsing_summary = {
         "message_count": len(parsed.messages),
-        "participant_count": len(participants_by_name),
+        "participant_count": len(participant_names),
         "matched_lines": parsed.matched_lines,
         "inferred_lines": parsed.inferred_lines,
         "total_lines": parsed.total_lines,
@@ -200,31 +373,7 @@ async def compat_analyze(upload_id: str, request: Request, db: Session = Depends
         },
     )
 
-    try:
-        report_payload = analyze_upload_and_store(db, upload.id)
-    except ValueError as exc:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
-    except Exception as exc:  # noqa: BLE001
-        logger.exception("compat_analyze_failed", extra={"upload_id": upload.id})
-        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Analysis failed. Please retry.") from exc
-    report_payload = _normalize_report_payload(report_payload)
-    result = LLMReport.model_validate(report_payload).model_dump(mode="json")
-    result = enrich_report_for_ui(result, top_n=10)
-    sample_messages = [
-        {
-            "ts": (row.ts.astimezone(timezone.utc).isoformat() if row.ts else None),
-            "sender": row.sender or "Unknown",
-            "text": row.text,
-        }
-        for row in parsed.messages[:3]
-    ]
-    return {
-        "status": "succeeded",
-        "message_count": len(parsed.messages),
-        "participants": sorted(participants_by_name.keys()),
-        "sample_messages": sample_messages,
-        **result,
-    }
+    return parsed, participant_names
 
 
 @router.get("/jobs/{job_id}")
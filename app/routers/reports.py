@@ -11,7 +11,9 @@ from app.models.upload import Upload
 from app.models.user import User
 from app.routers.deps import get_current_user
 from app.schemas.llm_report import LLMReport
+from app.services.analysis.excerpts import excerpt_context, excerpt_highlights
 from app.services.analysis.highlights import enrich_report_for_ui
+from app.services.analysis.rollups import rollup_timeline_metrics
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
@@ -45,10 +47,30 @@ def get_highlights(upload_id: str, db: Session = Depends(get_db), current_user:
     report = db.scalar(select(Report).where(Report.upload_id == upload_id))
     if not report:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Report not found")
-    payload = _normalize_report_payload(report.report_json)
-    payload = LLMReport.model_validate(payload).model_dump(mode="json")
-    payload = enrich_report_for_ui(payload, top_n=10)
-    return {"upload_id": upload_id, "highlights": payload.get("highlights", [])}
+    highlights = excerpt_highlights(db, upload_id, stats=(report.report_json or {}).get("stats"), top_n=10)
+    if highlights is None:
+        # Reports stored before excerpts were indexed.
+        payload = _normalize_report_payload(report.report_json)
+        payload = LLMReport.model_validate(payload).model_dump(mode="json")
+        highlights = enrich_report_for_ui(payload, top_n=10).get("highlights", [])
+    return {"upload_id": upload_id, "highlights": highlights}
+
+
+@router.get("/{upload_id}/excerpts/{excerpt_id}/context")
+def get_excerpt_context(
+    upload_id: str,
+    excerpt_id: str,
+    radius: int = Query(3, ge=0, le=20),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> dict:
+    upload = db.scalar(select(Upload).where(Upload.id == upload_id, Upload.owner_id == current_user.id))
+    if not upload:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+    context = excerpt_context(db, upload_id, excerpt_id, radius)
+    if context is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Excerpt not found")
+    return context
 
 
 @router.get("/{upload_id}/download")
@@ -75,5 +97,6 @@ def download_report(
         "confidence": report.confidence,
         "summary_text": report.summary_text,
         "report": payload,
+        "timeline_metrics": rollup_timeline_metrics(db, upload_id) or {},
     }
     return JSONResponse(payload, headers={"Content-Disposition": f"attachment; filename=report-{upload_id}.json"})
@@ -1,20 +1,25 @@
+import asyncio
+import math
 from datetime import datetime, timedelta, timezone
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile, status
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from app.core.config import get_settings
-from app.core.security import encrypt_text
 from app.db.session import get_db
 from app.models.message import Message
-from app.models.participant import Participant
 from app.models.upload import Upload
 from app.models.user import User
 from app.routers.deps import get_current_user
-from app.schemas.upload import UploadCreateResponse, UploadRead
+from app.schemas.upload import UploadAppendResponse, UploadCreateResponse, UploadRead
 from app.schemas.llm_report import LLMReport
-from app.services.analysis.runner import analyze_upload_and_store
+from app.services.analysis.metadata import metadata_timeline_metrics
+from app.services.analysis.rollups import rollup_timeline_metrics
+from app.services.analysis.coalesce import coalesced_analysis
+from app.services.analysis.runner import analysis_version, analyze_upload_and_store_async
+from app.services.llm import LLMOverloadedError
+from app.services.ingest import latest_message_ts, messages_after, store_parsed_messages
 from app.services.parsing import parse_chat_export
 from app.services.storage import delete_file_if_exists, save_upload_file
 
@@ -58,29 +63,7 @@ async def create_upload(
     db.add(upload)
     db.flush()
 
-    participants_by_name: dict[str, Participant] = {}
-    for name in parsed.participants:
-        participant = Participant(upload_id=upload.id, display_name=name, normalized_id=name.lower().strip())
-        db.add(participant)
-        db.flush()
-        participants_by_name[name] = participant
-
-    for row in parsed.messages:
-        sender = participants_by_name.get(row.sender)
-        if sender is None:
-            sender = Participant(upload_id=upload.id, display_name=row.sender, normalized_id=row.sender.lower().strip())
-            db.add(sender)
-            db.flush()
-            participants_by_name[row.sender] = sender
-        db.add(
-            Message(
-                upload_id=upload.id,
-                ts=row.ts.astimezone(timezone.utc),
-                sender_id=sender.id,
-                encrypted_text=encrypt_text(row.text),
-                metadata_json=row.metadata,
-            )
-        )
+    store_parsed_messages(db, upload, parsed.messages, parsed.participants)
     db.commit()
     return UploadCreateResponse(upload_id=upload.id, message_count=len(parsed.messages))
 
@@ -106,6 +89,51 @@ def get_upload(
     return upload
 
 
+@router.get("/{upload_id}/metrics")
+def get_upload_metrics(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> dict:
+    upload = db.scalar(select(Upload).where(Upload.id == upload_id, Upload.owner_id == current_user.id))
+    if not upload:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+    metrics = rollup_timeline_metrics(db, upload.id) or metadata_timeline_metrics(db, upload.id)
+    return {"upload_id": upload.id, "timeline_metrics": metrics}
+
+
+@router.post("/{upload_id}/append", response_model=UploadAppendResponse)
+async def append_upload(
+    upload_id: str,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> UploadAppendResponse:
+    upload = db.scalar(select(Upload).where(Upload.id == upload_id, Upload.owner_id == current_user.id))
+    if not upload:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+
+    saved_path = await save_upload_file(file, upload.platform)
+    try:
+        parsed = parse_chat_export(saved_path, upload.platform, upload.timezone)
+    except ValueError as exc:
+        delete_file_if_exists(saved_path)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+    # Re-exported chats repeat their history; only messages after the stored tail are new.
+    new_messages = messages_after(parsed.messages, latest_message_ts(db, upload.id))
+    appended = store_parsed_messages(db, upload, new_messages, parsed.participants)
+    db.flush()
+    message_count = db.scalar(select(func.count(Message.id)).where(Message.upload_id == upload.id)) or 0
+
+    delete_file_if_exists(upload.file_path)
+    upload.file_path = saved_path
+    upload.parsing_summary = {**(upload.parsing_summary or {}), "message_count": message_count, "appended_count": appended}
+    db.add(upload)
+    db.commit()
+    return UploadAppendResponse(upload_id=upload.id, appended_count=appended, message_count=message_count)
+
+
 @router.delete("/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_upload(
     upload_id: str,
@@ -122,18 +150,36 @@ def delete_upload(
 
 
 @router.post("/{upload_id}/analyze", response_model=LLMReport)
-def analyze_upload(
+async def analyze_upload(
     upload_id: str,
+    mode: str = Query("llm", pattern="^(llm|statistical|hybrid)$"),
+    refresh: bool = Query(False),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> LLMReport:
-    upload = db.scalar(select(Upload).where(Upload.id == upload_id, Upload.owner_id == current_user.id))
-    if not upload:
+    if not await asyncio.to_thread(_owns_upload, db, upload_id, current_user.id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
     try:
-        report_payload = analyze_upload_and_store(db, upload.id)
+        report_payload = await coalesced_analysis(
+            upload_id,
+            analysis_version(mode, refresh),
+            lambda flight_db: analyze_upload_and_store_async(flight_db, upload_id, mode=mode, refresh=refresh),
+        )
+    except LLMOverloadedError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Analysis capacity is exhausted. Please retry shortly.",
+            headers={"Retry-After": str(math.ceil(exc.retry_after))},
+        ) from exc
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
     except Exception as exc:  # noqa: BLE001
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Analysis failed. Please retry.") from exc
     return LLMReport.model_validate(report_payload)
+
+
+def _owns_upload(db: Session, upload_id: str, owner_id: str) -> bool:
+    owned = db.scalar(select(Upload.id).where(Upload.id == upload_id, Upload.owner_id == owner_id)) is not None
+    # Release the connection before the analysis (or a coalesced one) is awaited.
+    db.commit()
+    return owned
@@ -1,7 +1,8 @@
+from app.schemas.analytics import BatchAnalyticsRequest, BatchAnalyticsResponse, UploadAnalytics
 from app.schemas.auth import LoginRequest, TokenResponse, UserCreate, UserRead
 from app.schemas.job import JobRead
 from app.schemas.report import HighlightRead, ReportRead
-from app.schemas.upload import UploadCreateResponse, UploadRead
+from app.schemas.upload import UploadAppendResponse, UploadCreateResponse, UploadRead
 
 __all__ = [
     "UserCreate",
@@ -9,9 +10,13 @@ __all__ = [
     "LoginRequest",
     "TokenResponse",
     "UploadCreateResponse",
+    "UploadAppendResponse",
     "UploadRead",
     "JobRead",
     "ReportRead",
     "HighlightRead",
+    "BatchAnalyticsRequest",
+    "BatchAnalyticsResponse",
+    "UploadAnalytics",
 ]
 
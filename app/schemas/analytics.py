@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+
+
+class BatchAnalyticsRequest(BaseModel):
+    upload_ids: list[str] = Field(min_length=1, max_length=50)
+
+
+class UploadAnalytics(BaseModel):
+    upload_id: str
+    cached: bool
+    error: str | None = None
+    mixed_signal_index: float | None = None
+    confidence: float | None = None
+    detector_scores: dict[str, float] = Field(default_factory=dict)
+
+
+class BatchAnalyticsResponse(BaseModel):
+    uploads: list[UploadAnalytics]
+    comparison: dict
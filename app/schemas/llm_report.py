@@ -8,6 +8,8 @@ class EvidenceItem(BaseModel):
     timestamp: datetime
     excerpt: str
     sender: str
+    message_id: str | None = None
+    verified: bool | None = None
 
 
 class SignalItem(BaseModel):
@@ -22,6 +24,7 @@ class TimelineItem(BaseModel):
     message: str
     tags: list[str] = Field(default_factory=list)
     type: Literal["warm", "cool", "mixed"]
+    message_id: str | None = None
 
 
 class StatsPayload(BaseModel):
@@ -37,6 +40,8 @@ class HighlightItem(BaseModel):
     sender: str
     excerpt: str
     tags: list[str] = Field(default_factory=list)
+    message_id: str | None = None
+    excerpt_id: str | None = None
 
 
 class LLMReport(BaseModel):
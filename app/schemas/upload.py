@@ -8,6 +8,12 @@ class UploadCreateResponse(BaseModel):
     message_count: int
 
 
+class UploadAppendResponse(BaseModel):
+    upload_id: str
+    appended_count: int
+    message_count: int
+
+
 class UploadRead(BaseModel):
     id: str
     status: str
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from threading import Lock
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.analysis_checkpoint import AnalysisCheckpoint
+from app.models.message import Message
+
+logger = logging.getLogger(__name__)
+
+# Lease version for batch runs; it never matches an API analysis, so the two take turns on an upload.
+BATCH_VERSION = "batch:statistical"
+
+_executor: ProcessPoolExecutor | None = None
+_executor_lock = Lock()
+
+
+def get_analysis_executor() -> ProcessPoolExecutor:
+    """Process pool shared by batch requests; one worker per core unless ANALYSIS_WORKERS is set."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = get_settings().analysis_workers or os.cpu_count() or 1
+            # Spawned workers start clean instead of inheriting the server's threads and DB connections.
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+def shutdown_analysis_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def run_batch_analytics(db: Session, upload_ids: list[str]) -> dict:
+    """Statistical analysis for several uploads plus a side-by-side comparison.
+
+    Uploads whose checkpoint already matches the stored messages are served from the cached result;
+    the rest run in the process pool, each worker with its own database session.
+    """
+    results: dict[str, dict] = {}
+    cached: set[str] = set()
+    pending: dict[str, Future] = {}
+    for upload_id in upload_ids:
+        result = _cached_result(db, upload_id)
+        if result is not None:
+            results[upload_id] = result
+            cached.add(upload_id)
+        else:
+            pending[upload_id] = get_analysis_executor().submit(analyze_in_worker, upload_id)
+
+    errors: dict[str, str] = {}
+    for upload_id, future in pending.items():
+        try:
+            results[upload_id] = future.result()
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("batch_analysis_failed", extra={"upload_id": upload_id, "error": type(exc).__name__})
+            errors[upload_id] = "Analysis failed."
+
+    uploads = [
+        {"upload_id": upload_id, "cached": upload_id in cached, "error": errors.get(upload_id), **_summary(results.get(upload_id))}
+        for upload_id in upload_ids
+    ]
+    return {"uploads": uploads, "comparison": _comparison({uid: results[uid] for uid in upload_ids if uid in results})}
+
+
+def analyze_in_worker(upload_id: str) -> dict:
+    """Analyze one upload under its analysis lease, so checkpoint and session rows are never written
+    alongside an API analysis of the same upload in another process."""
+    from app.services.analysis.coalesce import coalesced_analysis
+    from app.services.analysis.pipeline import run_analysis
+
+    async def work(db: Session) -> dict:
+        return await asyncio.to_thread(run_analysis, db, upload_id)
+
+    return asyncio.run(coalesced_analysis(upload_id, BATCH_VERSION, work))
+
+
+def _cached_result(db: Session, upload_id: str) -> dict | None:
+    """The checkpointed result if the upload's messages (its version) are unchanged since it was computed."""
+    checkpoint = db.scalar(select(AnalysisCheckpoint).where(AnalysisCheckpoint.upload_id == upload_id))
+    if checkpoint is None or not checkpoint.result_json or checkpoint.last_ts is None:
+        return None
+    count, latest = db.execute(
+        select(func.count(Message.id), func.max(Message.ts)).where(Message.upload_id == upload_id)
+    ).one()
+    if count != checkpoint.message_count or latest is None:
+        return None
+    if latest.replace(tzinfo=None) != checkpoint.last_ts.replace(tzinfo=None):
+        return None
+    return checkpoint.result_json
+
+
+def _summary(result: dict | None) -> dict:
+    if not result:
+        return {"mixed_signal_index": None, "confidence": None, "detector_scores": {}}
+    return {
+        "mixed_signal_index": result.get("mixed_signal_index"),
+        "confidence": result.get("confidence"),
+        "detector_scores": {d["name"]: d["score"] for d in result.get("detectors", [])},
+    }
+
+
+def _comparison(results: dict[str, dict]) -> dict:
+    detector_scores: dict[str, dict[str, float]] = {}
+    latency: dict[str, dict[str, dict]] = {}
+    initiation: dict[str, dict] = {}
+    for upload_id, result in results.items():
+        for detector in result.get("detectors", []):
+            detector_scores.setdefault(detector["name"], {})[upload_id] = detector["score"]
+        metrics = result.get("timeline_metrics", {})
+        latency[upload_id] = {
+            sender: {key: stats.get(key) for key in ("count", "p50_minutes", "p90_minutes", "p99_minutes")}
+            for sender, stats in metrics.get("response_time_stats", {}).items()
+        }
+        counts = metrics.get("initiation_counts", {})
+        total = sum(counts.values())
+        initiation[upload_id] = {
+            "counts": dict(counts),
+            "top_share": round(max(counts.values()) / total, 3) if total else None,
+        }
+    return {"detector_scores": detector_scores, "reply_latency": latency, "initiation_balance": initiation}
@@ -0,0 +1,92 @@
+import numpy as np
+
+from app.services.analysis.detectors import DETECTOR_CLASSES
+from app.services.analysis.scoring import DETECTOR_WEIGHTS, MIXED_SIGNAL_BASE
+
+# Sessions beyond this are merged into contiguous blocks to bound the resample matrix.
+MAX_BLOCKS = 2000
+CONFIDENCE_LEVEL = 0.95
+BOOTSTRAP_SEED = 0
+
+
+class SessionBlocks:
+    """Per-session deltas of the detector counters, recorded as sessions close.
+
+    The detector scores are functions of additive counters, so a resample of sessions only needs the
+    sum of their deltas; no message is revisited.
+    """
+
+    def __init__(self, state: dict | None = None) -> None:
+        state = state or {}
+        self.sessions: list[dict[str, float]] = [dict(item) for item in state.get("sessions", [])]
+        self.snapshot: dict[str, float] | None = state.get("snapshot")
+
+    def session_started(self, counters: dict[str, float]) -> None:
+        """Call with the detector counters as they were just before the first message of a new session."""
+        if self.snapshot is not None:
+            self.sessions.append(_delta(counters, self.snapshot))
+        self.snapshot = dict(counters)
+
+    def blocks(self, counters: dict[str, float]) -> list[dict[str, float]]:
+        """Closed sessions plus the still-open one, given the current counters."""
+        if self.snapshot is None:
+            return list(self.sessions)
+        return [*self.sessions, _delta(counters, self.snapshot)]
+
+    def to_state(self) -> dict:
+        return {"sessions": [dict(item) for item in self.sessions], "snapshot": self.snapshot}
+
+
+def bootstrap_intervals(
+    blocks: list[dict[str, float]],
+    resamples: int,
+    score_floors: dict[str, float] | None = None,
+) -> dict[str, list[float]]:
+    """Percentile intervals for each detector score and the weighted base score, resampling whole sessions.
+
+    Session counter deltas form an (S x F) matrix; resample weights are drawn as an (R x S) multinomial
+    count matrix, so every resample's counter totals come from one matrix product.
+    `score_floors` holds score components that are not resampled (the warm-cold change-point score).
+    """
+    if len(blocks) < 2 or resamples < 1:
+        return {}
+    columns = sorted({key for block in blocks for key in block})
+    matrix = np.array([[block.get(key, 0.0) for key in columns] for block in blocks], dtype=np.float64)
+    matrix = _merge_blocks(matrix, MAX_BLOCKS)
+
+    rng = np.random.default_rng(BOOTSTRAP_SEED)
+    count = matrix.shape[0]
+    weights = rng.multinomial(count, np.full(count, 1.0 / count), size=resamples).astype(np.float64)
+    totals = weights @ matrix
+
+    floors = score_floors or {}
+    scores: dict[str, np.ndarray] = {}
+    for cls in DETECTOR_CLASSES:
+        prefix = f"{cls.name}."
+        indices = [(idx, key[len(prefix):]) for idx, key in enumerate(columns) if key.startswith(prefix)]
+        values = np.array([cls.score({key: row[idx] for idx, key in indices}) for row in totals])
+        scores[cls.name] = np.maximum(values, floors.get(cls.name, 0.0))
+
+    weight_total = sum(DETECTOR_WEIGHTS.get(name, 1.0) for name in scores)
+    base = sum(DETECTOR_WEIGHTS.get(name, 1.0) * values for name, values in scores.items()) / weight_total
+    tail = (1 - CONFIDENCE_LEVEL) / 2 * 100
+    intervals = {name: _interval(values, tail) for name, values in scores.items()}
+    intervals[MIXED_SIGNAL_BASE] = _interval(base, tail)
+    return intervals
+
+
+def _merge_blocks(matrix: np.ndarray, max_blocks: int) -> np.ndarray:
+    if matrix.shape[0] <= max_blocks:
+        return matrix
+    edges = np.linspace(0, matrix.shape[0], max_blocks + 1).astype(int)
+    return np.add.reduceat(matrix, edges[:-1], axis=0)
+
+
+def _interval(values: np.ndarray, tail: float) -> list[float]:
+    low, high = np.percentile(values, [tail, 100 - tail])
+    return [round(float(low), 3), round(float(high), 3)]
+
+
+def _delta(counters: dict[str, float], snapshot: dict[str, float]) -> dict[str, float]:
+    delta = {key: value - snapshot.get(key, 0.0) for key, value in counters.items()}
+    return {key: value for key, value in delta.items() if value}
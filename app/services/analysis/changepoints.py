@@ -0,0 +1,173 @@
+import heapq
+import math
+from datetime import datetime
+
+from app.services.analysis.types import ChangePoint, SessionIndex
+
+MIN_SEGMENT_SESSIONS = 2
+MIN_SESSIONS_FOR_CHANGE_POINTS = 6
+MAX_CHANGE_POINTS = 20
+# Split gain must beat PENALTY_SCALE * dims * log(n) standardized squared error (a BIC-style penalty).
+PENALTY_SCALE = 2.0
+
+
+class SessionSeries:
+    """Per-session sentiment and engagement series, accumulated one message at a time.
+
+    Each session keeps its sentiment sum, message count and its warmest and coolest message so change
+    points can cite evidence without revisiting messages.
+    """
+
+    def __init__(self, state: dict | None = None) -> None:
+        # Rows: [sentiment_sum, message_count, warmest_id, warmest_value, coolest_id, coolest_value].
+        self.sessions: list[list] = [list(item) for item in (state or {}).get("sessions", [])]
+
+    def update(self, row: dict, session_start: bool) -> None:
+        sentiment = row["sentiment"]
+        if session_start or not self.sessions:
+            self.sessions.append([0.0, 0, row["id"], sentiment, row["id"], sentiment])
+        current = self.sessions[-1]
+        current[0] += sentiment
+        current[1] += 1
+        if sentiment > current[3]:
+            current[2], current[3] = row["id"], sentiment
+        if sentiment < current[5]:
+            current[4], current[5] = row["id"], sentiment
+
+    def change_points(self, sessions: SessionIndex) -> list[ChangePoint]:
+        sentiment = [total / max(count, 1) for total, count, *_ in self.sessions]
+        engagement = [math.log1p(count) for _, count, *_ in self.sessions]
+        boundaries = detect_change_points([sentiment, engagement])
+        if not boundaries:
+            return []
+
+        edges = [0, *boundaries, len(self.sessions)]
+        points: list[ChangePoint] = []
+        for left, boundary, right in zip(edges, edges[1:], edges[2:]):
+            before = self.sessions[left:boundary]
+            after = self.sessions[boundary:right]
+            point = ChangePoint(
+                session_seq=boundary,
+                ts=_session_start(sessions, boundary),
+                sentiment_before=round(_mean_sentiment(before), 4),
+                sentiment_after=round(_mean_sentiment(after), 4),
+                engagement_before=round(sum(item[1] for item in before) / len(before), 2),
+                engagement_after=round(sum(item[1] for item in after) / len(after), 2),
+                evidence_ids=[],
+            )
+            # Cite the extreme message on each side of the boundary in the direction of the shift.
+            if point.direction == "cooler":
+                evidence = [self.sessions[boundary - 1][2], self.sessions[boundary][4]]
+            else:
+                evidence = [self.sessions[boundary - 1][4], self.sessions[boundary][2]]
+            point.evidence_ids = list(dict.fromkeys(evidence))
+            points.append(point)
+        return points
+
+    def to_state(self) -> dict:
+        return {"sessions": [list(item) for item in self.sessions]}
+
+
+def detect_change_points(series: list[list[float]]) -> list[int]:
+    """Binary segmentation for mean shifts in standardized series; returns sorted segment start indices.
+
+    The highest-gain segment is split first using prefix sums, so each level of splitting is linear and
+    the whole search is O(n log n) for balanced splits, with at most MAX_CHANGE_POINTS splits.
+    """
+    n = len(series[0]) if series else 0
+    if n < max(MIN_SESSIONS_FOR_CHANGE_POINTS, 2 * MIN_SEGMENT_SESSIONS):
+        return []
+
+    # Constant series carry no information and are left out of the cost and the penalty.
+    columns = [column for column in (_standardize(values) for values in series) if any(column)]
+    if not columns:
+        return []
+    prefix = [_prefix(values) for values in columns]
+    prefix_sq = [_prefix([v * v for v in values]) for values in columns]
+    penalty = PENALTY_SCALE * len(columns) * math.log(n)
+
+    def cost(start: int, end: int) -> float:
+        size = end - start
+        total = 0.0
+        for sums, squares in zip(prefix, prefix_sq):
+            segment_sum = sums[end] - sums[start]
+            total += (squares[end] - squares[start]) - segment_sum * segment_sum / size
+        return total
+
+    def best_split(start: int, end: int) -> tuple[float, int]:
+        whole = cost(start, end)
+        best_gain, best_at = 0.0, -1
+        for at in range(start + MIN_SEGMENT_SESSIONS, end - MIN_SEGMENT_SESSIONS + 1):
+            gain = whole - cost(start, at) - cost(at, end)
+            if gain > best_gain:
+                best_gain, best_at = gain, at
+        return best_gain, best_at
+
+    boundaries: list[int] = []
+    heap: list[tuple[float, int, int, int]] = []
+
+    def push(start: int, end: int) -> None:
+        if end - start >= 2 * MIN_SEGMENT_SESSIONS:
+            gain, at = best_split(start, end)
+            if at >= 0 and gain > penalty:
+                heapq.heappush(heap, (-gain, at, start, end))
+
+    push(0, n)
+    while heap and len(boundaries) < MAX_CHANGE_POINTS:
+        _, at, start, end = heapq.heappop(heap)
+        boundaries.append(at)
+        push(start, at)
+        push(at, end)
+    return sorted(boundaries)
+
+
+def oscillation_score(points: list[ChangePoint]) -> float:
+    """Share of consecutive shifts that reverse direction, damped until there are three shifts."""
+    if len(points) < 2:
+        return 0.0
+    reversals = sum(1 for prev, cur in zip(points, points[1:]) if prev.direction != cur.direction)
+    return min(reversals / (len(points) - 1), 1.0) * min(len(points) / 3, 1.0)
+
+
+def format_change_points(points: list[ChangePoint]) -> list[dict]:
+    return [
+        {
+            "session_seq": point.session_seq,
+            "ts": point.ts.isoformat(),
+            "direction": point.direction,
+            "sentiment_before": point.sentiment_before,
+            "sentiment_after": point.sentiment_after,
+            "messages_per_session_before": point.engagement_before,
+            "messages_per_session_after": point.engagement_after,
+            "evidence_ids": list(point.evidence_ids),
+        }
+        for point in points
+    ]
+
+
+def _standardize(values: list[float]) -> list[float]:
+    # Noise scale from median absolute successive difference, so level shifts do not inflate it.
+    diffs = sorted(abs(b - a) for a, b in zip(values, values[1:]))
+    scale = diffs[len(diffs) // 2] / (0.6745 * math.sqrt(2)) if diffs else 0.0
+    if scale <= 1e-9:
+        mean = sum(values) / len(values)
+        scale = math.sqrt(sum((v - mean) ** 2 for v in values) / len(values))
+    if scale <= 1e-9:
+        return [0.0] * len(values)
+    mean = sum(values) / len(values)
+    return [(v - mean) / scale for v in values]
+
+
+def _prefix(values: list[float]) -> list[float]:
+    sums = [0.0]
+    for value in values:
+        sums.append(sums[-1] + value)
+    return sums
+
+
+def _mean_sentiment(rows: list[list]) -> float:
+    return sum(item[0] / max(item[1], 1) for item in rows) / len(rows)
+
+
+def _session_start(sessions: SessionIndex, seq: int) -> datetime:
+    return sessions.sessions[seq].start_ts
@@ -0,0 +1,245 @@
+import asyncio
+import logging
+import uuid
+from collections.abc import Awaitable, Callable
+from datetime import timedelta, timezone
+from threading import Lock
+
+from fastapi import HTTPException
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.db.session import SessionLocal
+from app.models.analysis_lease import AnalysisLease
+from app.models.common import utcnow
+from app.services.llm.client import LLMOverloadedError
+
+logger = logging.getLogger(__name__)
+
+_metrics = {"leaders": 0, "followers": 0, "remote_followers": 0, "serialized_waits": 0}
+_metrics_lock = Lock()
+
+
+def coalesce_metrics() -> dict:
+    with _metrics_lock:
+        return dict(_metrics)
+
+
+def _count(name: str) -> None:
+    with _metrics_lock:
+        _metrics[name] += 1
+
+
+class SingleFlight:
+    """In-process request coalescing: concurrent callers with the same key share one run of `work`.
+
+    The run is a detached task that every caller, the first included, awaits through a shield, so any
+    caller can disconnect without cancelling the run for the others.
+    """
+
+    def __init__(self) -> None:
+        self._flights: dict[str, asyncio.Task] = {}
+
+    async def run(self, key: str, work: Callable[[], Awaitable[dict]]) -> dict:
+        loop = asyncio.get_running_loop()
+        flight = self._flights.get(key)
+        if flight is not None and flight.get_loop() is loop:
+            _count("followers")
+        else:
+            flight = loop.create_task(work())
+            self._flights[key] = flight
+            flight.add_done_callback(lambda done: self._landed(key, done))
+        return await asyncio.shield(flight)
+
+    def _landed(self, key: str, flight: asyncio.Task) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.cancelled():
+            # Mark retrieved so a run whose callers all left does not log "exception never retrieved".
+            flight.exception()
+
+
+analysis_flights = SingleFlight()
+
+
+async def coalesced_analysis(upload_id: str, version: str, work: Callable[[Session], Awaitable[dict]]) -> dict:
+    """Run `work` once for concurrent requests analyzing the same upload at the same version.
+
+    Callers in this process share one flight, which keeps running if the request that started it goes
+    away, so `work` is given a session owned by the flight rather than using the request's. Across
+    processes a per-upload database lease elects a leader: requests for the same version wait for its
+    stored result, and requests for a different version wait for it to finish, so report writes for an
+    upload never overlap. A lease whose holder stops renewing it expires and is taken over.
+    """
+    return await analysis_flights.run(f"{upload_id}:{version}", lambda: _leased(upload_id, version, work))
+
+
+async def _leased(upload_id: str, version: str, work: Callable[[Session], Awaitable[dict]]) -> dict:
+    settings = get_settings()
+    holder = uuid.uuid4().hex
+    waited = False
+    while True:
+        blocking = await asyncio.to_thread(_acquire_lease, upload_id, version, holder)
+        if blocking is None:
+            break
+        if blocking["version"] == version:
+            _count("remote_followers")
+            outcome = await _wait_for_release(upload_id, blocking["holder"], settings.analysis_lease_poll_seconds)
+            if outcome is not None:
+                return _follow(outcome)
+        else:
+            if not waited:
+                _count("serialized_waits")
+                waited = True
+            await _wait_for_release(upload_id, blocking["holder"], settings.analysis_lease_poll_seconds)
+
+    _count("leaders")
+    heartbeat = asyncio.create_task(_renew_until_cancelled(upload_id, holder, settings.analysis_lease_seconds / 3))
+    try:
+        with SessionLocal() as db:
+            result = await work(db)
+    except HTTPException as exc:
+        # Stored so remote followers raise the same client error instead of a generic failure.
+        rejection = {"status_code": exc.status_code, "detail": exc.detail, "headers": exc.headers}
+        await asyncio.to_thread(_finish_lease, upload_id, holder, "rejected", rejection, None)
+        raise
+    except LLMOverloadedError as exc:
+        # Replayed by remote followers so their callers also answer 503 with a Retry-After.
+        overload = {"message": str(exc), "retry_after": exc.retry_after}
+        await asyncio.to_thread(_finish_lease, upload_id, holder, "overloaded", overload, None)
+        raise
+    except ValueError as exc:
+        await asyncio.to_thread(_finish_lease, upload_id, holder, "invalid", None, str(exc))
+        raise
+    except asyncio.CancelledError:
+        # Not a failure of the analysis: hand the lease back so a waiting process takes over.
+        await asyncio.shield(asyncio.to_thread(_release_lease, upload_id, holder))
+        raise
+    except BaseException as exc:
+        await asyncio.shield(asyncio.to_thread(_finish_lease, upload_id, holder, "failed", None, type(exc).__name__))
+        raise
+    finally:
+        heartbeat.cancel()
+    await asyncio.to_thread(_finish_lease, upload_id, holder, "succeeded", result, None)
+    return result
+
+
+def _follow(outcome: dict) -> dict:
+    if outcome["status"] == "succeeded":
+        return outcome["result_json"]
+    if outcome["status"] == "invalid":
+        raise ValueError(outcome["error"] or "Analysis failed.")
+    if outcome["status"] == "rejected":
+        rejection = outcome["result_json"]
+        raise HTTPException(rejection["status_code"], detail=rejection["detail"], headers=rejection["headers"])
+    if outcome["status"] == "overloaded":
+        overload = outcome["result_json"]
+        raise LLMOverloadedError(overload["message"], retry_after=overload["retry_after"])
+    raise RuntimeError(f"Concurrent analysis failed: {outcome['error']}")
+
+
+async def _wait_for_release(upload_id: str, holder: str, poll_seconds: float) -> dict | None:
+    """Poll until `holder` finishes (its outcome) or loses the lease (None)."""
+    while True:
+        await asyncio.sleep(poll_seconds)
+        lease = await asyncio.to_thread(_lease_snapshot, upload_id)
+        if lease is None or lease["holder"] != holder:
+            return None
+        if lease["status"] != "running":
+            return lease
+        if lease["expired"]:
+            return None
+
+
+def _acquire_lease(upload_id: str, version: str, holder: str) -> dict | None:
+    """Take the upload's lease if it is free, finished or expired; otherwise return the blocking lease."""
+    now = utcnow()
+    values = {
+        "version": version,
+        "holder": holder,
+        "status": "running",
+        "result_json": None,
+        "error": None,
+        "expires_at": now + timedelta(seconds=get_settings().analysis_lease_seconds),
+    }
+    with SessionLocal() as db:
+        # Compare-and-set so two processes taking over the same stale lease cannot both win.
+        taken = db.execute(
+            update(AnalysisLease)
+            .where(
+                AnalysisLease.upload_id == upload_id,
+                or_(AnalysisLease.status != "running", AnalysisLease.expires_at < now),
+            )
+            .values(**values)
+        ).rowcount
+        if taken:
+            db.commit()
+            return None
+        lease = db.scalar(select(AnalysisLease).where(AnalysisLease.upload_id == upload_id))
+        if lease is not None:
+            return {"holder": lease.holder, "version": lease.version}
+        db.add(AnalysisLease(upload_id=upload_id, **values))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            lease = db.scalar(select(AnalysisLease).where(AnalysisLease.upload_id == upload_id))
+            if lease is None:
+                raise ValueError("Upload not found") from None
+            return {"holder": lease.holder, "version": lease.version}
+    return None
+
+
+def _lease_snapshot(upload_id: str) -> dict | None:
+    with SessionLocal() as db:
+        lease = db.scalar(select(AnalysisLease).where(AnalysisLease.upload_id == upload_id))
+        if lease is None:
+            return None
+        expires_at = lease.expires_at
+        if expires_at.tzinfo is None:
+            # SQLite returns naive datetimes; stored values are UTC.
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        return {
+            "holder": lease.holder,
+            "status": lease.status,
+            "result_json": lease.result_json,
+            "error": lease.error,
+            "expired": expires_at < utcnow(),
+        }
+
+
+def _renew_lease(upload_id: str, holder: str) -> None:
+    with SessionLocal() as db:
+        db.execute(
+            update(AnalysisLease)
+            .where(AnalysisLease.upload_id == upload_id, AnalysisLease.holder == holder, AnalysisLease.status == "running")
+            .values(expires_at=utcnow() + timedelta(seconds=get_settings().analysis_lease_seconds))
+        )
+        db.commit()
+
+
+async def _renew_until_cancelled(upload_id: str, holder: str, interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(_renew_lease, upload_id, holder)
+        except Exception:  # noqa: BLE001
+            logger.warning("analysis_lease_renew_failed", extra={"upload_id": upload_id}, exc_info=True)
+
+
+def _finish_lease(upload_id: str, holder: str, status: str, result: dict | None, error: str | None) -> None:
+    with SessionLocal() as db:
+        db.execute(
+            update(AnalysisLease)
+            .where(AnalysisLease.upload_id == upload_id, AnalysisLease.holder == holder)
+            .values(status=status, result_json=result, error=error)
+        )
+        db.commit()
+
+
+def _release_lease(upload_id: str, holder: str) -> None:
+    with SessionLocal() as db:
+        db.execute(delete(AnalysisLease).where(AnalysisLease.upload_id == upload_id, AnalysisLease.holder == holder))
+        db.commit()
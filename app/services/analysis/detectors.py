@@ -1,130 +1,411 @@
-from collections import defaultdict
-
-from app.services.analysis.types import DetectorResult
-
-
-def run_detectors(features: list[dict]) -> list[DetectorResult]:
-    return [
-        initiation_imbalance(features),
-        response_latency_asymmetry(features),
-        warm_cold_cycles(features),
-        boundary_setting_language(features),
-        unresolved_future_talk(features),
-        affection_distance_contradiction(features),
-    ]
-
-
-def initiation_imbalance(features: list[dict]) -> DetectorResult:
-    starts = defaultdict(int)
-    evidence: list[str] = []
-    previous = None
-    for row in sorted(features, key=lambda x: x["ts"]):
-        if previous is None or (row["ts"] - previous["ts"]).total_seconds() > 6 * 3600:
-            starts[row["sender_name"]] += 1
-            evidence.append(row["id"])
-        previous = row
-    if not starts:
-        return DetectorResult("initiation_imbalance", 0.0, "Not enough data.", [])
-    values = sorted(starts.values(), reverse=True)
-    score = (values[0] - values[-1]) / max(values[0], 1)
-    return DetectorResult(
-        "initiation_imbalance",
-        max(0.0, min(score, 1.0)),
-        "One participant initiates far more conversations than the other.",
-        evidence[:10],
-    )
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+from app.services.analysis.changepoints import SessionSeries, oscillation_score
+from app.services.analysis.types import ChangePoint, DetectorResult, SessionIndex
+
+UNRESOLVED_LOOKAHEAD = 24
+CONTRADICTION_LOOKAHEAD = 6
+
+
+def run_detectors(features: list[dict], sessions: SessionIndex | None = None) -> list[DetectorResult]:
+    suite = DetectorSuite()
+    series = SessionSeries()
+    sessions = _sessions_for(features, sessions)
+    for row, session_start in _with_session_starts(features, sessions):
+        suite.update(row, session_start)
+        series.update(row, session_start)
+    return suite.results(series.change_points(sessions))
+
+
+def initiation_imbalance(features: list[dict], sessions: SessionIndex | None = None) -> DetectorResult:
+    return _run(InitiationImbalance(), features, sessions)
 
 
 def response_latency_asymmetry(features: list[dict]) -> DetectorResult:
-    latency = defaultdict(list)
-    evidence: list[str] = []
-    previous = None
-    for row in sorted(features, key=lambda x: x["ts"]):
-        if previous and previous["sender_id"] != row["sender_id"]:
-            minutes = (row["ts"] - previous["ts"]).total_seconds() / 60
-            latency[row["sender_name"]].append(minutes)
-            evidence.extend([previous["id"], row["id"]])
-        previous = row
-    if len(latency) < 2:
-        return DetectorResult("response_latency_asymmetry", 0.0, "Not enough alternating replies.", [])
-    averages = [sum(v) / len(v) for v in latency.values() if v]
-    if len(averages) < 2:
-        return DetectorResult("response_latency_asymmetry", 0.0, "Not enough latency data.", [])
-    score = abs(max(averages) - min(averages)) / max(max(averages), 1.0)
-    return DetectorResult(
-        "response_latency_asymmetry",
-        max(0.0, min(score, 1.0)),
-        "One participant tends to respond much slower than the other.",
-        list(dict.fromkeys(evidence))[:12],
-    )
-
-
-def warm_cold_cycles(features: list[dict]) -> DetectorResult:
-    evidence: list[str] = []
-    flips = 0
-    for idx in range(1, len(features)):
-        prev = features[idx - 1]
-        curr = features[idx]
-        warm_to_cold = prev["affection"] and (curr["avoidance"] or curr["sentiment"] < -0.2)
-        cold_to_warm = prev["avoidance"] and (curr["affection"] or curr["sentiment"] > 0.4)
-        if warm_to_cold or cold_to_warm:
-            flips += 1
-            evidence.extend([prev["id"], curr["id"]])
-    score = min(flips / max(len(features) / 12, 1), 1.0)
-    return DetectorResult(
-        "warm_cold_cycles",
-        score,
-        "Detected alternating affectionate and distant behavior within short windows.",
-        list(dict.fromkeys(evidence))[:12],
-    )
+    return _run(ResponseLatencyAsymmetry(), features)
+
+
+def warm_cold_cycles(features: list[dict], sessions: SessionIndex | None = None) -> DetectorResult:
+    detector = WarmColdCycles()
+    series = SessionSeries()
+    sessions = _sessions_for(features, sessions)
+    for row, session_start in _with_session_starts(features, sessions):
+        detector.update(row, session_start)
+        series.update(row, session_start)
+    return detector.result(series.change_points(sessions))
 
 
 def boundary_setting_language(features: list[dict]) -> DetectorResult:
-    hits = [row["id"] for row in features if row["boundary"]]
-    score = min(len(hits) / max(len(features) / 20, 1), 1.0)
-    return DetectorResult(
-        "boundary_setting_language",
-        score,
-        "Boundary-setting language appears repeatedly in the conversation.",
-        hits[:12],
-    )
+    return _run(BoundarySettingLanguage(), features)
 
 
 def unresolved_future_talk(features: list[dict]) -> DetectorResult:
-    evidence: list[str] = []
-    unresolved = 0
-    for idx, row in enumerate(features):
-        if not row["future_talk"]:
-            continue
-        window = features[idx + 1 : idx + 25]
-        followed_up = any(w["future_talk"] and w["sender_id"] != row["sender_id"] for w in window)
-        if not followed_up:
-            unresolved += 1
-            evidence.append(row["id"])
-    score = min(unresolved / max(len(features) / 30, 1), 1.0)
-    return DetectorResult(
-        "unresolved_future_talk",
-        score,
-        "Plans are suggested but not clearly confirmed later.",
-        evidence[:12],
-    )
+    return _run(UnresolvedFutureTalk(), features)
 
 
 def affection_distance_contradiction(features: list[dict]) -> DetectorResult:
-    contradictions = 0
-    evidence: list[str] = []
-    for idx, row in enumerate(features):
+    return _run(AffectionDistanceContradiction(), features)
+
+
+class DetectorAccumulator(ABC):
+    """Streaming detector: fed one time-ordered feature row at a time, checkpointable as JSON state."""
+
+    name = ""
+    evidence_limit = 12
+
+    def __init__(self, state: dict | None = None) -> None:
+        state = state or {}
+        self.n = int(state.get("n", 0))
+        self.evidence: list[str] = list(state.get("evidence", []))
+
+    def update(self, row: dict, session_start: bool) -> None:
+        self.n += 1
+
+    @abstractmethod
+    def result(self) -> DetectorResult:
+        """Score and explanation over the rows seen so far."""
+
+    def counters(self) -> dict[str, float]:
+        """Additive counters the score is computed from; per-session deltas of these feed the bootstrap."""
+        return {"n": self.n}
+
+    @staticmethod
+    @abstractmethod
+    def score(counters: dict[str, float]) -> float:
+        """Detector score from `counters()`, also applied to bootstrap resamples."""
+
+    def to_state(self) -> dict:
+        return {"n": self.n, "evidence": list(self.evidence)}
+
+    def _add_evidence(self, *message_ids: str) -> None:
+        for mid in message_ids:
+            if len(self.evidence) < self.evidence_limit and mid not in self.evidence:
+                self.evidence.append(mid)
+
+
+class InitiationImbalance(DetectorAccumulator):
+    name = "initiation_imbalance"
+    evidence_limit = 10
+
+    def __init__(self, state: dict | None = None) -> None:
+        super().__init__(state)
+        self.starts: dict[str, int] = dict((state or {}).get("starts", {}))
+
+    def update(self, row: dict, session_start: bool) -> None:
+        super().update(row, session_start)
+        if session_start:
+            self.starts[row["sender_name"]] = self.starts.get(row["sender_name"], 0) + 1
+            self._add_evidence(row["id"])
+
+    def result(self) -> DetectorResult:
+        if not self.starts:
+            return DetectorResult(self.name, 0.0, "Not enough data.", [])
+        return DetectorResult(
+            self.name,
+            self.score(self.counters()),
+            "One participant initiates far more conversations than the other.",
+            list(self.evidence),
+        )
+
+    def counters(self) -> dict[str, float]:
+        return {**super().counters(), **{f"starts:{sender}": count for sender, count in self.starts.items()}}
+
+    @staticmethod
+    def score(counters: dict[str, float]) -> float:
+        values = sorted((v for k, v in counters.items() if k.startswith("starts:")), reverse=True)
+        if not values:
+            return 0.0
+        return max(0.0, min((values[0] - values[-1]) / max(values[0], 1), 1.0))
+
+    def to_state(self) -> dict:
+        return {**super().to_state(), "starts": dict(self.starts)}
+
+
+class ResponseLatencyAsymmetry(DetectorAccumulator):
+    name = "response_latency_asymmetry"
+
+    def __init__(self, state: dict | None = None) -> None:
+        super().__init__(state)
+        state = state or {}
+        self.latency_sum: dict[str, float] = dict(state.get("latency_sum", {}))
+        self.latency_count: dict[str, int] = dict(state.get("latency_count", {}))
+        self.previous = _restore_row(state.get("previous"))
+
+    def update(self, row: dict, session_start: bool) -> None:
+        super().update(row, session_start)
+        previous = self.previous
+        if previous and previous["sender_id"] != row["sender_id"]:
+            minutes = (row["ts"] - previous["ts"]).total_seconds() / 60
+            sender = row["sender_name"]
+            self.latency_sum[sender] = self.latency_sum.get(sender, 0.0) + minutes
+            self.latency_count[sender] = self.latency_count.get(sender, 0) + 1
+            self._add_evidence(previous["id"], row["id"])
+        self.previous = {"id": row["id"], "ts": row["ts"], "sender_id": row["sender_id"]}
+
+    def result(self) -> DetectorResult:
+        if len(self.latency_count) < 2:
+            return DetectorResult(self.name, 0.0, "Not enough alternating replies.", [])
+        return DetectorResult(
+            self.name,
+            self.score(self.counters()),
+            "One participant tends to respond much slower than the other.",
+            list(self.evidence),
+        )
+
+    def counters(self) -> dict[str, float]:
+        return {
+            **super().counters(),
+            **{f"latency_sum:{sender}": total for sender, total in self.latency_sum.items()},
+            **{f"latency_count:{sender}": count for sender, count in self.latency_count.items()},
+        }
+
+    @staticmethod
+    def score(counters: dict[str, float]) -> float:
+        averages = [
+            counters.get(f"latency_sum:{key[len('latency_count:'):]}", 0.0) / count
+            for key, count in counters.items()
+            if key.startswith("latency_count:") and count > 0
+        ]
+        if len(averages) < 2:
+            return 0.0
+        return max(0.0, min(abs(max(averages) - min(averages)) / max(max(averages), 1.0), 1.0))
+
+    def to_state(self) -> dict:
+        return {
+            **super().to_state(),
+            "latency_sum": dict(self.latency_sum),
+            "latency_count": dict(self.latency_count),
+            "previous": _dump_row(self.previous),
+        }
+
+
+class WarmColdCycles(DetectorAccumulator):
+    name = "warm_cold_cycles"
+
+    def __init__(self, state: dict | None = None) -> None:
+        super().__init__(state)
+        state = state or {}
+        self.flips = int(state.get("flips", 0))
+        self.previous: dict | None = state.get("previous")
+
+    def update(self, row: dict, session_start: bool) -> None:
+        super().update(row, session_start)
+        prev = self.previous
+        if prev is not None:
+            warm_to_cold = prev["affection"] and (row["avoidance"] or row["sentiment"] < -0.2)
+            cold_to_warm = prev["avoidance"] and (row["affection"] or row["sentiment"] > 0.4)
+            if warm_to_cold or cold_to_warm:
+                self.flips += 1
+                self._add_evidence(prev["id"], row["id"])
+        self.previous = {"id": row["id"], "affection": row["affection"], "avoidance": row["avoidance"]}
+
+    def result(self, change_points: list[ChangePoint] | None = None) -> DetectorResult:
+        score = self.score(self.counters())
+        explanation = "Detected alternating affectionate and distant behavior within short windows."
+        evidence = list(self.evidence)
+        # Session-level sentiment/engagement shifts that keep reversing are oscillation on a longer scale.
+        segment_score = oscillation_score(change_points or [])
+        if segment_score > score:
+            score = segment_score
+            explanation = "Conversation stretches repeatedly shift between warmer and cooler, less engaged phases."
+        for point in change_points or []:
+            for mid in point.evidence_ids:
+                if len(evidence) < 2 * self.evidence_limit and mid not in evidence:
+                    evidence.append(mid)
+        return DetectorResult(self.name, score, explanation, evidence)
+
+    def counters(self) -> dict[str, float]:
+        return {**super().counters(), "flips": self.flips}
+
+    @staticmethod
+    def score(counters: dict[str, float]) -> float:
+        return max(0.0, min(counters.get("flips", 0) / max(counters.get("n", 0) / 12, 1), 1.0))
+
+    def to_state(self) -> dict:
+        return {**super().to_state(), "flips": self.flips, "previous": self.previous}
+
+
+class BoundarySettingLanguage(DetectorAccumulator):
+    name = "boundary_setting_language"
+
+    def __init__(self, state: dict | None = None) -> None:
+        super().__init__(state)
+        self.hits = int((state or {}).get("hits", 0))
+
+    def update(self, row: dict, session_start: bool) -> None:
+        super().update(row, session_start)
+        if row["boundary"]:
+            self.hits += 1
+            self._add_evidence(row["id"])
+
+    def result(self) -> DetectorResult:
+        return DetectorResult(
+            self.name,
+            self.score(self.counters()),
+            "Boundary-setting language appears repeatedly in the conversation.",
+            list(self.evidence),
+        )
+
+    def counters(self) -> dict[str, float]:
+        return {**super().counters(), "hits": self.hits}
+
+    @staticmethod
+    def score(counters: dict[str, float]) -> float:
+        return max(0.0, min(counters.get("hits", 0) / max(counters.get("n", 0) / 20, 1), 1.0))
+
+    def to_state(self) -> dict:
+        return {**super().to_state(), "hits": self.hits}
+
+
+class UnresolvedFutureTalk(DetectorAccumulator):
+    name = "unresolved_future_talk"
+
+    def __init__(self, state: dict | None = None) -> None:
+        super().__init__(state)
+        state = state or {}
+        self.unresolved = int(state.get("unresolved", 0))
+        # Plans still inside their follow-up window: [position, sender_id, message_id].
+        self.pending: list[list] = [list(item) for item in state.get("pending", [])]
+
+    def update(self, row: dict, session_start: bool) -> None:
+        position = self.n
+        super().update(row, session_start)
+        while self.pending and position - self.pending[0][0] > UNRESOLVED_LOOKAHEAD:
+            _, _, mid = self.pending.pop(0)
+            self.unresolved += 1
+            self._add_evidence(mid)
+        if row["future_talk"]:
+            self.pending = [item for item in self.pending if item[1] == row["sender_id"]]
+            self.pending.append([position, row["sender_id"], row["id"]])
+
+    def result(self) -> DetectorResult:
+        # Plans whose window runs past the end of the chat have not been followed up yet.
+        evidence = list(self.evidence)
+        for _, _, mid in self.pending:
+            if len(evidence) < self.evidence_limit:
+                evidence.append(mid)
+        return DetectorResult(
+            self.name,
+            self.score(self.counters()),
+            "Plans are suggested but not clearly confirmed later.",
+            evidence,
+        )
+
+    def counters(self) -> dict[str, float]:
+        return {**super().counters(), "unresolved": self.unresolved + len(self.pending)}
+
+    @staticmethod
+    def score(counters: dict[str, float]) -> float:
+        return max(0.0, min(counters.get("unresolved", 0) / max(counters.get("n", 0) / 30, 1), 1.0))
+
+    def to_state(self) -> dict:
+        return {**super().to_state(), "unresolved": self.unresolved, "pending": [list(item) for item in self.pending]}
+
+
+class AffectionDistanceContradiction(DetectorAccumulator):
+    name = "affection_distance_contradiction"
+
+    def __init__(self, state: dict | None = None) -> None:
+        super().__init__(state)
+        state = state or {}
+        self.contradictions = int(state.get("contradictions", 0))
+        # Warm messages still waiting for a distant reply: [position, message_id].
+        self.pending: list[list] = [list(item) for item in state.get("pending", [])]
+
+    def update(self, row: dict, session_start: bool) -> None:
+        position = self.n
+        super().update(row, session_start)
+        self.pending = [item for item in self.pending if position - item[0] <= CONTRADICTION_LOOKAHEAD]
+        if self.pending and (row["avoidance"] or row["sentiment"] < -0.2):
+            for _, mid in self.pending:
+                self.contradictions += 1
+                self._add_evidence(mid, row["id"])
+            self.pending = []
         if row["sentiment"] > 0.4 or row["affection"]:
-            for follow in features[idx + 1 : idx + 7]:
-                if follow["avoidance"] or follow["sentiment"] < -0.2:
-                    contradictions += 1
-                    evidence.extend([row["id"], follow["id"]])
-                    break
-    score = min(contradictions / max(len(features) / 20, 1), 1.0)
-    return DetectorResult(
-        "affection_distance_contradiction",
-        score,
-        "Positive wording often appears near avoidant behavior.",
-        list(dict.fromkeys(evidence))[:12],
-    )
+            self.pending.append([position, row["id"]])
+
+    def result(self) -> DetectorResult:
+        return DetectorResult(
+            self.name,
+            self.score(self.counters()),
+            "Positive wording often appears near avoidant behavior.",
+            list(self.evidence),
+        )
+
+    def counters(self) -> dict[str, float]:
+        return {**super().counters(), "contradictions": self.contradictions}
+
+    @staticmethod
+    def score(counters: dict[str, float]) -> float:
+        return max(0.0, min(counters.get("contradictions", 0) / max(counters.get("n", 0) / 20, 1), 1.0))
+
+    def to_state(self) -> dict:
+        return {**super().to_state(), "contradictions": self.contradictions, "pending": [list(item) for item in self.pending]}
+
+
+DETECTOR_CLASSES: tuple[type[DetectorAccumulator], ...] = (
+    InitiationImbalance,
+    ResponseLatencyAsymmetry,
+    WarmColdCycles,
+    BoundarySettingLanguage,
+    UnresolvedFutureTalk,
+    AffectionDistanceContradiction,
+)
+
+
+class DetectorSuite:
+    """All detectors fed together so a conversation is scanned once, and resumable from a checkpoint."""
+
+    def __init__(self, state: dict | None = None) -> None:
+        state = state or {}
+        self.detectors = [cls(state.get(cls.name)) for cls in DETECTOR_CLASSES]
+
+    def update(self, row: dict, session_start: bool) -> None:
+        for detector in self.detectors:
+            detector.update(row, session_start)
+
+    def results(self, change_points: list[ChangePoint] | None = None) -> list[DetectorResult]:
+        return [
+            detector.result(change_points) if isinstance(detector, WarmColdCycles) else detector.result()
+            for detector in self.detectors
+        ]
+
+    def counters(self) -> dict[str, float]:
+        return {f"{d.name}.{key}": value for d in self.detectors for key, value in d.counters().items()}
+
+    def to_state(self) -> dict:
+        return {detector.name: detector.to_state() for detector in self.detectors}
+
+
+def _run(detector: DetectorAccumulator, features: list[dict], sessions: SessionIndex | None = None) -> DetectorResult:
+    for row, session_start in _with_session_starts(features, sessions):
+        detector.update(row, session_start)
+    return detector.result()
+
+
+def _sessions_for(features: list[dict], sessions: SessionIndex | None) -> SessionIndex:
+    from app.services.analysis.sessions import segment_sessions
+
+    if sessions is not None:
+        return sessions
+    return segment_sessions(sorted(features, key=lambda x: x["ts"]))
+
+
+def _with_session_starts(features: list[dict], sessions: SessionIndex | None):
+    ordered = sorted(features, key=lambda x: x["ts"])
+    sessions = _sessions_for(ordered, sessions)
+    starts = {span.start for span in sessions.sessions}
+    return ((row, pos in starts) for pos, row in enumerate(ordered))
+
+
+def _dump_row(row: dict | None) -> dict | None:
+    if row is None:
+        return None
+    return {**row, "ts": row["ts"].isoformat()}
+
 
+def _restore_row(row: dict | None) -> dict | None:
+    if row is None:
+        return None
+    return {**row, "ts": datetime.fromisoformat(row["ts"])}
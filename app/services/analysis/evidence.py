@@ -0,0 +1,81 @@
+from collections.abc import Callable
+
+from app.services.analysis.detectors import run_detectors
+from app.services.analysis.features import extract_message_features
+from app.services.analysis.scoring import DETECTOR_WEIGHTS
+
+SENTIMENT_SWING_THRESHOLD = 0.6
+BOUNDARY_WEIGHT = 1.5
+SWING_WEIGHT = 1.0
+MARKER_WEIGHT = 0.25
+CONTEXT_RADIUS = 1
+
+
+def rank_messages_by_evidence(messages: list[dict]) -> list[float]:
+    """Score chronologically ordered `{ts, sender, text}` rows by their value as analysis evidence."""
+    rows = [
+        {"id": str(idx), "ts": row["ts"], "sender_id": row["sender"], "sender_name": row["sender"], "text": row["text"]}
+        for idx, row in enumerate(messages)
+    ]
+    features = extract_message_features(rows)
+    scores = [0.0] * len(features)
+
+    for detector in run_detectors(features):
+        weight = DETECTOR_WEIGHTS.get(detector.detector, 1.0) * (1.0 + detector.score)
+        for mid in detector.evidence_ids:
+            scores[int(mid)] += weight
+
+    previous_sentiment = None
+    for idx, row in enumerate(features):
+        if row["boundary"]:
+            scores[idx] += BOUNDARY_WEIGHT
+        if previous_sentiment is not None and abs(row["sentiment"] - previous_sentiment) >= SENTIMENT_SWING_THRESHOLD:
+            scores[idx] += SWING_WEIGHT
+        if row["future_talk"] or row["affection"] or row["avoidance"]:
+            scores[idx] += MARKER_WEIGHT
+        previous_sentiment = row["sentiment"]
+    return scores
+
+
+def select_evidence_messages(
+    messages: list[dict], budget: float, recent_anchor: float, cost: Callable[[dict], float] | None = None
+) -> list[int]:
+    """Pick message indices whose total `cost` fits `budget`: the most recent messages up to `recent_anchor`,
+    then top-ranked evidence with its neighbours.
+
+    Without `cost` every message costs 1, so both limits are message counts.
+    """
+    costs = [cost(row) if cost else 1 for row in messages]
+    if sum(costs) <= budget:
+        return list(range(len(messages)))
+
+    selected: set[int] = set()
+    spent = 0.0
+    cursor = len(messages) - 1
+    while cursor >= 0 and spent + costs[cursor] <= min(recent_anchor, budget):
+        selected.add(cursor)
+        spent += costs[cursor]
+        cursor -= 1
+
+    scores = rank_messages_by_evidence(messages)
+    ranked = sorted((idx for idx, score in enumerate(scores) if score > 0), key=lambda idx: scores[idx], reverse=True)
+    for idx in ranked:
+        if spent >= budget:
+            break
+        window = range(max(idx - CONTEXT_RADIUS, 0), min(idx + CONTEXT_RADIUS + 1, len(messages)))
+        missing = [pos for pos in window if pos not in selected]
+        if spent + sum(costs[pos] for pos in missing) > budget:
+            missing = [idx] if idx not in selected and spent + costs[idx] <= budget else []
+        selected.update(missing)
+        spent += sum(costs[pos] for pos in missing)
+
+    # Spend any leftover budget on the messages just before the recent anchor.
+    cursor = len(messages) - 1
+    while cursor >= 0:
+        if cursor not in selected:
+            if spent + costs[cursor] > budget:
+                break
+            selected.add(cursor)
+            spent += costs[cursor]
+        cursor -= 1
+    return sorted(selected)
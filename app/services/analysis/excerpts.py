@@ -0,0 +1,186 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, delete, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.security import decrypt_text, encrypt_text
+from app.models.excerpt import Excerpt
+from app.models.message import Message
+from app.models.participant import Participant
+from app.services.analysis.highlights import rank_highlights, signal_type, timeline_highlight_type
+
+# LLM evidence quotes timestamps loosely; candidates are looked up within this window of the quoted time.
+RESOLVE_WINDOW_SECONDS = 120
+SLOW_REPLY_HINTS = ("slow", "delay", "latency")
+
+
+def store_report_excerpts(db: Session, upload_id: str, report_payload: dict) -> int:
+    """Replace the upload's excerpts with the report's evidence and timeline items, linked to message IDs.
+
+    Items are tagged with their `message_id` in place; those that match no stored message are not indexed.
+    """
+    db.execute(delete(Excerpt).where(Excerpt.upload_id == upload_id))
+    candidates: dict[datetime, list[Message]] = {}
+    excerpts: list[Excerpt] = []
+
+    def add(item: dict, text: str, purpose: str, **fields) -> None:
+        message_id = item.get("message_id") or _resolve(db, upload_id, item, text, candidates)
+        if not message_id:
+            return
+        item["message_id"] = message_id
+        excerpts.append(
+            Excerpt(
+                upload_id=upload_id,
+                message_id=message_id,
+                encrypted_excerpt=encrypt_text(text),
+                purpose=purpose,
+                position=len(excerpts),
+                **fields,
+            )
+        )
+
+    for signal in report_payload.get("signals", []):
+        name = str(signal.get("name", "")).strip()
+        for item in signal.get("evidence", []):
+            text = str(item.get("excerpt", "")).strip()
+            if text:
+                add(item, text, "evidence", label=name or "Signal evidence", highlight_type=signal_type(name), tags=[name] if name else [])
+    for item in report_payload.get("timeline", []):
+        text = str(item.get("message", "")).strip()
+        if text:
+            tags = [str(tag) for tag in item.get("tags", []) if str(tag).strip()]
+            add(item, text, "timeline", label="Timeline evidence", highlight_type=timeline_highlight_type(item.get("type")), tags=tags)
+    db.add_all(excerpts)
+    return len(excerpts)
+
+
+def excerpt_highlights(db: Session, upload_id: str, stats: dict | None = None, top_n: int = 10) -> list[dict] | None:
+    """Highlights read from the excerpt index, or None when the upload's report was never indexed."""
+    rows = db.execute(
+        select(Excerpt, Message.ts, Participant.display_name)
+        .join(Message, Message.id == Excerpt.message_id)
+        .join(Participant, Participant.id == Message.sender_id)
+        .where(Excerpt.upload_id == upload_id)
+        .order_by(Excerpt.position)
+    ).all()
+    if not rows:
+        return None
+    items = {"evidence": [], "timeline": []}
+    for excerpt, ts, sender in rows:
+        items.setdefault(excerpt.purpose, []).append(
+            {
+                "type": excerpt.highlight_type,
+                "label": excerpt.label,
+                "timestamp": _as_utc(ts).isoformat(),
+                "sender": sender,
+                "excerpt": decrypt_text(excerpt.encrypted_excerpt),
+                "tags": list(excerpt.tags or []),
+                "message_id": excerpt.message_id,
+                "excerpt_id": excerpt.id,
+            }
+        )
+    # Timeline entries stand in only when no signal evidence was indexed, as in `build_highlights`.
+    highlights = rank_highlights(items["evidence"] or items["timeline"][:top_n], top_n)
+
+    reply_delay_ratio = float((stats or {}).get("reply_delay_ratio", 1.0) or 0.0)
+    if reply_delay_ratio >= 1.0 and not any(item["type"] == "slow_reply" for item in highlights):
+        for item in items["timeline"]:
+            tag_text = " ".join(item["tags"]).lower()
+            if item["type"] == "slow_reply" or any(hint in tag_text for hint in SLOW_REPLY_HINTS):
+                highlights.insert(0, {**item, "type": "slow_reply", "label": "Reply delay asymmetry", "tags": item["tags"][:3]})
+                break
+    return highlights[:top_n]
+
+
+def excerpt_context(db: Session, upload_id: str, excerpt_id: str, radius: int = 3) -> dict | None:
+    """The excerpt's message with up to `radius` neighbours on each side; only those messages are decrypted."""
+    anchor = db.execute(
+        select(Excerpt, Message)
+        .join(Message, Message.id == Excerpt.message_id)
+        .where(Excerpt.upload_id == upload_id, Excerpt.id == excerpt_id)
+    ).first()
+    if anchor is None:
+        return None
+    excerpt, message = anchor
+    # Keyset on (ts, id) so messages sharing the anchor's timestamp land on exactly one side.
+    base = select(Message).where(Message.upload_id == upload_id)
+    before = db.scalars(
+        base.where(or_(Message.ts < message.ts, and_(Message.ts == message.ts, Message.id < message.id)))
+        .order_by(Message.ts.desc(), Message.id.desc())
+        .limit(radius)
+    ).all()
+    after = db.scalars(
+        base.where(or_(Message.ts > message.ts, and_(Message.ts == message.ts, Message.id > message.id)))
+        .order_by(Message.ts, Message.id)
+        .limit(radius)
+    ).all()
+    window = [*reversed(before), message, *after]
+    names = dict(
+        db.execute(
+            select(Participant.id, Participant.display_name).where(Participant.id.in_({row.sender_id for row in window}))
+        ).all()
+    )
+    return {
+        "excerpt_id": excerpt.id,
+        "message_id": message.id,
+        "purpose": excerpt.purpose,
+        "label": excerpt.label,
+        "messages": [
+            {
+                "message_id": row.id,
+                "ts": _as_utc(row.ts).isoformat(),
+                "sender": names.get(row.sender_id, "unknown"),
+                "text": decrypt_text(row.encrypted_text),
+                "is_excerpt": row.id == message.id,
+            }
+            for row in window
+        ],
+    }
+
+
+def _resolve(db: Session, upload_id: str, item: dict, text: str, candidates: dict[datetime, list[Message]]) -> str | None:
+    """Match a quoted item to the message it came from: nearby in time, and its text containing the quote."""
+    ts = _parse_ts(item.get("timestamp"))
+    if ts is None:
+        return None
+    window = timedelta(seconds=RESOLVE_WINDOW_SECONDS)
+    if ts not in candidates:
+        candidates[ts] = db.scalars(
+            select(Message).where(Message.upload_id == upload_id, Message.ts >= ts - window, Message.ts <= ts + window)
+        ).all()
+    needle = _normalize(text.rstrip(".…"))
+    if not needle:
+        return None
+    sender = _normalize(str(item.get("sender", "")))
+    names: dict[str, str] = {}
+    best: tuple | None = None
+    for message in candidates[ts]:
+        body = _normalize(decrypt_text(message.encrypted_text))
+        if not body or (needle not in body and body not in needle):
+            continue
+        if message.sender_id not in names:
+            names[message.sender_id] = _normalize(db.get(Participant, message.sender_id).display_name)
+        rank = (names[message.sender_id] == sender, -abs((_as_utc(message.ts) - ts).total_seconds()))
+        if best is None or rank > best[0]:
+            best = (rank, message.id)
+    return best[1] if best else None
+
+
+def _normalize(value: str) -> str:
+    return " ".join(value.split()).casefold()
+
+
+def _parse_ts(value: object) -> datetime | None:
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    return _as_utc(parsed)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite returns naive datetimes; stored timestamps are always UTC.
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
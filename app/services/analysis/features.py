@@ -1,13 +1,24 @@
 from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from datetime import datetime
 
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 
+from app.core.config import get_settings
+from app.services.analysis.changepoints import SessionSeries, format_change_points
+from app.services.analysis.rolling import ENGAGEMENT_WINDOWS, RollingWindow, format_points, lttb
+from app.services.analysis.sessions import segment_sessions
+from app.services.analysis.sketches import LatencySketch, summarize_sketch
+from app.services.analysis.types import SessionIndex
+
 AFFECTION_MARKERS = {"love", "miss you", "babe", "baby", "xo", "❤️", "😘", "😍", "sweetheart"}
 AVOIDANCE_MARKERS = {"busy", "later", "idk", "i don't know", "can't", "cannot", "maybe", "not sure", "rain check"}
 HEDGE_MARKERS = {"maybe", "kinda", "kind of", "unsure", "perhaps", "possibly"}
 BOUNDARY_MARKERS = {"i can't", "not ready", "too much", "need space", "can't do this", "i need time"}
 FUTURE_MARKERS = {"let's", "we should", "next week", "sometime", "plan", "trip", "dinner", "see you"}
 
+POINT_COMPACTION_FACTOR = 10
+
 analyzer = SentimentIntensityAnalyzer()
 
 
@@ -16,76 +27,118 @@ def _contains_any(text: str, lexicon: set[str]) -> bool:
     return any(token in lowered for token in lexicon)
 
 
-def extract_message_features(messages: list[dict]) -> list[dict]:
-    results: list[dict] = []
+def extract_message_features(messages: Iterable[dict]) -> list[dict]:
+    return list(iter_message_features(messages))
+
+
+def iter_message_features(messages: Iterable[dict]) -> Iterator[dict]:
     for item in messages:
         text = item["text"]
         sentiment = analyzer.polarity_scores(text)["compound"] if text else 0.0
-        results.append(
-            {
-                **item,
-                "sentiment": sentiment,
-                "affection": _contains_any(text, AFFECTION_MARKERS),
-                "avoidance": _contains_any(text, AVOIDANCE_MARKERS),
-                "hedge": _contains_any(text, HEDGE_MARKERS),
-                "boundary": _contains_any(text, BOUNDARY_MARKERS),
-                "future_talk": _contains_any(text, FUTURE_MARKERS),
-            }
-        )
-    return results
+        yield {
+            **item,
+            "sentiment": sentiment,
+            "affection": _contains_any(text, AFFECTION_MARKERS),
+            "avoidance": _contains_any(text, AVOIDANCE_MARKERS),
+            "hedge": _contains_any(text, HEDGE_MARKERS),
+            "boundary": _contains_any(text, BOUNDARY_MARKERS),
+            "future_talk": _contains_any(text, FUTURE_MARKERS),
+        }
 
 
-def build_timeline_metrics(features: list[dict]) -> dict:
+def build_timeline_metrics(features: list[dict], sessions: SessionIndex | None = None) -> dict:
     if not features:
         return {}
-    per_day: dict[str, int] = defaultdict(int)
-    initiation_counts: dict[str, int] = defaultdict(int)
-    response_by_sender: dict[str, list[float]] = defaultdict(list)
-    engagement_shift: list[dict] = []
-
     features = sorted(features, key=lambda x: x["ts"])
-    previous = None
-    for idx, row in enumerate(features):
-        day_key = row["ts"].date().isoformat()
-        per_day[day_key] += 1
+    if sessions is None:
+        sessions = segment_sessions(features)
+    starts = {span.start for span in sessions.sessions}
+    accumulator = TimelineAccumulator()
+    series = SessionSeries()
+    for pos, row in enumerate(features):
+        accumulator.update(row, pos in starts)
+        series.update(row, pos in starts)
+    return {**accumulator.result(sessions), "change_points": format_change_points(series.change_points(sessions))}
+
+
+class TimelineAccumulator:
+    """Streaming timeline metrics; counters, sketches and window tails are checkpointable as JSON state."""
+
+    def __init__(self, state: dict | None = None) -> None:
+        state = state or {}
+        self.message_count = int(state.get("message_count", 0))
+        self.per_day: dict[str, int] = defaultdict(int, state.get("per_day", {}))
+        self.initiation_counts: dict[str, int] = defaultdict(int, state.get("initiation_counts", {}))
+        self.response_by_sender: dict[str, LatencySketch] = defaultdict(
+            LatencySketch, {sender: LatencySketch.from_dict(raw) for sender, raw in state.get("sketches", {}).items()}
+        )
+        self.windows = {
+            name: RollingWindow.from_state(state["windows"][name]) if name in state.get("windows", {}) else RollingWindow(**spec)
+            for name, spec in ENGAGEMENT_WINDOWS.items()
+        }
+        self.window_points: dict[str, list[tuple]] = {
+            name: [tuple(point) for point in state.get("window_points", {}).get(name, [])] for name in self.windows
+        }
+        previous = state.get("previous")
+        self.previous = {**previous, "ts": datetime.fromisoformat(previous["ts"])} if previous else None
+        self._max_points = get_settings().engagement_max_points
 
-        if previous is None or (row["ts"] - previous["ts"]).total_seconds() > 6 * 3600:
-            initiation_counts[row["sender_name"]] += 1
+    def update(self, row: dict, session_start: bool) -> None:
+        self.message_count += 1
+        self.per_day[row["ts"].date().isoformat()] += 1
+        if session_start:
+            self.initiation_counts[row["sender_name"]] += 1
 
+        previous = self.previous
         if previous and previous["sender_id"] != row["sender_id"]:
-            response_by_sender[row["sender_name"]].append((row["ts"] - previous["ts"]).total_seconds() / 60.0)
-        previous = row
-
-        if idx >= 9:
-            window = features[idx - 9 : idx + 1]
-            engagement_shift.append(
-                {
-                    "end_ts": row["ts"].isoformat(),
-                    "avg_sentiment": sum(w["sentiment"] for w in window) / len(window),
-                    "message_count": len(window),
-                }
-            )
-
-    response_stats = {
-        sender: {
-            "avg_minutes": sum(values) / len(values),
-            "median_minutes": sorted(values)[len(values) // 2],
-            "count": len(values),
+            self.response_by_sender[row["sender_name"]].add((row["ts"] - previous["ts"]).total_seconds() / 60.0)
+        self.previous = {"ts": row["ts"], "sender_id": row["sender_id"]}
+
+        epoch = row["ts"].timestamp()
+        for name, window in self.windows.items():
+            window.push(epoch, row["sentiment"])
+            if window.full:
+                points = self.window_points[name]
+                points.append((epoch, window.mean, window.volatility, window.count, window.rate_per_hour))
+                # Keep raw series bounded; LTTB over an LTTB-reduced prefix preserves the visible shape.
+                if len(points) > POINT_COMPACTION_FACTOR * self._max_points:
+                    self.window_points[name] = lttb(points, 2 * self._max_points)
+
+    def result(self, sessions: SessionIndex) -> dict:
+        engagement_windows = {
+            name: format_points(lttb(points, self._max_points)) for name, points in self.window_points.items()
+        }
+        response_stats = {
+            sender: summarize_sketch(sketch) for sender, sketch in self.response_by_sender.items() if sketch.count
+        }
+        return {
+            "messages_per_day": dict(self.per_day),
+            "messages_per_week": aggregate_by_week(self.per_day),
+            "response_time_stats": response_stats,
+            "initiation_counts": dict(self.initiation_counts),
+            "sessions": {
+                "gap_threshold_minutes": round(sessions.gap_seconds / 60, 1),
+                "session_count": len(sessions.sessions),
+                "avg_messages_per_session": round(self.message_count / max(len(sessions.sessions), 1), 2),
+            },
+            "streaks": daily_streaks(self.per_day),
+            "engagement_shifts": engagement_windows["count_10"],
+            "engagement_windows": engagement_windows,
         }
-        for sender, values in response_by_sender.items()
-        if values
-    }
-    return {
-        "messages_per_day": per_day,
-        "messages_per_week": _aggregate_by_week(per_day),
-        "response_time_stats": response_stats,
-        "initiation_counts": initiation_counts,
-        "streaks": _streaks(per_day),
-        "engagement_shifts": engagement_shift,
-    }
-
-
-def _aggregate_by_week(per_day: dict[str, int]) -> dict[str, int]:
+
+    def to_state(self) -> dict:
+        return {
+            "message_count": self.message_count,
+            "per_day": dict(self.per_day),
+            "initiation_counts": dict(self.initiation_counts),
+            "sketches": {sender: sketch.to_dict() for sender, sketch in self.response_by_sender.items()},
+            "windows": {name: window.to_state() for name, window in self.windows.items()},
+            "window_points": {name: [list(point) for point in points] for name, points in self.window_points.items()},
+            "previous": {**self.previous, "ts": self.previous["ts"].isoformat()} if self.previous else None,
+        }
+
+
+def aggregate_by_week(per_day: dict[str, int]) -> dict[str, int]:
     weekly: dict[str, int] = defaultdict(int)
     for day_key, count in per_day.items():
         year, week, _ = __import__("datetime").datetime.fromisoformat(day_key).isocalendar()
@@ -93,7 +146,7 @@ def _aggregate_by_week(per_day: dict[str, int]) -> dict[str, int]:
     return weekly
 
 
-def _streaks(per_day: dict[str, int]) -> dict:
+def daily_streaks(per_day: dict[str, int]) -> dict:
     days = sorted(per_day.keys())
     if not days:
         return {"longest_daily_streak": 0}
@@ -8,7 +8,7 @@ def build_highlights(report_payload: dict, top_n: int = 10) -> list[dict]:
         if not isinstance(signal, dict):
             continue
         signal_name = str(signal.get("name", "")).strip()
-        signal_type = _signal_type(signal_name)
+        highlight_type = signal_type(signal_name)
         tags = [signal_name] if signal_name else []
         evidence_rows = signal.get("evidence", [])
         for row in evidence_rows:
@@ -21,7 +21,7 @@ def build_highlights(report_payload: dict, top_n: int = 10) -> list[dict]:
             sender = str(row.get("sender", "Unknown")).strip() or "Unknown"
             highlights.append(
                 {
-                    "type": signal_type,
+                    "type": highlight_type,
                     "label": signal_name or "Signal evidence",
                     "timestamp": _safe_iso(ts),
                     "sender": sender,
@@ -36,11 +36,9 @@ def build_highlights(report_payload: dict, top_n: int = 10) -> list[dict]:
         for row in timeline[:top_n]:
             if not isinstance(row, dict):
                 continue
-            row_type = str(row.get("type", "mixed")).strip() or "mixed"
-            normalized_type = "mixed_signal" if row_type == "mixed" else ("slow_reply" if row_type == "cool" else "mixed_signal")
             highlights.append(
                 {
-                    "type": normalized_type,
+                    "type": timeline_highlight_type(row.get("type")),
                     "label": "Timeline evidence",
                     "timestamp": _safe_iso(row.get("timestamp")),
                     "sender": str(row.get("sender", "Unknown")).strip() or "Unknown",
@@ -49,6 +47,10 @@ def build_highlights(report_payload: dict, top_n: int = 10) -> list[dict]:
                 }
             )
 
+    return rank_highlights(highlights, top_n)
+
+
+def rank_highlights(highlights: list[dict], top_n: int) -> list[dict]:
     # Keep top N red flags first, then fill with others.
     red_flags = [item for item in highlights if item.get("type") == "red_flag"][:top_n]
     others = [item for item in highlights if item.get("type") != "red_flag"][: max(0, top_n - len(red_flags))]
@@ -81,7 +83,7 @@ def enrich_report_for_ui(report_payload: dict, top_n: int = 10) -> dict:
     return payload
 
 
-def _signal_type(name: str) -> str:
+def signal_type(name: str) -> str:
     lowered = name.lower()
     if any(token in lowered for token in ("reply", "latency", "delay", "response")):
         return "slow_reply"
@@ -90,6 +92,10 @@ def _signal_type(name: str) -> str:
     return "mixed_signal"
 
 
+def timeline_highlight_type(row_type: object) -> str:
+    return "slow_reply" if str(row_type or "").strip() == "cool" else "mixed_signal"
+
+
 def _safe_iso(value: object) -> str:
     if isinstance(value, datetime):
         return value.isoformat()
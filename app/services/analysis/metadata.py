@@ -0,0 +1,90 @@
+from sqlalchemy import Float, and_, cast, func, literal, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.message import Message
+from app.models.participant import Participant
+from app.services.analysis.features import aggregate_by_week, daily_streaks
+from app.services.analysis.sessions import choose_gap_threshold
+from app.services.analysis.sketches import LatencySketch, summarize_sketch
+
+
+def metadata_timeline_metrics(db: Session, upload_id: str) -> dict:
+    """Timeline metrics that only need `ts` and `sender_id`, computed in SQL without decrypting any message."""
+    names = dict(db.execute(select(Participant.id, Participant.display_name).where(Participant.upload_id == upload_id)).all())
+    per_day = messages_per_day(db, upload_id)
+    gaps = _gaps_subquery(db, upload_id)
+
+    gap_seconds = choose_gap_threshold(message_gaps(db, upload_id))
+    session_start = or_(gaps.c.gap.is_(None), gaps.c.gap > gap_seconds)
+    initiation_rows = db.execute(
+        select(gaps.c.sender_id, func.count()).where(session_start).group_by(gaps.c.sender_id)
+    ).all()
+    initiation_counts = {names.get(sender, "unknown"): count for sender, count in initiation_rows}
+
+    # Replies are messages whose predecessor came from someone else; the sketch needs the individual values.
+    reply = and_(gaps.c.prev_sender_id.is_not(None), gaps.c.prev_sender_id != gaps.c.sender_id)
+    sketches: dict[str, LatencySketch] = {}
+    for sender, gap in db.execute(select(gaps.c.sender_id, gaps.c.gap).where(reply)):
+        sketches.setdefault(names.get(sender, "unknown"), LatencySketch()).add(gap / 60.0)
+
+    message_count = sum(per_day.values())
+    session_count = sum(initiation_counts.values())
+    return {
+        "messages_per_day": per_day,
+        "messages_per_week": dict(aggregate_by_week(per_day)),
+        "response_time_stats": {sender: summarize_sketch(sketch) for sender, sketch in sketches.items()},
+        "initiation_counts": initiation_counts,
+        "sessions": {
+            "gap_threshold_minutes": round(gap_seconds / 60, 1),
+            "session_count": session_count,
+            "avg_messages_per_session": round(message_count / max(session_count, 1), 2),
+        },
+        "streaks": daily_streaks(per_day),
+    }
+
+
+def message_gaps(db: Session, upload_id: str) -> list[float]:
+    """Seconds between consecutive messages of an upload."""
+    gaps = _gaps_subquery(db, upload_id)
+    return [gap for (gap,) in db.execute(select(gaps.c.gap).where(gaps.c.gap.is_not(None)))]
+
+
+def messages_per_day(db: Session, upload_id: str) -> dict[str, int]:
+    day = _utc_date(db, Message.ts)
+    rows = db.execute(
+        select(day, func.count(Message.id)).where(Message.upload_id == upload_id).group_by(day).order_by(day)
+    ).all()
+    return {str(bucket): count for bucket, count in rows}
+
+
+def _gaps_subquery(db: Session, upload_id: str):
+    previous_ts = func.lag(Message.ts).over(partition_by=Message.upload_id, order_by=Message.ts)
+    previous_sender = func.lag(Message.sender_id).over(partition_by=Message.upload_id, order_by=Message.ts)
+    ordered = (
+        select(
+            Message.sender_id.label("sender_id"),
+            _epoch_seconds(db, Message.ts).label("epoch"),
+            _epoch_seconds(db, previous_ts).label("prev_epoch"),
+            previous_sender.label("prev_sender_id"),
+        )
+        .where(Message.upload_id == upload_id)
+        .subquery()
+    )
+    return select(
+        ordered.c.sender_id,
+        ordered.c.prev_sender_id,
+        (ordered.c.epoch - ordered.c.prev_epoch).label("gap"),
+    ).subquery()
+
+
+def _epoch_seconds(db: Session, column):
+    if db.get_bind().dialect.name == "sqlite":
+        # SQLite stores UTC timestamps as ISO strings; julianday counts days since noon 4714 BC.
+        return (func.julianday(column) - literal(2440587.5)) * literal(86400.0)
+    return cast(func.extract("epoch", column), Float)
+
+
+def _utc_date(db: Session, column):
+    if db.get_bind().dialect.name == "sqlite":
+        return func.date(column)
+    return func.date(func.timezone("UTC", column))
@@ -1,25 +1,118 @@
-from collections import defaultdict
+from collections.abc import Callable, Iterator
 from datetime import datetime, timedelta, timezone
 
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from app.core.config import get_settings
 from app.core.security import decrypt_text
+from app.models.analysis_checkpoint import AnalysisCheckpoint
+from app.models.daily_rollup import DailyRollup
 from app.models.message import Message
 from app.models.participant import Participant
-from app.services.analysis.detectors import run_detectors
-from app.services.analysis.features import extract_message_features
+from app.services.analysis.bootstrap import SessionBlocks, bootstrap_intervals
+from app.services.analysis.changepoints import SessionSeries, format_change_points, oscillation_score
+from app.services.analysis.detectors import DetectorSuite
+from app.services.analysis.features import TimelineAccumulator, iter_message_features
+from app.services.analysis.metadata import message_gaps
+from app.services.analysis.rollups import rollup_timeline_metrics
 from app.services.analysis.scoring import compute_confidence, compute_mixed_signal_index
+from app.services.analysis.sessions import (
+    SessionTracker,
+    choose_gap_threshold,
+    gap_threshold_for,
+    load_session_index,
+    save_session_index,
+)
+from app.services.analysis.types import ChangePoint, SessionIndex
+
+MAX_EXCERPT_CHARS = 220
+STREAM_PAGE_SIZE = 1000
 
 
 def run_analysis(db: Session, upload_id: str) -> dict:
+    """Analyze an upload, folding in only messages newer than its checkpoint when one is valid.
+
+    Messages are streamed page by page, so memory holds one page plus the bounded accumulator state.
+    """
+    checkpoint = db.scalar(select(AnalysisCheckpoint).where(AnalysisCheckpoint.upload_id == upload_id))
+    state = _resume_state(db, upload_id, checkpoint)
+    if state is None:
+        state = AnalysisState(session_gap_seconds(db, upload_id))
+        after, from_seq = None, 0
+    else:
+        after, from_seq = checkpoint.last_ts, max(len(state.sessions.sessions) - 1, 0)
+
+    for row in iter_message_features(iter_messages(db, upload_id, after=after)):
+        state.update(row)
+    if after is not None and state.message_count == checkpoint.message_count and checkpoint.result_json:
+        return checkpoint.result_json
+
+    result = state.finalize(lambda ids: _lookup_messages(db, upload_id, ids))
+    # Counts, initiations and reply latencies come from the ingest-time rollups when they cover every message.
+    rollup = rollup_timeline_metrics(db, upload_id)
+    if rollup and sum(rollup["messages_per_day"].values()) == state.message_count:
+        result["timeline_metrics"].update(rollup)
+
+    if state.message_count:
+        save_session_index(db, upload_id, state.sessions.index(), from_seq)
+        if checkpoint is None:
+            checkpoint = AnalysisCheckpoint(upload_id=upload_id, llm_context_json={})
+        checkpoint.message_count = state.message_count
+        checkpoint.last_message_id = state.last_message_id
+        checkpoint.last_ts = state.last_ts
+        checkpoint.state_json = state.to_state()
+        checkpoint.result_json = result
+        db.add(checkpoint)
+        db.commit()
+    return result
+
+
+def iter_messages(
+    db: Session,
+    upload_id: str,
+    after: datetime | None = None,
+    page_size: int = STREAM_PAGE_SIZE,
+) -> Iterator[dict]:
+    """Yield decrypted messages in time order, fetching and decrypting one page at a time."""
+    participant_map = dict(
+        db.execute(select(Participant.id, Participant.display_name).where(Participant.upload_id == upload_id)).all()
+    )
+    query = select(Message.id, Message.ts, Message.sender_id, Message.encrypted_text).where(Message.upload_id == upload_id)
+    if after is not None:
+        query = query.where(Message.ts > after)
+    result = db.execute(query.order_by(Message.ts.asc()).execution_options(yield_per=page_size))
+    for page in result.partitions():
+        yield from [
+            {
+                "id": mid,
+                "ts": ts.astimezone(timezone.utc),
+                "sender_id": sender_id,
+                "sender_name": participant_map.get(sender_id, "unknown"),
+                "text": decrypt_text(encrypted_text),
+            }
+            for mid, ts, sender_id, encrypted_text in page
+        ]
+
+
+def session_gap_seconds(db: Session, upload_id: str) -> float:
+    """Session gap threshold from the ingest-time rollups, or chosen from SQL-computed gaps."""
+    stored = db.scalar(select(DailyRollup.gap_seconds).where(DailyRollup.upload_id == upload_id).limit(1))
+    if stored is not None:
+        return float(stored)
+    return choose_gap_threshold(message_gaps(db, upload_id))
+
+
+def load_messages(db: Session, upload_id: str, after: datetime | None = None) -> list[dict]:
     participant_map = {
         p.id: p.display_name
         for p in db.scalars(select(Participant).where(Participant.upload_id == upload_id)).all()
     }
-    message_rows = db.scalars(select(Message).where(Message.upload_id == upload_id).order_by(Message.ts.asc())).all()
-    messages = [
+    query = select(Message).where(Message.upload_id == upload_id)
+    if after is not None:
+        query = query.where(Message.ts > after)
+    message_rows = db.scalars(query.order_by(Message.ts.asc())).all()
+    return [
         {
             "id": m.id,
             "ts": m.ts.astimezone(timezone.utc),
@@ -29,85 +122,212 @@ def run_analysis(db: Session, upload_id: str) -> dict:
         }
         for m in message_rows
     ]
-    if not messages:
+
+
+def analyze_messages(messages: list[dict], sessions: SessionIndex | None = None) -> dict:
+    state = AnalysisState(sessions.gap_seconds if sessions else gap_threshold_for(messages))
+    for row in iter_message_features(messages):
+        state.update(row)
+    by_id = {row["id"]: row for row in messages}
+    return state.finalize(lambda ids: {mid: by_id[mid] for mid in ids if mid in by_id})
+
+
+class AnalysisState:
+    """Checkpointable fold of sessions, detectors and timeline metrics over time-ordered feature rows."""
+
+    def __init__(self, gap_seconds: float, state: dict | None = None, sessions: SessionIndex | None = None) -> None:
+        state = state or {}
+        if sessions is not None:
+            self.sessions = SessionTracker.from_state(state["sessions"], sessions.sessions)
+        else:
+            self.sessions = SessionTracker(gap_seconds)
+        self.detectors = DetectorSuite(state.get("detectors"))
+        self.timeline = TimelineAccumulator(state.get("timeline"))
+        self.series = SessionSeries(state.get("series"))
+        self.blocks = SessionBlocks(state.get("blocks"))
+        self.message_count = int(state.get("message_count", 0))
+        self.first_ts = _parse_ts(state.get("first_ts"))
+        self.last_ts = _parse_ts(state.get("last_ts"))
+        self.last_message_id: str | None = state.get("last_message_id")
+
+    @classmethod
+    def from_state(cls, state: dict, sessions: SessionIndex) -> "AnalysisState":
+        """Resume from checkpointed accumulator state and the persisted session index."""
+        return cls(float(state["sessions"]["gap_seconds"]), state, sessions)
+
+    def update(self, row: dict) -> None:
+        session_start = self.sessions.update(row)
+        if session_start:
+            self.blocks.session_started(self.detectors.counters())
+        self.detectors.update(row, session_start)
+        self.timeline.update(row, session_start)
+        self.series.update(row, session_start)
+        self.message_count += 1
+        if self.first_ts is None:
+            self.first_ts = row["ts"]
+        self.last_ts = row["ts"]
+        self.last_message_id = row["id"]
+
+    def finalize(self, lookup: Callable[[list[str]], dict[str, dict]]) -> dict:
+        """Build the analysis result; `lookup` resolves evidence message IDs to rows with text."""
+        if not self.message_count:
+            return {
+                "timeline_metrics": {},
+                "detectors": [],
+                "mixed_signal_index": 0.0,
+                "confidence": 0.0,
+                "sub_scores": {},
+                "moments_of_ambiguity": [],
+                "evidence_messages": {},
+                "summary_text": "No analyzable messages were found.",
+            }
+
+        sessions = self.sessions.index()
+        change_points = self.series.change_points(sessions)
+        detector_results = self.detectors.results(change_points)
+        evidence_ids = list(dict.fromkeys(mid for d in detector_results for mid in d.evidence_ids))
+        evidence_rows = lookup(evidence_ids)
+        days = (self.last_ts.date() - self.first_ts.date()).days + 1
+        intervals = bootstrap_intervals(
+            self.blocks.blocks(self.detectors.counters()),
+            get_settings().bootstrap_resamples,
+            {"warm_cold_cycles": oscillation_score(change_points)},
+        )
+        confidence = compute_confidence(self.message_count, max(days, 1), detector_results, intervals)
+        mixed_signal_index, sub_scores = compute_mixed_signal_index(detector_results, confidence, intervals)
+        moments = _moments_of_ambiguity(evidence_rows, detector_results)
+        summary_text = _summary_text(mixed_signal_index, confidence, detector_results)
+
         return {
-            "timeline_metrics": {},
-            "detectors": [],
-            "mixed_signal_index": 0.0,
-            "confidence": 0.0,
-            "sub_scores": {},
-            "moments_of_ambiguity": [],
-            "summary_text": "No analyzable messages were found.",
+            "timeline_metrics": _timeline_metrics(self.timeline, sessions, change_points),
+            "detectors": [
+                {"name": d.detector, "score": round(d.score, 3), "explanation": d.explanation, "evidence_ids": d.evidence_ids}
+                for d in detector_results
+            ],
+            "mixed_signal_index": mixed_signal_index,
+            "confidence": confidence,
+            "sub_scores": sub_scores,
+            "moments_of_ambiguity": moments,
+            "evidence_messages": {mid: _excerpt(row) for mid, row in evidence_rows.items()},
+            "summary_text": summary_text,
         }
 
-    features = extract_message_features(messages)
-    timeline_metrics = _timeline_metrics(features)
-    detector_results = run_detectors(features)
-    days = (messages[-1]["ts"].date() - messages[0]["ts"].date()).days + 1
-    confidence = compute_confidence(len(messages), max(days, 1), detector_results)
-    mixed_signal_index, sub_scores = compute_mixed_signal_index(detector_results, confidence)
-    moments = _moments_of_ambiguity(features, detector_results)
-    summary_text = _summary_text(mixed_signal_index, confidence, detector_results)
+    def to_state(self) -> dict:
+        return {
+            "sessions": self.sessions.to_state(),
+            "detectors": self.detectors.to_state(),
+            "timeline": self.timeline.to_state(),
+            "series": self.series.to_state(),
+            "blocks": self.blocks.to_state(),
+            "message_count": self.message_count,
+            "first_ts": self.first_ts.isoformat() if self.first_ts else None,
+            "last_ts": self.last_ts.isoformat() if self.last_ts else None,
+            "last_message_id": self.last_message_id,
+        }
 
+
+def _resume_state(db: Session, upload_id: str, checkpoint: AnalysisCheckpoint | None) -> AnalysisState | None:
+    """Return the checkpointed state if the stored messages up to it are unchanged."""
+    if checkpoint is None or not checkpoint.state_json or not checkpoint.message_count or checkpoint.last_ts is None:
+        return None
+    covered = db.scalar(
+        select(func.count(Message.id)).where(Message.upload_id == upload_id, Message.ts <= checkpoint.last_ts)
+    )
+    last_exists = db.scalar(
+        select(func.count(Message.id)).where(Message.upload_id == upload_id, Message.id == checkpoint.last_message_id)
+    )
+    if covered != checkpoint.message_count or not last_exists:
+        return None
+    sessions = load_session_index(db, upload_id)
+    if sessions is None or sum(span.message_count for span in sessions.sessions) != checkpoint.message_count:
+        return None
+    return AnalysisState.from_state(checkpoint.state_json, sessions)
+
+
+def _lookup_messages(db: Session, upload_id: str, message_ids: list[str]) -> dict[str, dict]:
+    """Fetch and decrypt only the requested messages."""
+    if not message_ids:
+        return {}
+    participant_map = {
+        p.id: p.display_name
+        for p in db.scalars(select(Participant).where(Participant.upload_id == upload_id)).all()
+    }
+    rows = db.scalars(select(Message).where(Message.upload_id == upload_id, Message.id.in_(message_ids))).all()
     return {
-        "timeline_metrics": timeline_metrics,
-        "detectors": [
-            {"name": d.detector, "score": round(d.score, 3), "explanation": d.explanation, "evidence_ids": d.evidence_ids}
-            for d in detector_results
-        ],
-        "mixed_signal_index": mixed_signal_index,
-        "confidence": confidence,
-        "sub_scores": sub_scores,
-        "moments_of_ambiguity": moments,
-        "summary_text": summary_text,
+        m.id: {
+            "id": m.id,
+            "ts": m.ts.astimezone(timezone.utc),
+            "sender_id": m.sender_id,
+            "sender_name": participant_map.get(m.sender_id, "unknown"),
+            "text": decrypt_text(m.encrypted_text),
+        }
+        for m in rows
     }
 
 
-def _timeline_metrics(features: list[dict]) -> dict:
-    from app.services.analysis.features import build_timeline_metrics
+def _excerpt(row: dict) -> dict:
+    return {"message_id": row["id"], "sender": row["sender_name"], "ts": row["ts"].isoformat(), "raw_text": row["text"][:MAX_EXCERPT_CHARS]}
+
+
+def _parse_ts(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value else None
+
 
-    metrics = build_timeline_metrics(features)
+def _timeline_metrics(timeline: TimelineAccumulator, sessions: SessionIndex, change_points: list[ChangePoint]) -> dict:
+    metrics = timeline.result(sessions)
     return {
         "messages_per_day": dict(metrics.get("messages_per_day", {})),
         "messages_per_week": dict(metrics.get("messages_per_week", {})),
         "response_time_stats": metrics.get("response_time_stats", {}),
         "initiation_counts": dict(metrics.get("initiation_counts", {})),
+        "sessions": metrics.get("sessions", {}),
         "streaks": metrics.get("streaks", {}),
         "engagement_shifts": metrics.get("engagement_shifts", []),
+        "engagement_windows": metrics.get("engagement_windows", {}),
+        "change_points": format_change_points(change_points),
     }
 
 
-def _moments_of_ambiguity(features: list[dict], detector_results: list) -> list[dict]:
+def _moments_of_ambiguity(by_id: dict[str, dict], detector_results: list) -> list[dict]:
+    """Cluster evidence from all detectors into tight windows with a sorted sweep, O(e log e)."""
     settings = get_settings()
-    by_id = {row["id"]: row for row in features}
-    windows: list[dict] = []
-    for detector in detector_results:
-        if not detector.evidence_ids:
-            continue
-        evidence_msgs = [by_id[mid] for mid in detector.evidence_ids if mid in by_id]
-        if not evidence_msgs:
-            continue
-        evidence_msgs.sort(key=lambda x: x["ts"])
-        start = evidence_msgs[0]["ts"] - timedelta(hours=2)
-        end = evidence_msgs[-1]["ts"] + timedelta(hours=2)
-        windows.append(
-            {
-                "label": _label_for_detector(detector.detector),
-                "window_start": start.isoformat(),
-                "window_end": end.isoformat(),
-                "detectors_triggered": [detector.detector],
-                "evidence_ids": [m["id"] for m in evidence_msgs[:4]],
-                "excerpts": [
-                    {"message_id": m["id"], "sender": m["sender_name"], "ts": m["ts"].isoformat(), "raw_text": m["text"][:220]}
-                    for m in evidence_msgs[:4]
-                ],
-            }
-        )
-    windows.sort(key=lambda w: len(w["evidence_ids"]), reverse=True)
+    merge_gap = timedelta(minutes=settings.ambiguity_merge_gap_minutes)
+    events = sorted(
+        (by_id[mid]["ts"], detector.detector, mid)
+        for detector in detector_results
+        for mid in detector.evidence_ids
+        if mid in by_id
+    )
+    clusters: list[list[tuple]] = []
+    for event in events:
+        if clusters and event[0] - clusters[-1][-1][0] <= merge_gap:
+            clusters[-1].append(event)
+        else:
+            clusters.append([event])
+
+    windows = [_ambiguity_window(cluster, by_id) for cluster in clusters]
+    # Moments where several detectors agree rank first, then the most tightly packed evidence.
+    windows.sort(key=lambda w: (len(w["detectors_triggered"]), w["density"]), reverse=True)
     return windows[: settings.ambiguity_windows_top_n]
 
 
-def _label_for_detector(detector: str) -> str:
+def _ambiguity_window(cluster: list[tuple], by_id: dict[str, dict]) -> dict:
+    detectors = list(dict.fromkeys(detector for _, detector, _ in cluster))
+    evidence_ids = list(dict.fromkeys(mid for _, _, mid in cluster))
+    start, end = cluster[0][0], cluster[-1][0]
+    span_hours = (end - start).total_seconds() / 3600
+    return {
+        "label": " + ".join(label_for_detector(name) for name in detectors[:2]),
+        "window_start": start.isoformat(),
+        "window_end": end.isoformat(),
+        "detectors_triggered": detectors,
+        "evidence_ids": evidence_ids,
+        "density": round(len(evidence_ids) / (span_hours + 1), 3),
+        "excerpts": [_excerpt(by_id[mid]) for mid in evidence_ids[:4]],
+    }
+
+
+def label_for_detector(detector: str) -> str:
     labels = {
         "initiation_imbalance": "Initiation mismatch",
         "response_latency_asymmetry": "Response delay gap",
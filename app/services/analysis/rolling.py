@@ -0,0 +1,138 @@
+import math
+from collections import deque
+from datetime import datetime, timezone
+
+TIME_WINDOW_BUCKETS = 256
+
+ENGAGEMENT_WINDOWS = {
+    "count_10": {"size": 10},
+    "count_50": {"size": 50},
+    "1h": {"span_seconds": 3600},
+    "1d": {"span_seconds": 86400},
+    "7d": {"span_seconds": 7 * 86400},
+}
+
+
+class RollingWindow:
+    """Running-sum aggregate over the last `size` values or the values of the last `span_seconds`.
+
+    Each push is amortized O(1): the sum and sum of squares are updated as values enter and leave.
+    Time windows pool values into at most `TIME_WINDOW_BUCKETS` buckets, so memory stays bounded however
+    dense the chat is; expiry is then exact to one bucket width.
+    """
+
+    def __init__(self, size: int | None = None, span_seconds: float | None = None) -> None:
+        if (size is None) == (span_seconds is None):
+            raise ValueError("Provide exactly one of size or span_seconds")
+        self.size = size
+        self.span_seconds = span_seconds
+        self.resolution = span_seconds / TIME_WINDOW_BUCKETS if span_seconds is not None else 0.0
+        # Entries: [first_epoch, last_epoch, count, total, total_sq].
+        self.values: deque[list[float]] = deque()
+        self.n = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def push(self, epoch: float, value: float) -> None:
+        last = self.values[-1] if self.values else None
+        if last is not None and self.resolution and epoch - last[0] < self.resolution:
+            last[1] = epoch
+            last[2] += 1
+            last[3] += value
+            last[4] += value * value
+        else:
+            self.values.append([epoch, epoch, 1, value, value * value])
+        self.n += 1
+        self.total += value
+        self.total_sq += value * value
+        while self.values and self._expired(epoch):
+            _, _, count, total, total_sq = self.values.popleft()
+            self.n -= count
+            self.total -= total
+            self.total_sq -= total_sq
+
+    @property
+    def count(self) -> int:
+        return self.n
+
+    @property
+    def full(self) -> bool:
+        return self.size is None or self.n >= self.size
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.n if self.n else 0.0
+
+    @property
+    def volatility(self) -> float:
+        if self.n < 2:
+            return 0.0
+        mean = self.mean
+        return math.sqrt(max(self.total_sq / self.n - mean * mean, 0.0))
+
+    @property
+    def rate_per_hour(self) -> float:
+        if self.span_seconds is not None:
+            return self.n / (self.span_seconds / 3600)
+        duration = self.values[-1][1] - self.values[0][0] if self.values else 0.0
+        return self.n / max(duration / 3600, 1 / 60)
+
+    def to_state(self) -> dict:
+        return {"size": self.size, "span_seconds": self.span_seconds, "values": [list(item) for item in self.values]}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "RollingWindow":
+        window = cls(size=state.get("size"), span_seconds=state.get("span_seconds"))
+        for item in state.get("values", []):
+            entry = [float(item[0]), float(item[1]), int(item[2]), float(item[3]), float(item[4])]
+            window.values.append(entry)
+            window.n += entry[2]
+            window.total += entry[3]
+            window.total_sq += entry[4]
+        return window
+
+    def _expired(self, epoch: float) -> bool:
+        if self.size is not None:
+            return self.n > self.size
+        return epoch - self.values[0][1] > self.span_seconds
+
+
+def lttb(points: list[tuple], threshold: int) -> list[tuple]:
+    """Largest-Triangle-Three-Buckets downsampling on (x, y, ...) tuples, keeping the first and last point."""
+    if threshold >= len(points):
+        return list(points)
+    if threshold < 3:
+        return [points[0], points[-1]][: max(threshold, 0)]
+    sampled = [points[0]]
+    bucket_size = (len(points) - 2) / (threshold - 2)
+    anchor = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        next_end = min(int((bucket + 2) * bucket_size) + 1, len(points))
+        next_slice = points[end:next_end] or [points[-1]]
+        avg_x = sum(p[0] for p in next_slice) / len(next_slice)
+        avg_y = sum(p[1] for p in next_slice) / len(next_slice)
+        ax, ay = points[anchor][0], points[anchor][1]
+        best, best_area = start, -1.0
+        for idx in range(start, end):
+            area = abs((ax - avg_x) * (points[idx][1] - ay) - (ax - points[idx][0]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = idx, area
+        sampled.append(points[best])
+        anchor = best
+    sampled.append(points[-1])
+    return sampled
+
+
+def format_points(points: list[tuple]) -> list[dict]:
+    return [
+        {
+            "end_ts": datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat(),
+            "avg_sentiment": round(mean, 4),
+            "volatility": round(volatility, 4),
+            "message_count": count,
+            "rate_per_hour": round(rate, 3),
+        }
+        for epoch, mean, volatility, count, rate in points
+    ]
@@ -0,0 +1,130 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.daily_rollup import DailyRollup
+from app.models.message import Message
+from app.models.participant import Participant
+from app.services.analysis.features import aggregate_by_week, daily_streaks
+from app.services.analysis.sessions import choose_gap_threshold
+from app.services.analysis.sketches import LatencySketch, summarize_sketch
+
+
+def record_messages(db: Session, upload_id: str, rows: list[tuple[datetime, str]]) -> None:
+    """Fold newly ingested `(ts, participant_id)` rows into the `(upload, day, participant)` rollups.
+
+    Rows must be newer than every message already stored for the upload; call before adding them.
+    The session gap threshold is chosen on the first ingest and kept for later appends.
+    """
+    if not rows:
+        return
+    rows = sorted((_utc(ts), participant_id) for ts, participant_id in rows)
+    gap_seconds = db.scalar(select(DailyRollup.gap_seconds).where(DailyRollup.upload_id == upload_id).limit(1))
+    previous = db.execute(
+        select(Message.ts, Message.sender_id).where(Message.upload_id == upload_id).order_by(Message.ts.desc()).limit(1)
+    ).first()
+    if previous is not None and gap_seconds is None:
+        # Messages stored before rollups existed: backfill from metadata so the rollups stay complete.
+        stored = db.execute(
+            select(Message.ts, Message.sender_id).where(Message.upload_id == upload_id).order_by(Message.ts)
+        ).all()
+        rows = [(_utc(ts), sender_id) for ts, sender_id in stored] + rows
+        previous = None
+    if gap_seconds is None:
+        gap_seconds = choose_gap_threshold([(b[0] - a[0]).total_seconds() for a, b in zip(rows, rows[1:])])
+
+    first_day = rows[0][0].date()
+    rollups = {
+        (rollup.day, rollup.participant_id): rollup
+        for rollup in db.scalars(
+            select(DailyRollup).where(DailyRollup.upload_id == upload_id, DailyRollup.day >= first_day)
+        ).all()
+    }
+    sketches: dict[tuple, LatencySketch] = {}
+    previous_ts, previous_sender = (_utc(previous[0]), previous[1]) if previous is not None else (None, None)
+    for ts, participant_id in rows:
+        key = (ts.date(), participant_id)
+        rollup = rollups.get(key)
+        if rollup is None:
+            rollup = DailyRollup(
+                upload_id=upload_id,
+                day=key[0],
+                participant_id=participant_id,
+                message_count=0,
+                session_starts=0,
+                reply_count=0,
+                reply_minutes_sum=0.0,
+                reply_sketch={},
+                gap_seconds=gap_seconds,
+            )
+            db.add(rollup)
+            rollups[key] = rollup
+        rollup.message_count += 1
+        if previous_ts is None or (ts - previous_ts).total_seconds() > gap_seconds:
+            rollup.session_starts += 1
+        if previous_sender is not None and previous_sender != participant_id:
+            minutes = (ts - previous_ts).total_seconds() / 60.0
+            rollup.reply_count += 1
+            rollup.reply_minutes_sum += minutes
+            if key not in sketches:
+                sketches[key] = LatencySketch.from_dict(rollup.reply_sketch) if rollup.reply_sketch else LatencySketch()
+            sketches[key].add(minutes)
+        previous_ts, previous_sender = ts, participant_id
+
+    for key, sketch in sketches.items():
+        rollups[key].reply_sketch = sketch.to_dict()
+
+
+def rollup_timeline_metrics(db: Session, upload_id: str) -> dict | None:
+    """Chart metrics read from the rollups alone; None when the upload has no rollups."""
+    rows = db.execute(
+        select(
+            DailyRollup.day,
+            Participant.display_name,
+            DailyRollup.message_count,
+            DailyRollup.session_starts,
+            DailyRollup.reply_count,
+            DailyRollup.reply_sketch,
+            DailyRollup.gap_seconds,
+        )
+        .join(Participant, Participant.id == DailyRollup.participant_id)
+        .where(DailyRollup.upload_id == upload_id)
+        .order_by(DailyRollup.day)
+    ).all()
+    if not rows:
+        return None
+
+    per_day: dict[str, int] = {}
+    initiation_counts: dict[str, int] = {}
+    sketches: dict[str, LatencySketch] = {}
+    for day, name, message_count, session_starts, reply_count, reply_sketch, _ in rows:
+        key = day.isoformat()
+        per_day[key] = per_day.get(key, 0) + message_count
+        if session_starts:
+            initiation_counts[name] = initiation_counts.get(name, 0) + session_starts
+        if reply_count:
+            sketch = LatencySketch.from_dict(reply_sketch)
+            if name in sketches:
+                sketches[name].merge(sketch)
+            else:
+                sketches[name] = sketch
+
+    message_count = sum(per_day.values())
+    session_count = sum(initiation_counts.values())
+    return {
+        "messages_per_day": per_day,
+        "messages_per_week": dict(aggregate_by_week(per_day)),
+        "response_time_stats": {name: summarize_sketch(sketch) for name, sketch in sketches.items()},
+        "initiation_counts": initiation_counts,
+        "sessions": {
+            "gap_threshold_minutes": round(rows[0].gap_seconds / 60, 1),
+            "session_count": session_count,
+            "avg_messages_per_session": round(message_count / max(session_count, 1), 2),
+        },
+        "streaks": daily_streaks(per_day),
+    }
+
+
+def _utc(ts: datetime) -> datetime:
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
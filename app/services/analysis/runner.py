@@ -1,44 +1,111 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
 from datetime import datetime, timedelta, timezone
 
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from app.core.config import get_settings
-from app.core.security import decrypt_text
+from app.models.analysis_checkpoint import AnalysisCheckpoint
 from app.models.job import Job
 from app.models.message import Message
-from app.models.participant import Participant
 from app.models.report import Report
 from app.models.upload import Upload
-from app.services.llm import analyze_chat_with_llm
+from app.services.analysis.excerpts import store_report_excerpts
+from app.services.analysis.pipeline import load_messages, run_analysis
+from app.services.analysis.statistical import build_statistical_report
+from app.services.llm import LLMOverloadedError, LLMUnavailableError, analyze_chat_with_llm, close_openai_client
+from app.services.llm.cache import LLMResponseCache
+from app.services.llm.openai_client import PROMPT_VERSION
 
+logger = logging.getLogger(__name__)
 
-def analyze_upload_and_store(db: Session, upload_id: str, job: Job | None = None) -> dict:
+ANALYSIS_MODES = ("llm", "statistical", "hybrid")
+
+
+def analysis_version(mode: str, refresh: bool = False) -> str:
+    """Identifies what an analysis request would compute; concurrent requests with equal versions are coalesced."""
+    version = f"{mode}:{get_settings().openai_model}:{PROMPT_VERSION}"
+    return f"{version}:refresh" if refresh else version
+
+
+def analyze_upload_and_store(
+    db: Session, upload_id: str, job: Job | None = None, mode: str = "llm", refresh: bool = False
+) -> dict:
+    """Blocking entry point for workers; drives the async pipeline on a private event loop."""
+
+    async def run() -> dict:
+        try:
+            return await analyze_upload_and_store_async(db, upload_id, job=job, mode=mode, refresh=refresh)
+        finally:
+            await close_openai_client()
+
+    return asyncio.run(run())
+
+
+async def analyze_upload_and_store_async(
+    db: Session,
+    upload_id: str,
+    job: Job | None = None,
+    mode: str = "llm",
+    refresh: bool = False,
+    on_delta: Callable[[str], Awaitable[None]] | None = None,
+) -> dict:
+    """Analyze an upload and store its report. Database and CPU-bound work runs in worker threads, so the
+    event loop only awaits those and LLM calls. `on_delta` receives the streamed model output."""
+    if mode not in ANALYSIS_MODES:
+        raise ValueError(f"Unsupported analysis mode: {mode}")
+    upload = await asyncio.to_thread(_start_analysis, db, upload_id, job)
+
+    if mode == "statistical":
+        report_payload = await asyncio.to_thread(_statistical_report, db, upload_id)
+    elif mode == "llm":
+        try:
+            report_payload = await _llm_report(db, upload_id, refresh, on_delta)
+        except LLMUnavailableError as exc:
+            if isinstance(exc, LLMOverloadedError) and get_settings().llm_overload_policy == "reject":
+                raise
+            # Circuit open after repeated provider failures, or no LLM capacity: serve the local report instead.
+            logger.warning("llm_circuit_fallback", extra={"upload_id": upload_id, "error": type(exc).__name__})
+            report_payload = await asyncio.to_thread(_statistical_report, db, upload_id)
+    else:
+        try:
+            report_payload = await _llm_report(db, upload_id, refresh, on_delta)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("llm_analysis_fallback", extra={"upload_id": upload_id, "error": type(exc).__name__})
+            report_payload = await asyncio.to_thread(_statistical_report, db, upload_id)
+    if isinstance(report_payload.get("timeline"), list):
+        report_payload["timeline"] = report_payload["timeline"][:10]
+    await asyncio.to_thread(_store_report, db, upload, job, report_payload)
+    return report_payload
+
+
+def _start_analysis(db: Session, upload_id: str, job: Job | None) -> Upload:
     upload = db.scalar(select(Upload).where(Upload.id == upload_id))
     if not upload:
         raise ValueError("Upload not found")
 
-    participant_map = {
-        p.id: p.display_name
-        for p in db.scalars(select(Participant).where(Participant.upload_id == upload_id)).all()
-    }
-    rows = db.scalars(select(Message).where(Message.upload_id == upload_id).order_by(Message.ts.asc())).all()
-    normalized = [
-        {"ts": row.ts, "sender": participant_map.get(row.sender_id, "unknown"), "text": decrypt_text(row.encrypted_text)}
-        for row in rows
-    ]
-    if not normalized:
+    if not db.scalar(select(func.count(Message.id)).where(Message.upload_id == upload_id)):
         raise ValueError("No analyzable messages were found.")
 
     if job:
         job.status = "running"
         job.progress = 20
         db.add(job)
-        db.commit()
+    # Ends the read transaction so no pooled connection is held while awaiting the LLM.
+    db.commit()
+    return upload
 
-    report_payload = analyze_chat_with_llm(normalized)
-    if isinstance(report_payload.get("timeline"), list):
-        report_payload["timeline"] = report_payload["timeline"][:10]
+
+def _statistical_report(db: Session, upload_id: str) -> dict:
+    return build_statistical_report(run_analysis(db, upload_id))
+
+
+def _store_report(db: Session, upload: Upload, job: Job | None, report_payload: dict) -> None:
+    upload_id = upload.id
+    # Evidence is linked to message IDs here so highlights and context are indexed lookups on read.
+    store_report_excerpts(db, upload_id, report_payload)
 
     existing_report = db.scalar(select(Report).where(Report.upload_id == upload_id))
     if existing_report:
@@ -69,4 +136,31 @@ def analyze_upload_and_store(db: Session, upload_id: str, job: Job | None = None
         db.add(job)
 
     db.commit()
+
+
+async def _llm_report(
+    db: Session, upload_id: str, refresh: bool = False, on_delta: Callable[[str], Awaitable[None]] | None = None
+) -> dict:
+    checkpoint, summaries, messages = await asyncio.to_thread(_llm_inputs, db, upload_id)
+    response_cache = LLMResponseCache() if get_settings().llm_cache_enabled else None
+    report_payload = await analyze_chat_with_llm(
+        messages, summary_cache=summaries, response_cache=response_cache, refresh=refresh, on_delta=on_delta
+    )
+    checkpoint.llm_context_json = {"summaries": summaries}
+    db.add(checkpoint)
     return report_payload
+
+
+def _llm_inputs(db: Session, upload_id: str) -> tuple[AnalysisCheckpoint, dict[str, str], list[dict]]:
+    # Context summaries are cached per chunk on the checkpoint so appends only summarize new chunks.
+    checkpoint = db.scalar(select(AnalysisCheckpoint).where(AnalysisCheckpoint.upload_id == upload_id))
+    if checkpoint is None:
+        checkpoint = AnalysisCheckpoint(upload_id=upload_id, message_count=0, state_json={}, llm_context_json={})
+    summaries = dict((checkpoint.llm_context_json or {}).get("summaries", {}))
+    messages = _llm_input(load_messages(db, upload_id))
+    db.commit()
+    return checkpoint, summaries, messages
+
+
+def _llm_input(messages: list[dict]) -> list[dict]:
+    return [{"id": row["id"], "ts": row["ts"], "sender": row["sender_name"], "text": row["text"]} for row in messages]
@@ -9,17 +9,39 @@ DETECTOR_WEIGHTS = {
     "unresolved_future_talk": 0.8,
     "affection_distance_contradiction": 1.4,
 }
+# Key of the weighted detector score (before confidence scaling) in bootstrap intervals.
+MIXED_SIGNAL_BASE = "mixed_signal_base"
 
 
-def compute_confidence(message_count: int, covered_days: int, detector_results: list[DetectorResult]) -> float:
+def compute_confidence(
+    message_count: int,
+    covered_days: int,
+    detector_results: list[DetectorResult],
+    intervals: dict[str, list[float]] | None = None,
+) -> float:
     sample_factor = min(message_count / 100, 1.0)
     coverage_factor = min(covered_days / 30, 1.0)
+    if intervals:
+        # Score stability under session resampling replaces the detector-consistency heuristic.
+        return round((0.45 * sample_factor + 0.25 * coverage_factor + 0.30 * score_stability(intervals)), 3)
     non_zero = [r.score for r in detector_results if r.score > 0]
     consistency = min((len(non_zero) / max(len(detector_results), 1)) + (sum(non_zero) / max(len(non_zero), 1)) / 2, 1.0) if non_zero else 0.1
     return round((0.45 * sample_factor + 0.25 * coverage_factor + 0.30 * consistency), 3)
 
 
-def compute_mixed_signal_index(detector_results: list[DetectorResult], confidence: float) -> tuple[float, dict]:
+def score_stability(intervals: dict[str, list[float]]) -> float:
+    """One minus the mean detector interval width: 1.0 when resampling sessions never moves a score."""
+    widths = [high - low for name, (low, high) in intervals.items() if name != MIXED_SIGNAL_BASE]
+    if not widths:
+        return 0.0
+    return max(0.0, 1.0 - sum(widths) / len(widths))
+
+
+def compute_mixed_signal_index(
+    detector_results: list[DetectorResult],
+    confidence: float,
+    intervals: dict[str, list[float]] | None = None,
+) -> tuple[float, dict]:
     weighted_sum = 0.0
     total_weight = 0.0
     breakdown: dict[str, dict] = {}
@@ -28,7 +50,15 @@ def compute_mixed_signal_index(detector_results: list[DetectorResult], confidenc
         total_weight += weight
         weighted_sum += result.score * weight
         breakdown[result.detector] = {"score": round(result.score, 3), "weight": weight}
+        if intervals and result.detector in intervals:
+            breakdown[result.detector]["interval"] = intervals[result.detector]
     base = (weighted_sum / total_weight) if total_weight else 0.0
     index = round(base * confidence * 100, 2)
+    if intervals and MIXED_SIGNAL_BASE in intervals:
+        low, high = intervals[MIXED_SIGNAL_BASE]
+        breakdown["mixed_signal_index"] = {
+            "score": index,
+            "interval": [round(low * confidence * 100, 2), round(high * confidence * 100, 2)],
+        }
     return index, breakdown
 
@@ -0,0 +1,163 @@
+import math
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.models.conversation_session import ConversationSession
+from app.models.participant import Participant
+from app.services.analysis.types import SessionIndex, SessionSpan
+
+DEFAULT_SESSION_GAP_SECONDS = 6 * 3600
+MIN_SESSION_GAP_SECONDS = 30 * 60
+MAX_SESSION_GAP_SECONDS = 24 * 3600
+MIN_GAPS_FOR_ADAPTIVE = 20
+# Cluster centres closer than 4x apart are treated as a single gap population.
+MIN_CLUSTER_SEPARATION = math.log(4)
+
+
+def choose_gap_threshold(gaps_seconds: list[float]) -> float:
+    """Split log inter-message gaps into two clusters and return the boundary between them."""
+    values = sorted(math.log(max(gap, 1.0)) for gap in gaps_seconds)
+    n = len(values)
+    if n < MIN_GAPS_FOR_ADAPTIVE or values[0] == values[-1]:
+        return float(DEFAULT_SESSION_GAP_SECONDS)
+
+    prefix = [0.0]
+    prefix_sq = [0.0]
+    for value in values:
+        prefix.append(prefix[-1] + value)
+        prefix_sq.append(prefix_sq[-1] + value * value)
+
+    best_k = 0
+    best_cost = math.inf
+    for k in range(1, n):
+        if values[k] == values[k - 1]:
+            continue
+        left_sum, right_sum = prefix[k], prefix[n] - prefix[k]
+        cost = (prefix_sq[k] - left_sum * left_sum / k) + (prefix_sq[n] - prefix_sq[k] - right_sum * right_sum / (n - k))
+        if cost < best_cost:
+            best_k, best_cost = k, cost
+    if not best_k:
+        return float(DEFAULT_SESSION_GAP_SECONDS)
+
+    left_mean = prefix[best_k] / best_k
+    right_mean = (prefix[n] - prefix[best_k]) / (n - best_k)
+    if right_mean - left_mean < MIN_CLUSTER_SEPARATION:
+        return float(DEFAULT_SESSION_GAP_SECONDS)
+    threshold = math.exp((values[best_k - 1] + values[best_k]) / 2)
+    return float(min(max(threshold, MIN_SESSION_GAP_SECONDS), MAX_SESSION_GAP_SECONDS))
+
+
+class SessionTracker:
+    """Online session segmentation with a fixed gap threshold; spans can be checkpointed and extended."""
+
+    def __init__(self, gap_seconds: float, sessions: list[SessionSpan] | None = None, message_count: int = 0) -> None:
+        self.gap_seconds = gap_seconds
+        self.sessions = sessions or []
+        self.message_count = message_count
+
+    def update(self, row: dict) -> bool:
+        """Add the next message; return True when it starts a new session."""
+        position = self.message_count
+        self.message_count += 1
+        last = self.sessions[-1] if self.sessions else None
+        if last is not None and (row["ts"] - last.end_ts).total_seconds() <= self.gap_seconds:
+            last.end = position
+            last.end_ts = row["ts"]
+            last.last_message_id = row["id"]
+            return False
+        self.sessions.append(
+            SessionSpan(
+                seq=len(self.sessions),
+                start=position,
+                end=position,
+                start_ts=row["ts"],
+                end_ts=row["ts"],
+                first_message_id=row["id"],
+                last_message_id=row["id"],
+                initiator_id=row["sender_id"],
+                initiator_name=row["sender_name"],
+            )
+        )
+        return True
+
+    def index(self) -> SessionIndex:
+        return SessionIndex(gap_seconds=self.gap_seconds, sessions=self.sessions)
+
+    def to_state(self) -> dict:
+        # Spans are persisted in `conversation_sessions` (see `save_session_index`), not in the checkpoint.
+        return {"gap_seconds": self.gap_seconds, "message_count": self.message_count}
+
+    @classmethod
+    def from_state(cls, state: dict, sessions: list[SessionSpan]) -> "SessionTracker":
+        return cls(float(state["gap_seconds"]), sessions, int(state.get("message_count", 0)))
+
+
+def gap_threshold_for(rows: list[dict]) -> float:
+    gaps = [(rows[idx]["ts"] - rows[idx - 1]["ts"]).total_seconds() for idx in range(1, len(rows))]
+    return choose_gap_threshold(gaps)
+
+
+def segment_sessions(rows: list[dict], gap_seconds: float | None = None) -> SessionIndex:
+    """Group time-ordered message rows into sessions separated by gaps longer than the threshold."""
+    tracker = SessionTracker(gap_threshold_for(rows) if gap_seconds is None else gap_seconds)
+    for row in rows:
+        tracker.update(row)
+    return tracker.index()
+
+
+def save_session_index(db: Session, upload_id: str, index: SessionIndex, from_seq: int = 0) -> None:
+    """Persist spans from `from_seq` onwards, replacing any stored rows they supersede."""
+    db.execute(
+        delete(ConversationSession).where(ConversationSession.upload_id == upload_id, ConversationSession.seq >= from_seq)
+    )
+    db.add_all(
+        ConversationSession(
+            upload_id=upload_id,
+            seq=span.seq,
+            start_ts=span.start_ts,
+            end_ts=span.end_ts,
+            first_message_id=span.first_message_id,
+            last_message_id=span.last_message_id,
+            initiator_id=span.initiator_id,
+            message_count=span.message_count,
+            gap_seconds=index.gap_seconds,
+        )
+        for span in index.sessions[from_seq:]
+    )
+
+
+def load_session_index(db: Session, upload_id: str) -> SessionIndex | None:
+    """Rebuild the stored session index; message positions follow from the per-session counts."""
+    rows = db.scalars(
+        select(ConversationSession).where(ConversationSession.upload_id == upload_id).order_by(ConversationSession.seq)
+    ).all()
+    if not rows:
+        return None
+    names = dict(db.execute(select(Participant.id, Participant.display_name).where(Participant.upload_id == upload_id)).all())
+    sessions = []
+    position = 0
+    for seq, row in enumerate(rows):
+        if row.seq != seq:
+            return None
+        sessions.append(
+            SessionSpan(
+                seq=seq,
+                start=position,
+                end=position + row.message_count - 1,
+                start_ts=_as_utc(row.start_ts),
+                end_ts=_as_utc(row.end_ts),
+                first_message_id=row.first_message_id,
+                last_message_id=row.last_message_id,
+                initiator_id=row.initiator_id,
+                initiator_name=names.get(row.initiator_id, "unknown"),
+            )
+        )
+        position += row.message_count
+    return SessionIndex(gap_seconds=rows[0].gap_seconds, sessions=sessions)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite returns naive datetimes; stored values are UTC.
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
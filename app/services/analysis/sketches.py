@@ -0,0 +1,144 @@
+import math
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+DEFAULT_MAX_BUCKETS = 1024
+MIN_TRACKED_VALUE = 1e-3
+
+
+class LatencySketch:
+    """Mergeable log-bucketed quantile sketch for non-negative latencies (DDSketch-style).
+
+    Quantiles carry a bounded relative error, memory is capped at `max_buckets`, and two sketches
+    built with the same accuracy merge exactly, so per-upload sketches can be combined without
+    rescanning messages.
+    """
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY, max_buckets: int = DEFAULT_MAX_BUCKETS) -> None:
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets: dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, weight: int = 1) -> None:
+        value = max(float(value), 0.0)
+        if value <= MIN_TRACKED_VALUE:
+            self.zero_count += weight
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.buckets[key] = self.buckets.get(key, 0) + weight
+            if len(self.buckets) > self.max_buckets:
+                self._collapse()
+        self.count += weight
+        self.total += value * weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "LatencySketch") -> "LatencySketch":
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for key, weight in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + weight
+        while len(self.buckets) > self.max_buckets:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.0
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return max(self.min, 0.0)
+        seen = self.zero_count
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                return min(max(self._bucket_value(key), self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def histogram(self) -> list[dict]:
+        """Counts per power-of-two bucket: `upper_minutes` 1, 2, 4, ... (values at or below it)."""
+        coarse: dict[int, int] = {}
+        if self.zero_count:
+            coarse[0] = self.zero_count
+        for key, weight in self.buckets.items():
+            exponent = max(math.ceil(math.log2(self._bucket_value(key))), 0)
+            coarse[exponent] = coarse.get(exponent, 0) + weight
+        return [{"upper_minutes": 2**exponent, "count": coarse[exponent]} for exponent in sorted(coarse)]
+
+    def to_dict(self) -> dict:
+        keys = sorted(self.buckets)
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "max_buckets": self.max_buckets,
+            "keys": keys,
+            "counts": [self.buckets[key] for key in keys],
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.total,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, payload: dict) -> "LatencySketch":
+        sketch = cls(
+            relative_accuracy=float(payload.get("relative_accuracy", DEFAULT_RELATIVE_ACCURACY)),
+            max_buckets=int(payload.get("max_buckets", DEFAULT_MAX_BUCKETS)),
+        )
+        sketch.buckets = {int(k): int(c) for k, c in zip(payload.get("keys", []), payload.get("counts", []))}
+        sketch.zero_count = int(payload.get("zero_count", 0))
+        sketch.count = int(payload.get("count", 0))
+        sketch.total = float(payload.get("sum", 0.0))
+        if sketch.count:
+            sketch.min = float(payload["min"])
+            sketch.max = float(payload["max"])
+        return sketch
+
+    def _bucket_value(self, key: int) -> float:
+        return 2 * self._gamma**key / (self._gamma + 1)
+
+    def _collapse(self) -> None:
+        # Fold the two lowest buckets together; high quantiles keep their accuracy.
+        lowest, second = sorted(self.buckets)[:2]
+        self.buckets[second] += self.buckets.pop(lowest)
+
+
+def summarize_sketch(sketch: LatencySketch) -> dict:
+    return {
+        "avg_minutes": sketch.mean,
+        "median_minutes": sketch.quantile(0.5),
+        "p50_minutes": sketch.quantile(0.5),
+        "p90_minutes": sketch.quantile(0.9),
+        "p99_minutes": sketch.quantile(0.99),
+        "count": sketch.count,
+        "histogram": sketch.histogram(),
+        "sketch": sketch.to_dict(),
+    }
+
+
+def merge_response_time_stats(*stats_maps: dict[str, dict]) -> dict[str, dict]:
+    """Combine `response_time_stats` from several analyses using their serialized sketches."""
+    merged: dict[str, LatencySketch] = {}
+    for stats_map in stats_maps:
+        for sender, stats in (stats_map or {}).items():
+            sketch = LatencySketch.from_dict(stats["sketch"])
+            if sender in merged:
+                merged[sender].merge(sketch)
+            else:
+                merged[sender] = sketch
+    return {sender: summarize_sketch(sketch) for sender, sketch in merged.items()}
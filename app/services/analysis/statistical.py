@@ -0,0 +1,113 @@
+from app.services.analysis.features import analyzer
+from app.services.analysis.pipeline import label_for_detector
+
+SIGNAL_NAMES = {
+    "initiation_imbalance": "Initiation imbalance",
+    "response_latency_asymmetry": "Response latency asymmetry",
+    "warm_cold_cycles": "Warm-cold cycles",
+    "boundary_setting_language": "Boundary-setting language",
+    "unresolved_future_talk": "Unresolved future talk",
+    "affection_distance_contradiction": "Affection-distance contradiction",
+}
+RED_FLAG_DETECTORS = {
+    "warm_cold_cycles",
+    "boundary_setting_language",
+    "unresolved_future_talk",
+    "affection_distance_contradiction",
+}
+MAX_TIMELINE_ITEMS = 10
+MAX_EVIDENCE_PER_SIGNAL = 5
+MAX_EXCERPT_CHARS = 220
+
+
+def build_statistical_report(analysis: dict) -> dict:
+    """Render a local `run_analysis` result as an `LLMReport`-compatible payload."""
+    by_id = analysis.get("evidence_messages", {})
+    detectors = sorted(analysis.get("detectors", []), key=lambda d: d["score"], reverse=True)
+
+    signals: list[dict] = []
+    for detector in detectors:
+        if detector["score"] <= 0:
+            continue
+        evidence_rows = [by_id[mid] for mid in detector["evidence_ids"] if mid in by_id]
+        signals.append(
+            {
+                "name": SIGNAL_NAMES.get(detector["name"], detector["name"]),
+                "score": round(min(max(detector["score"], 0.0), 1.0), 3),
+                "explanation": detector["explanation"],
+                "evidence": [_evidence_item(row) for row in evidence_rows[:MAX_EVIDENCE_PER_SIGNAL]],
+            }
+        )
+
+    metrics = analysis.get("timeline_metrics", {})
+    return {
+        "mixed_signal_index": int(round(min(max(analysis.get("mixed_signal_index", 0.0), 0.0), 100.0))),
+        "confidence": min(max(float(analysis.get("confidence", 0.0)), 0.0), 1.0),
+        "summary": analysis.get("summary_text", ""),
+        "timeline": _timeline(by_id, detectors),
+        "stats": {
+            "initiation_percent": _initiation_percent(metrics.get("initiation_counts", {})),
+            "reply_delay_ratio": _reply_delay_ratio(metrics.get("response_time_stats", {})),
+            "red_flags": sum(1 for d in detectors if d["name"] in RED_FLAG_DETECTORS and d["score"] > 0),
+        },
+        "signals": signals,
+    }
+
+
+def _timeline(by_id: dict[str, dict], detectors: list[dict]) -> list[dict]:
+    # Strongest detectors claim timeline slots first.
+    tags_by_id: dict[str, list[str]] = {}
+    for detector in detectors:
+        if detector["score"] <= 0:
+            continue
+        for mid in detector["evidence_ids"]:
+            if mid not in by_id:
+                continue
+            tags = tags_by_id.setdefault(mid, [])
+            label = label_for_detector(detector["name"])
+            if label not in tags:
+                tags.append(label)
+    selected = list(tags_by_id)[:MAX_TIMELINE_ITEMS]
+    selected.sort(key=lambda mid: by_id[mid]["ts"])
+    return [
+        {
+            "timestamp": by_id[mid]["ts"],
+            "message": by_id[mid]["raw_text"][:MAX_EXCERPT_CHARS],
+            "tags": tags_by_id[mid][:3],
+            "type": _timeline_type(by_id[mid]["raw_text"]),
+            "message_id": mid,
+        }
+        for mid in selected
+    ]
+
+
+def _timeline_type(text: str) -> str:
+    sentiment = analyzer.polarity_scores(text)["compound"] if text else 0.0
+    if sentiment > 0.4:
+        return "warm"
+    if sentiment < -0.2:
+        return "cool"
+    return "mixed"
+
+
+def _evidence_item(row: dict) -> dict:
+    return {
+        "timestamp": row["ts"],
+        "excerpt": row["raw_text"][:MAX_EXCERPT_CHARS],
+        "sender": row["sender"],
+        "message_id": row["message_id"],
+    }
+
+
+def _initiation_percent(initiation_counts: dict[str, int]) -> float:
+    total = sum(initiation_counts.values())
+    if not total:
+        return 0.0
+    return round(max(initiation_counts.values()) / total * 100, 1)
+
+
+def _reply_delay_ratio(response_stats: dict[str, dict]) -> float:
+    averages = [stats["avg_minutes"] for stats in response_stats.values() if stats.get("count")]
+    if len(averages) < 2:
+        return 1.0
+    return round(max(averages) / max(min(averages), 1.0), 2)
@@ -18,3 +18,46 @@ class DetectorResult:
     explanation: str
     evidence_ids: list[str]
 
+
+@dataclass(slots=True)
+class SessionSpan:
+    seq: int
+    start: int
+    end: int
+    start_ts: datetime
+    end_ts: datetime
+    first_message_id: str
+    last_message_id: str
+    initiator_id: str
+    initiator_name: str
+
+    @property
+    def message_count(self) -> int:
+        return self.end - self.start + 1
+
+
+@dataclass(slots=True)
+class SessionIndex:
+    gap_seconds: float
+    sessions: list[SessionSpan]
+
+    def session_of_positions(self) -> list[int]:
+        positions: list[int] = []
+        for span in self.sessions:
+            positions.extend([span.seq] * span.message_count)
+        return positions
+
+
+@dataclass(slots=True)
+class ChangePoint:
+    session_seq: int
+    ts: datetime
+    sentiment_before: float
+    sentiment_after: float
+    engagement_before: float
+    engagement_after: float
+    evidence_ids: list[str]
+
+    @property
+    def direction(self) -> str:
+        return "warmer" if self.sentiment_after >= self.sentiment_before else "cooler"
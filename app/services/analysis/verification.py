@@ -0,0 +1,133 @@
+import logging
+import re
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+GRAM_SIZE = 5
+# Grams probed per fragment; candidates are the intersection of their posting lists.
+MAX_PROBE_GRAMS = 8
+ELLIPSIS = re.compile(r"\s*(?:\.\.\.+|…)\s*")
+QUOTES = "\"'“”‘’"
+
+
+class QuoteIndex:
+    """Character q-gram inverted index over message texts for verbatim-quote lookup.
+
+    Building is linear in total text length. A lookup intersects a few posting lists, rarest first, and
+    confirms the handful of surviving candidates with a plain substring check, so it is near-linear in
+    the quote length regardless of how many messages are indexed.
+    """
+
+    def __init__(self, messages: list[dict]) -> None:
+        self.texts = [normalize_quote(str(row.get("text", ""))) for row in messages]
+        self.postings: dict[str, list[int]] = {}
+        self.exact: dict[str, int] = {}
+        for idx, text in enumerate(self.texts):
+            self.exact.setdefault(text, idx)
+            for start in range(len(text) - GRAM_SIZE + 1):
+                posting = self.postings.setdefault(text[start : start + GRAM_SIZE], [])
+                if not posting or posting[-1] != idx:
+                    posting.append(idx)
+
+    def find(self, quote: str) -> int | None:
+        """Position of the first message containing every ellipsis-separated fragment of `quote`, else None."""
+        matches = self.find_all(quote)
+        return matches[0] if matches else None
+
+    def find_all(self, quote: str) -> list[int]:
+        """Positions, in order, of every message containing all ellipsis-separated fragments of `quote`."""
+        fragments = [part for part in ELLIPSIS.split(normalize_quote(quote)) if part]
+        if not fragments:
+            return []
+        candidates: set[int] | None = None
+        for fragment in fragments:
+            matches = self._candidates(fragment)
+            candidates = matches if candidates is None else candidates & matches
+            if not candidates:
+                return []
+        return [idx for idx in sorted(candidates) if all(fragment in self.texts[idx] for fragment in fragments)]
+
+    def _candidates(self, fragment: str) -> set[int]:
+        if len(fragment) < GRAM_SIZE:
+            # Too short to probe; only a whole message this short counts as a verbatim quote.
+            idx = self.exact.get(fragment)
+            return set() if idx is None else {idx}
+        last = len(fragment) - GRAM_SIZE
+        step = max((last + 1) // MAX_PROBE_GRAMS, 1)
+        postings = []
+        for start in {*range(0, last + 1, step)[:MAX_PROBE_GRAMS], last}:
+            posting = self.postings.get(fragment[start : start + GRAM_SIZE])
+            if not posting:
+                return set()
+            postings.append(posting)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                break
+        return candidates
+
+
+def normalize_quote(text: str) -> str:
+    return " ".join(text.split()).strip(QUOTES).casefold()
+
+
+def verify_report_evidence(report: dict, messages: list[dict], mode: str = "drop") -> dict:
+    """Map report evidence and timeline quotes to source message IDs; drop or flag evidence that matches none.
+
+    Verified items gain `verified=True` and the source row's `id` as `message_id`. Unverifiable evidence is removed in `drop` mode
+    and kept with `verified=False` in `flag` mode; timeline items are only tagged. When several messages contain the quote
+    (a repeated "ok"), the one from the item's sender nearest its timestamp wins, given rows with `ts` and `sender`.
+    """
+    index = QuoteIndex(messages)
+    checked = unverified = 0
+    for signal in report.get("signals", []):
+        kept = []
+        for item in signal.get("evidence", []):
+            checked += 1
+            position = _best_match(index.find_all(str(item.get("excerpt", ""))), item, messages)
+            item["verified"] = position is not None
+            if position is not None:
+                item["message_id"] = messages[position].get("id")
+            else:
+                unverified += 1
+                if mode == "drop":
+                    continue
+            kept.append(item)
+        signal["evidence"] = kept
+    for item in report.get("timeline", []):
+        position = _best_match(index.find_all(str(item.get("message", ""))), item, messages)
+        if position is not None:
+            item["message_id"] = messages[position].get("id")
+    logger.info("evidence_verification", extra={"checked": checked, "unverified": unverified, "mode": mode})
+    return report
+
+
+def _best_match(positions: list[int], item: dict, messages: list[dict]) -> int | None:
+    """Among messages containing the quote, prefer the item's sender, then the nearest timestamp, then the earliest."""
+    if len(positions) <= 1:
+        return positions[0] if positions else None
+    ts = _parse_ts(item.get("timestamp"))
+    sender = normalize_quote(str(item.get("sender", "")))
+
+    def rank(position: int) -> tuple:
+        row = messages[position]
+        same_sender = bool(sender) and normalize_quote(str(row.get("sender", ""))) == sender
+        row_ts = _parse_ts(row.get("ts"))
+        distance = abs((row_ts - ts).total_seconds()) if ts is not None and row_ts is not None else 0.0
+        return (not same_sender, distance, position)
+
+    return min(positions, key=rank)
+
+
+def _parse_ts(value: object) -> datetime | None:
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    return parsed.replace(tzinfo=timezone.utc) if parsed.tzinfo is None else parsed
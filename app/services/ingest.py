@@ -0,0 +1,68 @@
+from collections.abc import Iterable
+from datetime import datetime, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.security import encrypt_text
+from app.models.message import Message
+from app.models.participant import Participant
+from app.models.upload import Upload
+from app.services.analysis.rollups import record_messages
+from app.services.parsing.types import ParsedMessage
+
+
+def store_parsed_messages(
+    db: Session,
+    upload: Upload,
+    messages: Iterable[ParsedMessage],
+    participant_names: Iterable[str] = (),
+) -> int:
+    """Encrypt and add messages newer than any stored ones, creating participants and updating daily rollups.
+
+    Does not commit.
+    """
+    participants_by_name = {
+        p.display_name: p for p in db.scalars(select(Participant).where(Participant.upload_id == upload.id)).all()
+    }
+
+    def participant_for(name: str) -> Participant:
+        participant = participants_by_name.get(name)
+        if participant is None:
+            participant = Participant(upload_id=upload.id, display_name=name, normalized_id=name.lower().strip())
+            db.add(participant)
+            db.flush()
+            participants_by_name[name] = participant
+        return participant
+
+    for name in participant_names:
+        participant_for(name)
+
+    rows = [(row, row.ts.astimezone(timezone.utc), participant_for(row.sender).id) for row in messages]
+    # Rollups look at the stored tail, so they are updated before the new messages are added.
+    record_messages(db, upload.id, [(ts, sender_id) for _, ts, sender_id in rows])
+    for row, ts, sender_id in rows:
+        db.add(
+            Message(
+                upload_id=upload.id,
+                ts=ts,
+                sender_id=sender_id,
+                encrypted_text=encrypt_text(row.text),
+                metadata_json=row.metadata,
+            )
+        )
+    return len(rows)
+
+
+def latest_message_ts(db: Session, upload_id: str) -> datetime | None:
+    latest = db.scalar(select(func.max(Message.ts)).where(Message.upload_id == upload_id))
+    if latest is not None and latest.tzinfo is None:
+        latest = latest.replace(tzinfo=timezone.utc)
+    return latest
+
+
+def messages_after(messages: Iterable[ParsedMessage], cutoff: datetime | None) -> list[ParsedMessage]:
+    """Keep parsed messages strictly newer than `cutoff`, so re-sent exports only contribute their tail."""
+    if cutoff is None:
+        return list(messages)
+    return [row for row in messages if row.ts.astimezone(timezone.utc) > cutoff]
@@ -1,4 +1,4 @@
+from app.services.llm.client import LLMOverloadedError, LLMUnavailableError, close_openai_client, get_openai_client
 from app.services.llm.openai_client import analyze_chat_with_llm
 
-__all__ = ["analyze_chat_with_llm"]
-
+__all__ = ["analyze_chat_with_llm", "close_openai_client", "get_openai_client", "LLMOverloadedError", "LLMUnavailableError"]
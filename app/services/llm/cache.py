@@ -0,0 +1,89 @@
+import hashlib
+import json
+from datetime import timedelta
+from threading import Lock
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.db.session import SessionLocal
+from app.models.common import utcnow
+from app.models.llm_cache_entry import LLMCacheEntry
+
+_metrics = {"hits": 0, "misses": 0, "bypassed": 0, "stores": 0, "evictions": 0}
+_metrics_lock = Lock()
+
+
+def fingerprint(model: str, prompt_version: str, *parts: object) -> str:
+    """Cache key over the model, prompt version and the exact prompts and payload sent."""
+    body = json.dumps([model, prompt_version, *parts], ensure_ascii=True, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def cache_metrics() -> dict:
+    with _metrics_lock:
+        snapshot = dict(_metrics)
+    lookups = snapshot["hits"] + snapshot["misses"]
+    snapshot["hit_rate"] = round(snapshot["hits"] / lookups, 4) if lookups else 0.0
+    return snapshot
+
+
+def _count(name: str, amount: int = 1) -> None:
+    with _metrics_lock:
+        _metrics[name] += amount
+
+
+class LLMResponseCache:
+    """Database-backed LLM response store with TTL expiry and least-recently-used eviction past `max_entries`.
+
+    Lookups and stores each run on their own short-lived session and commit before returning, so the
+    caller's transaction is never flushed or committed as a side effect and no write stays open while the
+    caller goes on to await other work.
+    """
+
+    def __init__(self, ttl_seconds: int | None = None, max_entries: int | None = None) -> None:
+        settings = get_settings()
+        self.ttl = timedelta(seconds=settings.llm_cache_ttl_seconds if ttl_seconds is None else ttl_seconds)
+        self.max_entries = settings.llm_cache_max_entries if max_entries is None else max_entries
+
+    def get(self, key: str) -> dict | None:
+        now = utcnow()
+        with SessionLocal() as db:
+            entry = db.scalar(select(LLMCacheEntry).where(LLMCacheEntry.key == key, LLMCacheEntry.expires_at > now))
+            if entry is None:
+                _count("misses")
+                return None
+            entry.hit_count += 1
+            entry.last_used_at = now
+            response = entry.response_json
+            db.commit()
+        _count("hits")
+        return response
+
+    def put(self, key: str, model: str, response: dict) -> None:
+        now = utcnow()
+        with SessionLocal() as db:
+            entry = db.scalar(select(LLMCacheEntry).where(LLMCacheEntry.key == key))
+            if entry is None:
+                entry = LLMCacheEntry(key=key, model=model, hit_count=0)
+            entry.response_json = response
+            entry.expires_at = now + self.ttl
+            entry.last_used_at = now
+            db.add(entry)
+            db.flush()
+            self._evict(db, now)
+            db.commit()
+        _count("stores")
+
+    def bypass(self) -> None:
+        _count("bypassed")
+
+    def _evict(self, db: Session, now) -> None:
+        evicted = db.execute(delete(LLMCacheEntry).where(LLMCacheEntry.expires_at <= now)).rowcount or 0
+        excess = (db.scalar(select(func.count(LLMCacheEntry.id))) or 0) - self.max_entries
+        if excess > 0:
+            oldest = select(LLMCacheEntry.id).order_by(LLMCacheEntry.last_used_at).limit(excess)
+            evicted += db.execute(delete(LLMCacheEntry).where(LLMCacheEntry.id.in_(oldest))).rowcount or 0
+        if evicted:
+            _count("evictions", evicted)
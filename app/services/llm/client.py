@@ -0,0 +1,333 @@
+import asyncio
+import logging
+import random
+import time
+import weakref
+from collections import deque
+from threading import Lock
+
+import httpx
+from openai import APIConnectionError, APIStatusError, AsyncOpenAI
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# One client per event loop: the server runs a single loop, so this is process-wide there, while blocking
+# callers that drive the pipeline with `asyncio.run` get a client bound to their own loop.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = weakref.WeakKeyDictionary()
+_clients_lock = Lock()
+
+
+class LLMUnavailableError(RuntimeError):
+    """The circuit breaker is open; callers should take their non-LLM fallback path."""
+
+
+class LLMOverloadedError(LLMUnavailableError):
+    """The adaptive limiter's queue is full or the wait for a slot timed out."""
+
+    def __init__(self, message: str, retry_after: float) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit for provider calls, with a bounded FIFO queue for callers over the limit.
+
+    Each call that finishes within `latency_target` raises the limit by 1/limit (about +1 per round of
+    calls); a 429 halves it and a slow call trims it by 10%, at most once per observed call latency so a
+    burst of failures counts once. Waiters are futures on their own event loops, so blocking workers
+    that run the pipeline with `asyncio.run` share the same limit as the server.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        minimum: int,
+        maximum: int,
+        latency_target: float,
+        queue_max: int,
+        queue_timeout: float,
+    ) -> None:
+        self.limit = float(max(min(initial, maximum), minimum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.queue_max = queue_max
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.latency_ewma = latency_target / 2
+        self.counters = {"rejected": 0, "timeouts": 0, "decreases": 0}
+        self._waiters: deque[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self._last_decrease = 0.0
+        self._lock = Lock()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "queued": len(self._waiters),
+                "latency_ewma_seconds": round(self.latency_ewma, 3),
+                **self.counters,
+            }
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.in_flight < int(self.limit) and not self._waiters:
+                self.in_flight += 1
+                return
+            if len(self._waiters) >= self.queue_max:
+                self.counters["rejected"] += 1
+                raise LLMOverloadedError("LLM request queue is full", self._retry_after())
+            waiter = loop.create_future()
+            self._waiters.append((loop, waiter))
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            with self._lock:
+                granted = waiter.done() and not waiter.cancelled()
+                if not granted:
+                    waiter.cancel()
+                    self._waiters = deque(item for item in self._waiters if item[1] is not waiter)
+                    if isinstance(exc, asyncio.TimeoutError):
+                        self.counters["timeouts"] += 1
+                    retry_after = self._retry_after()
+            if isinstance(exc, asyncio.CancelledError):
+                if granted:
+                    # The slot arrived as the caller was cancelled; give it back.
+                    self.release()
+                raise
+            if not granted:
+                raise LLMOverloadedError("Timed out waiting for an LLM slot", retry_after) from None
+
+    def release(self, latency: float | None = None, throttled: bool = False) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if throttled:
+                self._decrease(0.5)
+            elif latency is not None:
+                self.latency_ewma = 0.8 * self.latency_ewma + 0.2 * latency
+                if latency > self.latency_target:
+                    self._decrease(0.9)
+                else:
+                    self.limit = min(self.limit + 1 / self.limit, float(self.maximum))
+            self._grant_waiters()
+
+    def _decrease(self, factor: float) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.latency_ewma:
+            return
+        self._last_decrease = now
+        self.limit = max(self.limit * factor, float(self.minimum))
+        self.counters["decreases"] += 1
+        logger.info("llm_limit_decreased", extra={"limit": round(self.limit, 2)})
+
+    def _grant_waiters(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            loop, waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            try:
+                loop.call_soon_threadsafe(self._grant, waiter)
+            except RuntimeError:
+                # The waiter's loop has closed.
+                self.in_flight -= 1
+
+    def _grant(self, waiter: asyncio.Future) -> None:
+        if waiter.done():
+            # Cancelled after the slot was handed over.
+            self.release()
+        else:
+            waiter.set_result(None)
+
+    def _retry_after(self) -> float:
+        return max(1.0, self.latency_ewma * (len(self._waiters) + 1) / max(int(self.limit), 1))
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failed calls and lets one trial call through after `reset_seconds`."""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._lock = Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            return "half_open" if time.monotonic() - self.opened_at >= self.reset_seconds else "open"
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_seconds:
+                raise LLMUnavailableError("LLM circuit is open")
+            # Half-open: admit this trial call and hold the circuit open for everyone else until it resolves.
+            self.opened_at = time.monotonic()
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning("llm_circuit_opened", extra={"failures": self.failures})
+                self.opened_at = time.monotonic()
+
+
+def _new_breaker() -> CircuitBreaker:
+    settings = get_settings()
+    return CircuitBreaker(settings.llm_circuit_failure_threshold, settings.llm_circuit_reset_seconds)
+
+
+breaker = _new_breaker()
+
+
+def _new_limiter() -> AdaptiveLimiter:
+    settings = get_settings()
+    return AdaptiveLimiter(
+        initial=settings.llm_concurrency_initial,
+        minimum=settings.llm_concurrency_min,
+        maximum=settings.llm_concurrency_max,
+        latency_target=settings.llm_latency_target_seconds,
+        queue_max=settings.llm_queue_max,
+        queue_timeout=settings.llm_queue_timeout_seconds,
+    )
+
+
+limiter = _new_limiter()
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """Shared client so connections (and TLS sessions) are pooled and kept alive across analyses."""
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        client = _clients.get(loop)
+        if client is None:
+            settings = get_settings()
+            client = AsyncOpenAI(
+                api_key=settings.openai_api_key,
+                base_url=settings.openai_base_url or None,
+                # Retries are handled by `create_with_retries` so backoff and the circuit breaker see every failure.
+                max_retries=0,
+                timeout=httpx.Timeout(settings.openai_timeout_seconds, connect=settings.openai_connect_timeout_seconds),
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=settings.openai_max_connections,
+                        max_keepalive_connections=settings.openai_max_connections,
+                        keepalive_expiry=60,
+                    )
+                ),
+            )
+            _clients[loop] = client
+        return client
+
+
+async def close_openai_client() -> None:
+    with _clients_lock:
+        client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+
+
+async def create_with_retries(client: AsyncOpenAI, **kwargs):
+    """`chat.completions.create` with jittered exponential backoff on 429, 5xx and connection errors.
+
+    Each attempt holds an adaptive-limiter slot; backoff sleeps do not. A streamed call (`stream=True`)
+    keeps its slot until the returned stream is consumed or closed, and only then reports its latency to
+    the limiter and its outcome to the breaker.
+    """
+    settings = get_settings()
+    breaker.before_call()
+    attempt = 0
+    while True:
+        await limiter.acquire()
+        started = time.monotonic()
+        try:
+            # No per-call timeout: it would replace the client's httpx.Timeout and drop its connect timeout.
+            completion = await client.chat.completions.create(**kwargs)
+        except Exception as exc:
+            throttled = isinstance(exc, APIStatusError) and exc.status_code == 429
+            limiter.release(None if throttled else time.monotonic() - started, throttled=throttled)
+            if not is_retryable(exc):
+                # The provider answered (e.g. a 400), so it is reachable.
+                breaker.record_success()
+                raise
+            if attempt >= settings.openai_max_retries:
+                breaker.record_failure()
+                raise
+            delay = _backoff_seconds(attempt, exc)
+            logger.info("llm_retry", extra={"attempt": attempt + 1, "delay_seconds": round(delay, 3), "error": type(exc).__name__})
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        except BaseException:
+            limiter.release()
+            raise
+        if kwargs.get("stream"):
+            return _held_stream(completion, started)
+        limiter.release(time.monotonic() - started)
+        breaker.record_success()
+        return completion
+
+
+async def _held_stream(stream, started: float):
+    """Yield from `stream`, releasing its limiter slot once it ends, fails or is closed early."""
+    try:
+        async for chunk in stream:
+            yield chunk
+    except Exception as exc:
+        limiter.release(time.monotonic() - started)
+        if is_retryable(exc):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+    except BaseException:
+        limiter.release()
+        raise
+    else:
+        limiter.release(time.monotonic() - started)
+        breaker.record_success()
+    finally:
+        # OpenAI's AsyncStream closes its response with `close`; plain async generators use `aclose`.
+        close = getattr(stream, "close", None) or getattr(stream, "aclose", None)
+        if close is not None:
+            await close()
+
+
+def is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, APIStatusError):
+        return exc.status_code == 429 or exc.status_code >= 500
+    return isinstance(exc, APIConnectionError)
+
+
+def _backoff_seconds(attempt: int, exc: Exception) -> float:
+    settings = get_settings()
+    ceiling = min(settings.openai_backoff_max_seconds, settings.openai_backoff_base_seconds * 2**attempt)
+    retry_after = _retry_after(exc)
+    if retry_after is not None:
+        return min(retry_after, settings.openai_backoff_max_seconds)
+    # Full jitter spreads retries from concurrent analyses instead of synchronizing them.
+    return random.uniform(0, ceiling)
+
+
+def _retry_after(exc: Exception) -> float | None:
+    response = getattr(exc, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
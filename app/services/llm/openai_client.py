@@ -1,86 +1,266 @@
+import asyncio
+import copy
+import hashlib
 import json
+import logging
+from collections.abc import Awaitable, Callable
+from contextlib import aclosing
 from datetime import datetime, timezone
 
-from openai import OpenAI
+from openai import AsyncOpenAI
 from pydantic import ValidationError
 
 from app.core.config import get_settings
 from app.schemas.llm_report import LLMReport
+from app.services.analysis.evidence import select_evidence_messages
+from app.services.analysis.verification import verify_report_evidence
+from app.services.llm.cache import LLMResponseCache, fingerprint
+from app.services.llm.client import create_with_retries, get_openai_client
+from app.services.llm.repair import record_repair_outcome, repair_model
+from app.services.llm.tokens import clip_to_tokens, estimate_chat_tokens, estimate_json_tokens, estimate_tokens
 
-RECENT_VERBATIM_MESSAGES = 120
-MAX_VERBATIM_TEXT_CHARS = 600
+logger = logging.getLogger(__name__)
 
+# Share of the verbatim token budget reserved for the most recent messages.
+RECENT_ANCHOR_SHARE = 0.25
+CONTEXT_SUMMARY_MIN_MESSAGES = 200
+SUMMARY_CHUNK_TOKENS = 6000
+SUMMARY_REDUCE_FANIN = 8
+MAX_CONTEXT_SUMMARY_CHARS = 3000
+# Per-message caps: verbatim messages and the compact rows sent for summarization.
+MAX_MESSAGE_TOKENS = 160
+SUMMARY_MESSAGE_TOKENS = 60
+# Bump when report post-processing changes in a way that should invalidate cached responses.
+PROMPT_VERSION = "1"
 
-def analyze_chat_with_llm(messages: list[dict]) -> dict:
+SYSTEM_PROMPT = (
+    "You analyze relationship communication patterns in chat logs. "
+    "Use evidence only from provided messages. Do not invent quotes. "
+    "Do not diagnose people and do not predict outcomes."
+)
+DEVELOPER_PROMPT = (
+    "Return JSON only. Match this exact schema with correct types: "
+    "{mixed_signal_index:int(0..100), confidence:float(0..1), summary:str(2-4 sentences), "
+    "timeline:[{timestamp:ISO8601,message:str,tags:[str],type:warm|cool|mixed}] max 10 items, "
+    "stats:{initiation_percent:number,reply_delay_ratio:number,red_flags:int}, "
+    "signals:[{name:str,score:0..1,explanation:str,evidence:[{timestamp:ISO8601,excerpt:str,sender:str}]}]}. "
+    "Evidence excerpts must be direct text from provided messages. "
+    "Timeline must contain AT MOST 10 items; if more candidates exist, include only the most significant moments."
+)
+# Prompts, chat framing and the payload's non-message fields; the reserve leaves room for the older-context summary.
+FIXED_PROMPT_TOKENS = estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(DEVELOPER_PROMPT) + 120
+SUMMARY_RESERVE_TOKENS = MAX_CONTEXT_SUMMARY_CHARS // 3
+
+
+async def analyze_chat_with_llm(
+    messages: list[dict],
+    summary_cache: dict[str, str] | None = None,
+    response_cache: LLMResponseCache | None = None,
+    refresh: bool = False,
+    on_delta: Callable[[str], Awaitable[None]] | None = None,
+) -> dict:
+    """Analyze normalized `{ts, sender, text}` messages; an optional `id` is attached to verified evidence.
+
+    `summary_cache` maps chunk content hashes to earlier context summaries; it is updated in place so
+    callers can persist it and only new or changed chunks are summarized on the next run.
+    `response_cache` serves an identical earlier request without calling the model; `refresh` skips the
+    lookup but still stores the fresh response. CPU-bound steps (evidence ranking, chunking, quote
+    verification) and cache reads and writes run in worker threads so the event loop only awaits I/O.
+    With `on_delta` the report completion is streamed and each text delta is awaited on it as it arrives.
+    """
     settings = get_settings()
     if not settings.openai_api_key:
         raise ValueError("OPENAI_API_KEY is not configured.")
 
-    client = OpenAI(api_key=settings.openai_api_key)
-    compressed_context = _compress_context(client, messages, settings.openai_model)
-    payload = _build_analysis_payload(messages, compressed_context)
+    client = get_openai_client()
+    selected = await asyncio.to_thread(_select_verbatim, messages, context_budget_tokens(settings.openai_model))
+    compressed_context = await _compress_context(client, messages, selected, settings.openai_model, summary_cache)
+    payload = _build_analysis_payload(messages, selected, compressed_context)
 
-    system_prompt = (
-        "You analyze relationship communication patterns in chat logs. "
-        "Use evidence only from provided messages. Do not invent quotes. "
-        "Do not diagnose people and do not predict outcomes."
-    )
-    developer_prompt = (
-        "Return JSON only. Match this exact schema with correct types: "
-        "{mixed_signal_index:int(0..100), confidence:float(0..1), summary:str(2-4 sentences), "
-        "timeline:[{timestamp:ISO8601,message:str,tags:[str],type:warm|cool|mixed}] max 10 items, "
-        "stats:{initiation_percent:number,reply_delay_ratio:number,red_flags:int}, "
-        "signals:[{name:str,score:0..1,explanation:str,evidence:[{timestamp:ISO8601,excerpt:str,sender:str}]}]}. "
-        "Evidence excerpts must be direct text from provided messages. "
-        "Timeline must contain AT MOST 10 items; if more candidates exist, include only the most significant moments."
-    )
+    key = fingerprint(settings.openai_model, PROMPT_VERSION, SYSTEM_PROMPT, DEVELOPER_PROMPT, payload)
+    normalized = None
+    if response_cache is not None:
+        if refresh:
+            response_cache.bypass()
+        else:
+            normalized = await asyncio.to_thread(response_cache.get, key)
+    if normalized is None:
+        normalized = await _request_report(client, settings.openai_model, payload, on_delta)
+        if response_cache is not None:
+            await asyncio.to_thread(response_cache.put, key, settings.openai_model, normalized)
+
+    # Quotes must come from the verbatim messages the model was shown; verified per run since message IDs
+    # are not part of the cache key.
+    sent = [
+        {"id": messages[idx].get("id"), "text": row["text"], "ts": row["timestamp"], "sender": row["sender"]}
+        for idx, row in zip(selected, payload["messages"])
+    ]
+    return await asyncio.to_thread(verify_report_evidence, copy.deepcopy(normalized), sent, settings.evidence_verification_mode)
 
-    raw = _request_json(
+
+async def _request_report(
+    client: AsyncOpenAI, model: str, payload: dict, on_delta: Callable[[str], Awaitable[None]] | None = None
+) -> dict:
+    raw = await _request_json(
         client=client,
-        model=settings.openai_model,
-        system_prompt=system_prompt,
-        developer_prompt=developer_prompt,
+        model=model,
+        system_prompt=SYSTEM_PROMPT,
+        developer_prompt=DEVELOPER_PROMPT,
         user_payload=payload,
+        on_delta=on_delta,
     )
 
     raw = _enforce_timeline_limit(raw)
     try:
         report = LLMReport.model_validate(raw)
+        record_repair_outcome("valid")
     except ValidationError:
-        repaired = _request_json_repair(client, settings.openai_model, raw)
-        repaired = _enforce_timeline_limit(repaired)
-        report = LLMReport.model_validate(repaired)
+        # Most failures are mechanical (types, bounds, missing fields); only ask the model when those fixes are not enough.
+        report = await asyncio.to_thread(repair_model, LLMReport, raw)
+        if report is not None:
+            record_repair_outcome("repaired_locally")
+        else:
+            record_repair_outcome("llm_repairs")
+            repaired = await _request_json_repair(client, model, raw)
+            repaired = _enforce_timeline_limit(repaired)
+            try:
+                report = LLMReport.model_validate(repaired)
+            except ValidationError:
+                record_repair_outcome("failed")
+                raise
 
     normalized = report.model_dump(mode="json")
     normalized["timeline"] = normalized["timeline"][:10]
     return normalized
 
 
-def _compress_context(client: OpenAI, messages: list[dict], model: str) -> str | None:
-    if len(messages) <= RECENT_VERBATIM_MESSAGES:
+async def _compress_context(
+    client: AsyncOpenAI,
+    messages: list[dict],
+    selected: list[int],
+    model: str,
+    summary_cache: dict[str, str] | None = None,
+) -> str | None:
+    """Map-reduce summary of the messages not sent verbatim.
+
+    Older history is cut into token-bounded chunks that are summarized concurrently; partial summaries are
+    then merged in groups until they fit the context budget. Every map and reduce result is cached by the
+    hash of its input, so after an append only the new chunks and the merges above them are recomputed.
+    """
+    # Selected messages are sent verbatim; only a large remainder is worth summarization calls.
+    chosen = set(selected)
+    if len(messages) - len(chosen) < CONTEXT_SUMMARY_MIN_MESSAGES:
         return None
 
-    older = messages[:-RECENT_VERBATIM_MESSAGES]
-    compact = [
-        {
-            "timestamp": _to_iso(row.get("ts")),
-            "sender": str(row.get("sender", ""))[:80],
-            "text": str(row.get("text", ""))[:220],
-        }
-        for row in older
-    ]
-    completion = client.chat.completions.create(
+    cache = summary_cache if summary_cache is not None else {}
+    used: dict[str, str] = {}
+    chunks = await asyncio.to_thread(_summary_chunks, messages, chosen)
+    bodies = [json.dumps({"messages": chunk}, ensure_ascii=True) for chunk in chunks]
+    parts = await _cached_map(client, model, bodies, _summarize_chunk, cache, used)
+    while len(parts) > 1 and sum(len(part) for part in parts) > MAX_CONTEXT_SUMMARY_CHARS:
+        groups = [parts[idx : idx + SUMMARY_REDUCE_FANIN] for idx in range(0, len(parts), SUMMARY_REDUCE_FANIN)]
+        bodies = [json.dumps({"partial_summaries": group}, ensure_ascii=True) for group in groups]
+        parts = await _cached_map(client, model, bodies, _merge_summaries, cache, used)
+
+    if summary_cache is not None:
+        summary_cache.clear()
+        summary_cache.update(used)
+    per_part = max(MAX_CONTEXT_SUMMARY_CHARS // max(len(parts), 1), 200)
+    return " ".join(part[:per_part] for part in parts)[:MAX_CONTEXT_SUMMARY_CHARS]
+
+
+def _summary_chunks(messages: list[dict], chosen: set[int]) -> list[list[dict]]:
+    # Boundaries are cut greedily over every message, not just the unchosen ones, so they depend only on the
+    # chat prefix: appends and shifts in the verbatim selection leave earlier chunks (and their cache keys)
+    # intact unless a chunk's own chosen rows change. Chosen rows are dropped inside each chunk afterwards.
+    chunks: list[list[dict]] = [[]]
+    tokens = 0
+    for idx, message in enumerate(messages):
+        row = _message_row(message, SUMMARY_MESSAGE_TOKENS)
+        cost = estimate_json_tokens(row)
+        if tokens and tokens + cost > SUMMARY_CHUNK_TOKENS:
+            chunks.append([])
+            tokens = 0
+        tokens += cost
+        if idx not in chosen:
+            chunks[-1].append(row)
+    return [chunk for chunk in chunks if chunk]
+
+
+async def _cached_map(
+    client: AsyncOpenAI,
+    model: str,
+    bodies: list[str],
+    summarize: Callable[[AsyncOpenAI, str, str], Awaitable[str]],
+    cache: dict[str, str],
+    used: dict[str, str],
+) -> list[str]:
+    """Summarize `bodies` in order, calling the model concurrently only for bodies not already in `cache`."""
+    keys = [hashlib.sha256(f"{model}\n{body}".encode("utf-8")).hexdigest() for body in bodies]
+    missing = {key: body for key, body in zip(keys, bodies) if key not in cache}
+    if missing:
+        slots = asyncio.Semaphore(max(get_settings().summary_concurrency, 1))
+
+        async def run(body: str) -> str:
+            async with slots:
+                return await summarize(client, model, body)
+
+        results = await asyncio.gather(*(run(body) for body in missing.values()))
+        cache.update(zip(missing, results))
+    for key in keys:
+        used[key] = cache[key]
+    return [cache[key] for key in keys]
+
+
+async def _create_completion(client: AsyncOpenAI, model: str, messages: list[dict], **kwargs):
+    estimated = estimate_chat_tokens(messages)
+    completion = await create_with_retries(client, model=model, messages=messages, **kwargs)
+    usage = getattr(completion, "usage", None)
+    logger.info(
+        "llm_prompt_tokens",
+        extra={"model": model, "estimated_prompt_tokens": estimated, "actual_prompt_tokens": getattr(usage, "prompt_tokens", None)},
+    )
+    return completion
+
+
+async def _stream_completion(
+    client: AsyncOpenAI, model: str, messages: list[dict], on_delta: Callable[[str], Awaitable[None]], **kwargs
+) -> str:
+    estimated = estimate_chat_tokens(messages)
+    stream = await create_with_retries(
+        client, model=model, messages=messages, stream=True, stream_options={"include_usage": True}, **kwargs
+    )
+    parts: list[str] = []
+    usage = None
+    # Closed explicitly so an early exit returns the limiter slot the stream holds.
+    async with aclosing(stream):
+        async for chunk in stream:
+            usage = getattr(chunk, "usage", None) or usage
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                await on_delta(delta)
+    logger.info(
+        "llm_prompt_tokens",
+        extra={"model": model, "estimated_prompt_tokens": estimated, "actual_prompt_tokens": getattr(usage, "prompt_tokens", None)},
+    )
+    return "".join(parts)
+
+
+async def _summarize_chunk(client: AsyncOpenAI, model: str, body: str) -> str:
+    completion = await _create_completion(
+        client,
         model=model,
         response_format={"type": "json_object"},
         messages=[
             {
                 "role": "system",
                 "content": (
-                    "Summarize older chat context without adding new content. "
+                    "Summarize chat context that is not quoted verbatim without adding new content. "
                     "Output JSON with keys summary and notable_events (array of short bullet strings)."
                 ),
             },
-            {"role": "user", "content": json.dumps({"messages": compact}, ensure_ascii=True)},
+            {"role": "user", "content": body},
         ],
     )
     content = completion.choices[0].message.content or "{}"
@@ -88,46 +268,82 @@ def _compress_context(client: OpenAI, messages: list[dict], model: str) -> str |
     summary = str(data.get("summary", "")).strip()
     notable = data.get("notable_events", [])
     notable_text = "; ".join(str(item) for item in notable[:8])
-    merged = summary if not notable_text else f"{summary} Notable events: {notable_text}"
-    return merged[:3000]
-
-
-def _build_analysis_payload(messages: list[dict], compressed_context: str | None) -> dict:
-    recent = messages[-RECENT_VERBATIM_MESSAGES:]
-    recent_payload = [
-        {
-            "timestamp": _to_iso(row.get("ts")),
-            "sender": str(row.get("sender", ""))[:80],
-            "text": str(row.get("text", ""))[:MAX_VERBATIM_TEXT_CHARS],
-        }
-        for row in recent
-    ]
+    return summary if not notable_text else f"{summary} Notable events: {notable_text}"
+
+
+async def _merge_summaries(client: AsyncOpenAI, model: str, body: str) -> str:
+    completion = await _create_completion(
+        client,
+        model=model,
+        messages=[
+            {
+                "role": "system",
+                "content": (
+                    "Merge these summaries of consecutive chat segments, oldest first, into one concise summary. "
+                    "Keep notable events and shifts in tone; do not add new content. Return plain text."
+                ),
+            },
+            {"role": "user", "content": body},
+        ],
+    )
+    return (completion.choices[0].message.content or "").strip()
+
+
+def _message_row(message: dict, max_text_tokens: int) -> dict:
+    return {
+        "timestamp": _to_iso(message.get("ts")),
+        "sender": str(message.get("sender", ""))[:80],
+        "text": clip_to_tokens(str(message.get("text", "")), max_text_tokens),
+    }
+
+
+def _select_verbatim(messages: list[dict], budget_tokens: int) -> list[int]:
+    """Most recent and highest-value messages whose estimated payload tokens fit the budget."""
+    verbatim_budget = max(budget_tokens - FIXED_PROMPT_TOKENS - SUMMARY_RESERVE_TOKENS, MAX_MESSAGE_TOKENS)
+    return select_evidence_messages(
+        messages,
+        verbatim_budget,
+        verbatim_budget * RECENT_ANCHOR_SHARE,
+        cost=lambda message: estimate_json_tokens(_message_row(message, MAX_MESSAGE_TOKENS)) + 1,
+    )
+
+
+def context_budget_tokens(model: str) -> int:
+    settings = get_settings()
+    return settings.llm_model_context_budgets.get(model, settings.llm_context_budget_tokens)
+
+
+def _build_analysis_payload(messages: list[dict], selected: list[int], compressed_context: str | None) -> dict:
+    verbatim_payload = [_message_row(messages[idx], MAX_MESSAGE_TOKENS) for idx in selected]
     return {
         "context_policy": {
             "compressed_older_context": bool(compressed_context),
-            "recent_verbatim_messages": len(recent_payload),
+            "verbatim_messages": len(verbatim_payload),
+            "omitted_messages": len(messages) - len(verbatim_payload),
+            "selection": "detector-ranked evidence with neighbouring context plus the most recent messages",
         },
         "older_context_summary": compressed_context,
-        "recent_messages": recent_payload,
+        "messages": verbatim_payload,
     }
 
 
-def _request_json(
-    client: OpenAI,
+async def _request_json(
+    client: AsyncOpenAI,
     model: str,
     system_prompt: str,
     developer_prompt: str,
     user_payload: dict,
+    on_delta: Callable[[str], Awaitable[None]] | None = None,
 ) -> dict:
-    completion = client.chat.completions.create(
-        model=model,
-        response_format={"type": "json_object"},
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "system", "content": developer_prompt},
-            {"role": "user", "content": json.dumps(user_payload, ensure_ascii=True)},
-        ],
-    )
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "system", "content": developer_prompt},
+        {"role": "user", "content": json.dumps(user_payload, ensure_ascii=True)},
+    ]
+    if on_delta is not None:
+        content = await _stream_completion(client, model, messages, on_delta, response_format={"type": "json_object"})
+        return json.loads(content or "{}")
+    completion = await _create_completion(client, model=model, response_format={"type": "json_object"}, messages=messages)
     content = completion.choices[0].message.content or "{}"
     return json.loads(content)
 
@@ -138,8 +354,9 @@ def _enforce_timeline_limit(payload: dict) -> dict:
     return payload
 
 
-def _request_json_repair(client: OpenAI, model: str, invalid_json: dict) -> dict:
-    completion = client.chat.completions.create(
+async def _request_json_repair(client: AsyncOpenAI, model: str, invalid_json: dict) -> dict:
+    completion = await _create_completion(
+        client,
         model=model,
         response_format={"type": "json_object"},
         messages=[
@@ -0,0 +1,211 @@
+import logging
+import math
+import re
+import types
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Literal, Union, get_args, get_origin
+
+from annotated_types import Ge, Le, MaxLen
+from pydantic import BaseModel, ValidationError
+from pydantic.fields import FieldInfo
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_FORMATS = (
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y/%m/%d %H:%M:%S",
+    "%Y/%m/%d %H:%M",
+    "%Y-%m-%d",
+    "%m/%d/%Y %H:%M",
+    "%m/%d/%Y %I:%M %p",
+    "%d/%m/%Y %H:%M",
+    "%b %d, %Y %H:%M",
+    "%b %d, %Y %I:%M %p",
+)
+NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+# Epoch values above this are taken to be milliseconds.
+EPOCH_MILLIS_THRESHOLD = 1e11
+
+_metrics = {"valid": 0, "repaired_locally": 0, "llm_repairs": 0, "failed": 0}
+_fixes = {"coerced": 0, "clamped": 0, "defaulted": 0, "dropped": 0}
+_metrics_lock = Lock()
+
+
+class _Invalid(Exception):
+    """The value cannot be repaired; the enclosing list item is dropped or the whole repair fails."""
+
+
+def repair_metrics() -> dict:
+    with _metrics_lock:
+        return {**_metrics, "fixes": dict(_fixes)}
+
+
+def record_repair_outcome(outcome: str) -> None:
+    with _metrics_lock:
+        _metrics[outcome] += 1
+
+
+def repair_model(model: type[BaseModel], raw: object) -> BaseModel | None:
+    """Deterministically repair `raw` against `model`'s schema, or None if it cannot be made valid.
+
+    Walks the field annotations and constraints: numbers are coerced from strings and floats and clamped
+    into `ge`/`le` bounds, literals are matched case-insensitively, timestamps are parsed from common
+    non-ISO formats and epochs, missing required scalars get zero values, lists are truncated to
+    `max_length` and list items that cannot be repaired are dropped.
+    """
+    fixes = dict.fromkeys(_fixes, 0)
+    try:
+        repaired = model.model_validate(_repair_object(model, raw, fixes))
+    except (_Invalid, ValidationError):
+        return None
+    with _metrics_lock:
+        for name, count in fixes.items():
+            _fixes[name] += count
+    logger.info("llm_local_repair", extra={"model": model.__name__, **fixes})
+    return repaired
+
+
+def _repair_object(model: type[BaseModel], raw: object, fixes: dict) -> dict:
+    if not isinstance(raw, dict):
+        raise _Invalid(model.__name__)
+    repaired = {}
+    for name, field in model.model_fields.items():
+        value = raw.get(name)
+        if value is None and not field.is_required():
+            continue
+        try:
+            repaired[name] = _repair_value(field.annotation, field, value, fixes)
+        except _Invalid:
+            if field.is_required():
+                raise
+            fixes["defaulted"] += 1
+    return repaired
+
+
+def _repair_value(annotation: object, field: FieldInfo | None, value: object, fixes: dict) -> object:
+    origin = get_origin(annotation)
+    if origin in (Union, types.UnionType):
+        options = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if value is None and len(options) < len(get_args(annotation)):
+            return None
+        return _repair_value(options[0], field, value, fixes)
+    if origin is Literal:
+        return _repair_literal(get_args(annotation), field, value, fixes)
+    if origin is list:
+        return _repair_list(get_args(annotation)[0], field, value, fixes)
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _repair_object(annotation, {} if value is None else value, fixes)
+    if annotation is datetime:
+        return _repair_timestamp(value, fixes)
+    if annotation in (int, float):
+        return _repair_number(annotation, field, value, fixes)
+    if annotation is str:
+        if value is None:
+            fixes["defaulted"] += 1
+            return ""
+        if not isinstance(value, str):
+            fixes["coerced"] += 1
+            return str(value)
+        return value
+    if annotation is bool:
+        return bool(value)
+    return value
+
+
+def _repair_literal(choices: tuple, field: FieldInfo | None, value: object, fixes: dict) -> object:
+    if value in choices:
+        return value
+    folded = str(value or "").strip().casefold()
+    for choice in choices:
+        if str(choice).casefold() == folded:
+            fixes["coerced"] += 1
+            return choice
+    if field is not None and not field.is_required():
+        fixes["defaulted"] += 1
+        return field.get_default(call_default_factory=True)
+    raise _Invalid(f"{value!r} is not one of {choices}")
+
+
+def _repair_list(item_type: object, field: FieldInfo | None, value: object, fixes: dict) -> list:
+    if value is None:
+        fixes["defaulted"] += 1
+        return []
+    if not isinstance(value, list):
+        value = [value]
+        fixes["coerced"] += 1
+    items = []
+    for item in value:
+        try:
+            items.append(_repair_value(item_type, None, item, fixes))
+        except _Invalid:
+            fixes["dropped"] += 1
+    limit = _constraint(field, MaxLen, "max_length")
+    if limit is not None and len(items) > limit:
+        fixes["dropped"] += len(items) - limit
+        items = items[:limit]
+    return items
+
+
+def _repair_number(kind: type, field: FieldInfo | None, value: object, fixes: dict) -> int | float:
+    if value is None:
+        fixes["defaulted"] += 1
+        number = 0.0
+    elif isinstance(value, bool):
+        raise _Invalid("boolean is not a number")
+    elif isinstance(value, (int, float)):
+        number = float(value)
+    else:
+        match = NUMBER.search(str(value))
+        if match is None:
+            raise _Invalid(f"{value!r} is not a number")
+        number = float(match.group())
+        fixes["coerced"] += 1
+    if not math.isfinite(number):
+        raise _Invalid("non-finite number")
+    low, high = _constraint(field, Ge, "ge"), _constraint(field, Le, "le")
+    if high is not None and high <= 1 and 1 < number <= 100 and str(value).strip().endswith("%"):
+        # "80%" for a 0..1 score.
+        number /= 100
+    clamped = min(max(number, low if low is not None else number), high if high is not None else number)
+    if clamped != number:
+        fixes["clamped"] += 1
+    if kind is int:
+        if clamped != int(clamped):
+            fixes["coerced"] += 1
+        return int(round(clamped))
+    return clamped
+
+
+def _repair_timestamp(value: object, fixes: dict) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        seconds = value / 1000 if value > EPOCH_MILLIS_THRESHOLD else value
+        fixes["coerced"] += 1
+        return datetime.fromtimestamp(seconds, tz=timezone.utc)
+    raw = str(value or "").strip()
+    if not raw:
+        raise _Invalid("missing timestamp")
+    try:
+        return datetime.fromisoformat(raw.replace("Z", "+00:00"))
+    except ValueError:
+        pass
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            parsed = datetime.strptime(raw, fmt).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+        fixes["coerced"] += 1
+        return parsed
+    raise _Invalid(f"unparseable timestamp {raw!r}")
+
+
+def _constraint(field: FieldInfo | None, kind: type, attribute: str) -> float | None:
+    if field is None:
+        return None
+    for item in field.metadata:
+        if isinstance(item, kind):
+            return getattr(item, attribute)
+    return None
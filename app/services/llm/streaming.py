@@ -0,0 +1,78 @@
+import json
+
+
+class JSONFieldStream:
+    """Incremental parser for a streamed JSON object that yields each top-level member once its value is complete.
+
+    Each chunk is scanned once as it arrives, tracking nesting and string state, and only the text of the member
+    still being read is kept, so the cost over a whole response is linear. Anything before the opening brace
+    (such as a code fence) is ignored.
+    """
+
+    def __init__(self) -> None:
+        # Unconsumed tail: the text from offset `_pending_start` on, kept while a key or value is still open.
+        self._pending: list[str] = []
+        self._pending_start = 0
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._key_start: int | None = None
+        self._key: str | None = None
+        self._value_start: int | None = None
+
+    def feed(self, chunk: str) -> list[tuple[str, object]]:
+        self._pending.append(chunk)
+        fields: list[tuple[str, object]] = []
+        for pos, char in enumerate(chunk, start=self._pos):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._value_start is None and self._key_start is not None:
+                        self._key = json.loads(self._slice(self._key_start, pos + 1))
+                        self._key_start = None
+                continue
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._value_start is None:
+                    self._key_start = pos
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit(pos, fields)
+            elif char == ":" and self._depth == 1 and self._value_start is None:
+                self._value_start = pos + 1
+            elif char == "," and self._depth == 1:
+                self._emit(pos, fields)
+        self._pos += len(chunk)
+        self._trim()
+        return fields
+
+    def _slice(self, start: int, end: int) -> str:
+        if len(self._pending) > 1:
+            self._pending = ["".join(self._pending)]
+        return self._pending[0][start - self._pending_start : end - self._pending_start]
+
+    def _trim(self) -> None:
+        # Drop text before the earliest open key or value; joining only when the start moves keeps this linear.
+        keep = min((start for start in (self._key_start, self._value_start) if start is not None), default=self._pos)
+        if keep == self._pending_start:
+            return
+        tail = "".join(self._pending)[keep - self._pending_start :]
+        self._pending = [tail] if tail else []
+        self._pending_start = keep
+
+    def _emit(self, end: int, fields: list[tuple[str, object]]) -> None:
+        if self._key is not None and self._value_start is not None:
+            try:
+                fields.append((self._key, json.loads(self._slice(self._value_start, end))))
+            except ValueError:
+                pass
+        self._key = None
+        self._value_start = None
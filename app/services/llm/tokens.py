@@ -0,0 +1,50 @@
+import json
+import math
+import re
+
+# GPT-style pre-tokenization: contractions, letter runs with an optional leading space, short digit groups,
+# punctuation runs and whitespace. Each piece is then priced with per-class averages of byte-pair merges.
+PIECES = re.compile(r"'(?:s|t|re|ve|m|ll|d)| ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+|\s+", re.IGNORECASE)
+ASCII_CHARS_PER_TOKEN = 6
+NON_ASCII_BYTES_PER_TOKEN = 3
+PUNCTUATION_CHARS_PER_TOKEN = 2
+# Role and framing tokens the chat format adds around each message.
+CHAT_MESSAGE_OVERHEAD = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate BPE token count of `text` without a tokenizer; typically within ~10% for English chat."""
+    total = 0
+    for match in PIECES.finditer(text):
+        piece = match.group().lstrip(" ") or match.group()
+        if piece.isspace():
+            total += 1
+        elif piece[0].isdigit():
+            total += 1
+        elif piece.isalpha():
+            if piece.isascii():
+                total += math.ceil(len(piece) / ASCII_CHARS_PER_TOKEN)
+            else:
+                total += math.ceil(len(piece.encode("utf-8")) / NON_ASCII_BYTES_PER_TOKEN)
+        elif piece.isascii():
+            total += math.ceil(len(piece) / PUNCTUATION_CHARS_PER_TOKEN)
+        else:
+            total += math.ceil(len(piece.encode("utf-8")) / PUNCTUATION_CHARS_PER_TOKEN)
+    return total
+
+
+def estimate_json_tokens(value: object) -> int:
+    return estimate_tokens(json.dumps(value, ensure_ascii=True))
+
+
+def estimate_chat_tokens(messages: list[dict]) -> int:
+    return sum(estimate_tokens(str(message.get("content", ""))) + CHAT_MESSAGE_OVERHEAD for message in messages)
+
+
+def clip_to_tokens(text: str, max_tokens: int) -> str:
+    """Longest prefix of `text` (by proportional cut) whose estimate fits `max_tokens`."""
+    estimate = estimate_tokens(text)
+    while estimate > max_tokens and text:
+        text = text[: max(int(len(text) * max_tokens / estimate) - 1, 0)]
+        estimate = estimate_tokens(text)
+    return text
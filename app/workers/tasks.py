@@ -10,13 +10,13 @@ from app.services.retention import run_retention_cleanup
 logger = logging.getLogger(__name__)
 
 
-def analyze_upload_job(job_id: str) -> None:
+def analyze_upload_job(job_id: str, mode: str = "llm") -> None:
     db = SessionLocal()
     try:
         job = db.scalar(select(Job).where(Job.id == job_id))
         if not job:
             return
-        analyze_upload_and_store(db, job.upload_id, job=job)
+        analyze_upload_and_store(db, job.upload_id, job=job, mode=mode)
     except Exception as exc:  # noqa: BLE001
         logger.exception("analysis_job_failed", extra={"job_id": job_id, "error": str(exc)})
         failed = db.scalar(select(Job).where(Job.id == job_id))
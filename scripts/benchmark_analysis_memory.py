@@ -0,0 +1,76 @@
+"""Peak Python heap of run_analysis for growing chat lengths.
+
+Usage: python scripts/benchmark_analysis_memory.py [message_count ...]
+
+Each size is ingested into a throwaway SQLite database first; only the analysis itself is traced.
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+WORDS = ["love you", "maybe later", "busy today", "let's plan dinner", "not ready", "miss you", "ok", "sounds good"]
+
+
+def synthetic_messages(count: int):
+    from app.services.parsing.types import ParsedMessage
+
+    start = datetime(2020, 1, 1, 8, tzinfo=timezone.utc)
+    for idx in range(count):
+        day, offset = divmod(idx, 60)
+        yield ParsedMessage(
+            ts=start + timedelta(days=day, minutes=3 * offset),
+            sender="Alex" if idx % 3 else "Sam",
+            text=f"{WORDS[idx % len(WORDS)]} #{idx}",
+        )
+
+
+def measure(count: int) -> tuple[float, float]:
+    from app.db.base import Base
+    from app.db.session import SessionLocal, engine
+    from app.models.upload import Upload
+    from app.services.analysis.pipeline import run_analysis
+    from app.services.ingest import store_parsed_messages
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        upload = Upload(platform="generic", timezone="UTC", file_path="unused.json")
+        db.add(upload)
+        db.flush()
+        store_parsed_messages(db, upload, synthetic_messages(count))
+        db.commit()
+        upload_id = upload.id
+        db.expunge_all()
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        run_analysis(db, upload_id)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak / 1024 / 1024, elapsed
+    finally:
+        db.close()
+
+
+def main() -> None:
+    sizes = [int(arg) for arg in sys.argv[1:]] or [5_000, 20_000, 80_000]
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+        print(f"{'messages':>10} {'peak MiB':>10} {'seconds':>9}")
+        for count in sizes:
+            peak, elapsed = measure(count)
+            print(f"{count:>10} {peak:>10.1f} {elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
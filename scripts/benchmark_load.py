@@ -0,0 +1,199 @@
+"""End-to-end load benchmark: upload -> analyze -> report through the real FastAPI app.
+
+Usage: python scripts/benchmark_load.py [--requests 50] [--concurrency 10] [--messages 400] [fake server options]
+
+The app runs in-process on a throwaway SQLite database and is driven over ASGI; its LLM calls go over HTTP
+to the OpenAI-compatible stand-in in `fake_openai_server.py` (started in a background thread unless
+`--base-url` points at one already running), so the real client, retries, limiter, parsing, repair and
+context compression are all exercised. Every upload is a distinct synthetic chat, so neither the response
+cache nor analysis coalescing short-circuits the LLM path. Reports p50/p99 latency per stage, throughput,
+provider token usage and the app's LLM metrics.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from scripts.fake_openai_server import FakeOpenAI, add_config_arguments, config_from_arguments, serve_in_thread  # noqa: E402
+
+WORDS = ["love you", "maybe later", "busy today", "let's plan dinner", "not ready", "miss you", "ok", "sounds good"]
+STAGES = ("upload", "analyze", "report", "total")
+
+
+def synthetic_chat(count: int, tag: int) -> bytes:
+    start = datetime(2024, 1, 1, 8, tzinfo=timezone.utc)
+    messages = []
+    for idx in range(count):
+        day, offset = divmod(idx, 40)
+        messages.append(
+            {
+                "ts": (start + timedelta(days=day, minutes=7 * offset + tag % 5)).isoformat(),
+                "sender": "Alex" if idx % 3 else "Sam",
+                "text": f"{WORDS[(idx + tag) % len(WORDS)]} ({tag}-{idx})",
+            }
+        )
+    return json.dumps({"participants": ["Alex", "Sam"], "messages": messages}).encode("utf-8")
+
+
+def percentile(values: list[float], share: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(int(share * len(ordered)), len(ordered) - 1)]
+
+
+async def one_request(http, tag: int, args: argparse.Namespace, results: dict) -> None:
+    started = time.perf_counter()
+    files = {"file": (f"chat-{tag}.json", synthetic_chat(args.messages, tag), "application/json")}
+    analyze_path = "analyze/stream" if args.stream else "analyze"
+    steps = [
+        ("upload", lambda _: http.post("/compat/upload", files=files)),
+        ("analyze", lambda upload_id: http.post(f"/compat/uploads/{upload_id}/{analyze_path}", params={"mode": args.mode})),
+        ("report", lambda upload_id: http.get(f"/compat/reports/{upload_id}")),
+    ]
+    upload_id = None
+    for stage, send in steps:
+        stage_started = time.perf_counter()
+        response = await send(upload_id)
+        results[stage]["statuses"][response.status_code] = results[stage]["statuses"].get(response.status_code, 0) + 1
+        if response.status_code >= 400 or (args.stream and stage == "analyze" and "event: error" in response.text):
+            results[stage]["failed"] += 1
+            return
+        results[stage]["latencies"].append(time.perf_counter() - stage_started)
+        if stage == "upload":
+            upload_id = response.json()["upload_id"]
+    results["total"]["latencies"].append(time.perf_counter() - started)
+
+
+async def run_load(args: argparse.Namespace) -> dict:
+    import httpx
+
+    from app.main import create_app
+    from app.services.llm.client import close_openai_client
+
+    app = create_app()
+    # Per-request application logs would drown the summary.
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+    results = {stage: {"latencies": [], "failed": 0, "statuses": {}} for stage in STAGES}
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def limited(http, tag: int) -> None:
+        async with slots:
+            await one_request(http, tag, args, results)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+        started = time.perf_counter()
+        await asyncio.gather(*(limited(http, tag) for tag in range(args.requests)))
+        elapsed = time.perf_counter() - started
+        metrics = (await http.get("/metrics")).json()
+    await close_openai_client()
+    return {"elapsed": elapsed, "stages": results, "metrics": metrics}
+
+
+def summarize(run: dict, provider: dict | None, args: argparse.Namespace) -> dict:
+    completed = len(run["stages"]["total"]["latencies"])
+    stages = {}
+    for stage in STAGES:
+        data = run["stages"][stage]
+        latencies = data["latencies"]
+        stages[stage] = {
+            "ok": len(latencies),
+            "failed": data["failed"],
+            "statuses": {str(code): count for code, count in sorted(data["statuses"].items())},
+            "p50_seconds": percentile(latencies, 0.50),
+            "p99_seconds": percentile(latencies, 0.99),
+            "mean_seconds": sum(latencies) / len(latencies) if latencies else float("nan"),
+        }
+    return {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "messages": args.messages,
+        "mode": args.mode,
+        "elapsed_seconds": run["elapsed"],
+        "completed": completed,
+        "throughput_per_second": completed / run["elapsed"] if run["elapsed"] else 0.0,
+        "stages": stages,
+        "provider": provider,
+        "app_metrics": {key: run["metrics"].get(key) for key in ("llm_limiter", "llm_repair", "llm_cache")},
+    }
+
+
+def print_summary(summary: dict) -> None:
+    print(
+        f"requests {summary['requests']}  concurrency {summary['concurrency']}  messages {summary['messages']}  "
+        f"mode {summary['mode']}"
+    )
+    print(
+        f"completed {summary['completed']} in {summary['elapsed_seconds']:.2f}s  "
+        f"throughput {summary['throughput_per_second']:.2f} req/s"
+    )
+    print(f"{'stage':>8} {'ok':>5} {'failed':>6} {'p50 s':>8} {'p99 s':>8} {'mean s':>8}  statuses")
+    for stage, data in summary["stages"].items():
+        print(
+            f"{stage:>8} {data['ok']:>5} {data['failed']:>6} {data['p50_seconds']:>8.3f} "
+            f"{data['p99_seconds']:>8.3f} {data['mean_seconds']:>8.3f}  {data['statuses']}"
+        )
+    provider = summary["provider"]
+    if provider is not None:
+        print(
+            f"provider: {provider['requests']} calls {provider['kinds']}  statuses {provider['statuses']}  "
+            f"tokens {provider['prompt_tokens']} prompt / {provider['completion_tokens']} completion  "
+            f"peak in flight {provider['peak_in_flight']}  injected {provider['injected']}"
+        )
+    for key, value in summary["app_metrics"].items():
+        print(f"{key}: {value}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--messages", type=int, default=400, help="messages per synthetic chat")
+    parser.add_argument("--mode", choices=["llm", "hybrid", "statistical"], default="llm")
+    parser.add_argument("--stream", action="store_true", help="use the server-sent events analyze endpoint")
+    parser.add_argument("--base-url", default="", help="use an already running OpenAI-compatible server")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    parser.add_argument("--verbose", action="store_true", help="keep the application's info logs")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    fake = None if args.base_url else FakeOpenAI(config_from_arguments(args))
+    with tempfile.TemporaryDirectory() as tmp, (serve_in_thread(fake) if fake else nullcontext(args.base_url)) as base_url:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db?timeout=60"
+        os.environ["UPLOAD_DIR"] = f"{tmp}/uploads"
+        os.environ["OPENAI_BASE_URL"] = base_url
+        os.environ.setdefault("OPENAI_API_KEY", "bench-key")
+        os.environ["RATE_LIMIT_PER_MINUTE"] = str(max(args.requests * 10, 1000))
+
+        from app.core.config import get_settings
+        from app.db.base import Base
+
+        # Settings may already be cached by the LLM package imported with the fake server.
+        get_settings.cache_clear()
+        from app.db.session import engine
+
+        Base.metadata.create_all(bind=engine)
+        run = asyncio.run(run_load(args))
+        engine.dispose()
+        summary = summarize(run, fake.stats() if fake else None, args)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_summary(summary)
+
+
+if __name__ == "__main__":
+    main()
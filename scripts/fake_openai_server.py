@@ -0,0 +1,368 @@
+"""OpenAI-compatible stand-in for `POST /v1/chat/completions`, for tests and offline benchmarks.
+
+Usage: python scripts/fake_openai_server.py [--port 8100] [--latency lognormal --latency-seconds 0.8 ...]
+then run the API with OPENAI_BASE_URL=http://127.0.0.1:8100/v1.
+
+Answers the requests the LLM pipeline makes (analysis report, context-chunk summaries, summary merges,
+JSON repair) with schema-shaped content built from the prompt, so evidence verification, local repair and
+context compression run for real. Latency is sampled from a configurable distribution; provider errors,
+429s (randomly or above a concurrency capacity), locally repairable schema violations and unparseable
+JSON can be injected. Prompt and completion tokens are counted and reported by `GET /stats`.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import socket
+import sys
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.services.llm.tokens import estimate_chat_tokens, estimate_tokens  # noqa: E402
+
+# Streamed completions spend this share of the latency before the first token.
+FIRST_TOKEN_SHARE = 0.2
+STREAM_CHUNK_CHARS = 24
+
+
+@dataclass
+class FakeOpenAIConfig:
+    latency: str = "lognormal"  # fixed | uniform | lognormal
+    latency_seconds: float = 0.5  # median
+    latency_spread: float = 0.5  # lognormal sigma, or the +/- fraction of a uniform latency
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after_seconds: float = 1.0
+    # Concurrent requests served before answering 429; 0 is unlimited.
+    capacity: int = 0
+    malformed_rate: float = 0.0  # schema violations the local repair can fix
+    invalid_json_rate: float = 0.0  # truncated, unparseable JSON
+    seed: int | None = None
+
+
+class FakeOpenAI:
+    def __init__(self, config: FakeOpenAIConfig | None = None) -> None:
+        self.config = config or FakeOpenAIConfig()
+        self._random = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.reset()
+        self.app = self._build_app()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats = {
+                "requests": 0,
+                "streamed": 0,
+                "peak_in_flight": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "kinds": {},
+                "statuses": {},
+                "injected": {"errors": 0, "rate_limited": 0, "over_capacity": 0, "malformed": 0, "invalid_json": 0},
+            }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return json.loads(json.dumps(self._stats))
+
+    def sample_latency(self) -> float:
+        config = self.config
+        if config.latency == "fixed":
+            return config.latency_seconds
+        if config.latency == "uniform":
+            spread = config.latency_seconds * config.latency_spread
+            return max(self._random.uniform(config.latency_seconds - spread, config.latency_seconds + spread), 0.0)
+        return self._random.lognormvariate(0.0, config.latency_spread) * config.latency_seconds
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI(title="fake-openai")
+
+        @app.post("/v1/chat/completions")
+        async def chat_completions(request: Request):
+            body = await request.json()
+            with self._lock:
+                self.in_flight += 1
+                self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self.in_flight)
+                over_capacity = bool(self.config.capacity) and self.in_flight > self.config.capacity
+            try:
+                response = await self._complete(body, over_capacity)
+            except BaseException:
+                self._release()
+                raise
+            if isinstance(response, StreamingResponse):
+                # The request stays in flight until its last chunk is sent.
+                response.body_iterator = self._released_after(response.body_iterator)
+            else:
+                self._release()
+            return response
+
+        @app.get("/stats")
+        def stats() -> dict:
+            return self.stats()
+
+        return app
+
+    def _release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    async def _released_after(self, chunks):
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            self._release()
+
+    async def _complete(self, body: dict, over_capacity: bool):
+        messages = body.get("messages") or []
+        kind = _request_kind(messages)
+        streamed = bool(body.get("stream"))
+        self._count(kind=kind, streamed=streamed)
+        if over_capacity:
+            return self._error(429, "rate_limit_error", "Too many concurrent requests.", "over_capacity")
+        roll = self._random.random()
+        if roll < self.config.rate_limit_rate:
+            return self._error(429, "rate_limit_error", "Rate limit reached.", "rate_limited")
+        if roll < self.config.rate_limit_rate + self.config.error_rate:
+            await asyncio.sleep(self.sample_latency() * FIRST_TOKEN_SHARE)
+            return self._error(500, "server_error", "The server had an error processing your request.", "errors")
+
+        content = self._content(kind, messages)
+        latency = self.sample_latency()
+        usage = {"prompt_tokens": estimate_chat_tokens(messages), "completion_tokens": estimate_tokens(content)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        self._count(status=200, usage=usage)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        model = str(body.get("model", "fake"))
+        if streamed:
+            include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+            await asyncio.sleep(latency * FIRST_TOKEN_SHARE)
+            events = _stream_events(completion_id, model, content, usage if include_usage else None, latency * (1 - FIRST_TOKEN_SHARE))
+            return StreamingResponse(events, media_type="text/event-stream")
+        await asyncio.sleep(latency)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+
+    def _content(self, kind: str, messages: list[dict]) -> str:
+        user = next((str(message.get("content", "")) for message in reversed(messages) if message.get("role") == "user"), "{}")
+        try:
+            payload = json.loads(user)
+        except json.JSONDecodeError:
+            payload = {}
+        if kind == "summarize":
+            return json.dumps(_chunk_summary(payload.get("messages") or []))
+        if kind == "merge":
+            return " ".join(str(part) for part in payload.get("partial_summaries") or [])[:600]
+        if kind == "repair":
+            return json.dumps(_report([], user))
+        report = _report(payload.get("messages") or [], user)
+        roll = self._random.random()
+        if roll < self.config.invalid_json_rate:
+            self._count(injected="invalid_json")
+            text = json.dumps(report)
+            return text[: len(text) // 2]
+        if roll < self.config.invalid_json_rate + self.config.malformed_rate:
+            self._count(injected="malformed")
+            return json.dumps(_malformed(report))
+        return json.dumps(report)
+
+    def _error(self, status: int, error_type: str, message: str, injected: str) -> JSONResponse:
+        self._count(status=status, injected=injected)
+        headers = {"retry-after": str(self.config.retry_after_seconds)} if status == 429 else None
+        return JSONResponse(
+            {"error": {"message": message, "type": error_type, "param": None, "code": None}},
+            status_code=status,
+            headers=headers,
+        )
+
+    def _count(
+        self,
+        kind: str | None = None,
+        streamed: bool = False,
+        status: int | None = None,
+        usage: dict | None = None,
+        injected: str | None = None,
+    ) -> None:
+        with self._lock:
+            stats = self._stats
+            if kind is not None:
+                stats["requests"] += 1
+                stats["streamed"] += int(streamed)
+                stats["kinds"][kind] = stats["kinds"].get(kind, 0) + 1
+            if status is not None:
+                stats["statuses"][str(status)] = stats["statuses"].get(str(status), 0) + 1
+            if usage is not None:
+                stats["prompt_tokens"] += usage["prompt_tokens"]
+                stats["completion_tokens"] += usage["completion_tokens"]
+            if injected is not None:
+                stats["injected"][injected] += 1
+
+
+def _request_kind(messages: list[dict]) -> str:
+    system = " ".join(str(message.get("content", "")) for message in messages if message.get("role") == "system")
+    if system.startswith("Summarize chat context"):
+        return "summarize"
+    if system.startswith("Merge these summaries"):
+        return "merge"
+    if system.startswith("Fix this JSON"):
+        return "repair"
+    return "report"
+
+
+def _report(rows: list[dict], seed_text: str) -> dict:
+    """A valid report whose timeline and evidence quote the verbatim messages, so verification keeps them."""
+    digest = int(hashlib.sha256(seed_text.encode("utf-8")).hexdigest()[:8], 16)
+    rows = [row for row in rows if isinstance(row, dict) and row.get("text")]
+    senders = [str(row.get("sender", "")) for row in rows]
+    first_sender = senders[0] if senders else ""
+    initiation = round(100 * senders.count(first_sender) / len(senders)) if senders else 50
+    picked = rows[:: max(len(rows) // 4, 1)][:4]
+    return {
+        "mixed_signal_index": digest % 101,
+        "confidence": round(0.5 + (digest % 50) / 100, 2),
+        "summary": f"Across {len(rows)} messages warmth and distance alternate. Replies vary in speed and tone.",
+        "timeline": [
+            {
+                "timestamp": row.get("timestamp"),
+                "message": str(row["text"])[:120],
+                "tags": ["MIXED SIGNAL"],
+                "type": ("warm", "cool", "mixed")[idx % 3],
+            }
+            for idx, row in enumerate(picked)
+        ],
+        "stats": {"initiation_percent": initiation, "reply_delay_ratio": round(1 + (digest % 30) / 10, 1), "red_flags": digest % 7},
+        "signals": [
+            {
+                "name": "Warm-cold cycles",
+                "score": round((digest % 100) / 100, 2),
+                "explanation": "Warm messages are followed by cooler replies.",
+                "evidence": [
+                    {"timestamp": row.get("timestamp"), "excerpt": str(row["text"])[:80], "sender": str(row.get("sender", ""))}
+                    for row in picked[:2]
+                ],
+            }
+        ],
+    }
+
+
+def _malformed(report: dict) -> dict:
+    """Mechanical schema violations of the kind models produce: stringly numbers, out-of-range values, casing."""
+    broken = json.loads(json.dumps(report))
+    broken["mixed_signal_index"] = f"{broken['mixed_signal_index']}"
+    broken["confidence"] = 1.2
+    for item in broken["timeline"]:
+        item["type"] = item["type"].capitalize()
+    for signal in broken["signals"]:
+        signal["score"] = f"{round(signal['score'] * 100)}%"
+    del broken["stats"]
+    return broken
+
+
+def _chunk_summary(rows: list[dict]) -> dict:
+    senders = sorted({str(row.get("sender", "")) for row in rows if isinstance(row, dict)})
+    return {
+        "summary": f"{len(rows)} earlier messages between {', '.join(senders) or 'the participants'}.",
+        "notable_events": [str(row.get("text", ""))[:60] for row in rows[:3] if isinstance(row, dict)],
+    }
+
+
+async def _stream_events(completion_id: str, model: str, content: str, usage: dict | None, duration: float):
+    pieces = [content[start : start + STREAM_CHUNK_CHARS] for start in range(0, len(content), STREAM_CHUNK_CHARS)] or [""]
+    pause = duration / len(pieces)
+    base = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+    for idx, piece in enumerate(pieces):
+        delta = {"role": "assistant", "content": piece} if idx == 0 else {"content": piece}
+        yield f"data: {json.dumps({**base, 'choices': [{'index': 0, 'delta': delta, 'finish_reason': None}]})}\n\n"
+        await asyncio.sleep(pause)
+    yield f"data: {json.dumps({**base, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})}\n\n"
+    if usage is not None:
+        yield f"data: {json.dumps({**base, 'choices': [], 'usage': usage})}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@contextmanager
+def serve_in_thread(fake: FakeOpenAI, host: str = "127.0.0.1") -> Iterator[str]:
+    """Serve `fake` on a free port from a background thread; yields the `/v1` base URL."""
+    import uvicorn
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, 0))
+    port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(fake.app, log_level="warning", lifespan="off"))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if not thread.is_alive() or time.monotonic() > deadline:
+            raise RuntimeError("fake OpenAI server did not start")
+        time.sleep(0.01)
+    try:
+        yield f"http://{host}:{port}/v1"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+        sock.close()
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--latency-seconds", type=float, default=0.5, help="median completion latency")
+    parser.add_argument("--latency-spread", type=float, default=0.5, help="lognormal sigma or uniform +/- fraction")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with a 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of requests answered with a 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--capacity", type=int, default=0, help="concurrent requests before 429s (0 = unlimited)")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="share of reports with repairable schema errors")
+    parser.add_argument("--invalid-json-rate", type=float, default=0.0, help="share of reports with truncated JSON")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_arguments(args: argparse.Namespace) -> FakeOpenAIConfig:
+    return FakeOpenAIConfig(
+        latency=args.latency,
+        latency_seconds=args.latency_seconds,
+        latency_spread=args.latency_spread,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after_seconds=args.retry_after,
+        capacity=args.capacity,
+        malformed_rate=args.malformed_rate,
+        invalid_json_rate=args.invalid_json_rate,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(FakeOpenAI(config_from_arguments(args)).app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
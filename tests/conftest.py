@@ -17,7 +17,7 @@ from app.main import create_app
 
 @pytest.fixture(autouse=True)
 def mock_llm(monkeypatch):
-    def _fake_analyze_chat_with_llm(messages):
+    async def _fake_analyze_chat_with_llm(messages, **kwargs):
         first = messages[0]
         return {
             "mixed_signal_index": 72,
@@ -49,6 +49,7 @@ def mock_llm(monkeypatch):
         }
 
     monkeypatch.setattr("app.services.analysis.runner.analyze_chat_with_llm", _fake_analyze_chat_with_llm)
+    return _fake_analyze_chat_with_llm
 
 
 @pytest.fixture(autouse=True)
@@ -57,6 +58,7 @@ def reset_db():
     Base.metadata.create_all(bind=engine)
     yield
     Base.metadata.drop_all(bind=engine)
+    engine.dispose()
     path = Path("test.db")
     if path.exists():
         path.unlink()
@@ -0,0 +1,74 @@
+import threading
+from pathlib import Path
+
+from sqlalchemy import select, update
+
+from app.core.config import get_settings
+from app.db.session import SessionLocal
+from app.models.analysis_lease import AnalysisLease
+from app.services.analysis.batch import BATCH_VERSION, analyze_in_worker, shutdown_analysis_executor
+from app.services.analysis.runner import analysis_version
+from tests.test_api import _auth_headers
+from tests.test_coalescing import _hold_lease
+
+
+def _create_upload(client, headers) -> str:
+    with Path("tests/fixtures/generic_chat.json").open("rb") as handle:
+        response = client.post(
+            "/uploads",
+            headers=headers,
+            files={"file": ("generic_chat.json", handle, "application/json")},
+            data={"platform": "generic", "timezone_name": "UTC"},
+        )
+    assert response.status_code == 201, response.text
+    return response.json()["upload_id"]
+
+
+def test_batch_analytics_compares_uploads_and_caches_results(client):
+    headers = _auth_headers(client)
+    first, second = _create_upload(client, headers), _create_upload(client, headers)
+    try:
+        response = client.post("/analytics/batch", headers=headers, json={"upload_ids": [first, second]})
+        assert response.status_code == 200, response.text
+        payload = response.json()
+        assert [item["upload_id"] for item in payload["uploads"]] == [first, second]
+        assert not any(item["cached"] or item["error"] for item in payload["uploads"])
+        comparison = payload["comparison"]
+        assert set(comparison["initiation_balance"]) == {first, second}
+        assert all(set(scores) == {first, second} for scores in comparison["detector_scores"].values())
+
+        again = client.post("/analytics/batch", headers=headers, json={"upload_ids": [first, second]}).json()
+        assert all(item["cached"] for item in again["uploads"])
+        assert again["comparison"] == comparison
+    finally:
+        shutdown_analysis_executor()
+
+
+def test_batch_analytics_rejects_unknown_uploads(client):
+    headers = _auth_headers(client)
+    upload_id = _create_upload(client, headers)
+    response = client.post("/analytics/batch", headers=headers, json={"upload_ids": [upload_id, "missing"]})
+    assert response.status_code == 404
+
+
+def test_batch_worker_waits_for_a_running_analysis(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "analysis_lease_poll_seconds", 0.02)
+    upload_id = _create_upload(client, _auth_headers(client))
+    _hold_lease(upload_id, analysis_version("llm"), expires_in=60)
+
+    def finish_other() -> None:
+        with SessionLocal() as db:
+            db.execute(update(AnalysisLease).where(AnalysisLease.upload_id == upload_id).values(status="succeeded"))
+            db.commit()
+
+    finisher = threading.Timer(0.2, finish_other)
+    finisher.start()
+    try:
+        result = analyze_in_worker(upload_id)
+    finally:
+        finisher.join()
+    assert result["detectors"]
+    with SessionLocal() as db:
+        lease = db.scalar(select(AnalysisLease).where(AnalysisLease.upload_id == upload_id))
+        assert (lease.version, lease.status) == (BATCH_VERSION, "succeeded")
+        assert lease.holder != "other-process"
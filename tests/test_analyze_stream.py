@@ -0,0 +1,114 @@
+import asyncio
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+
+from app.routers import compat
+from app.services.llm import openai_client
+from app.services.llm.streaming import JSONFieldStream
+
+
+def _chunks(text: str, size: int) -> list[str]:
+    return [text[start : start + size] for start in range(0, len(text), size)]
+
+
+def _events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_fields_are_emitted_as_soon_as_their_values_complete():
+    report = {"mixed_signal_index": 72, "summary": 'He said "later {maybe}", then left.', "signals": [{"name": "x", "evidence": []}]}
+    text = "```json\n" + json.dumps(report)
+    stream = JSONFieldStream()
+    seen = []
+    fed = 0
+    for chunk in _chunks(text, 3):
+        fed += len(chunk)
+        for name, value in stream.feed(chunk):
+            seen.append(name)
+            assert value == report[name]
+            # Emitted by the very chunk that holds the delimiter closing its value, not at the end.
+            delimiter = text.index(json.dumps(value), text.index(f'"{name}"')) + len(json.dumps(value))
+            assert fed - 3 <= delimiter < fed
+    assert seen == ["mixed_signal_index", "summary", "signals"]
+
+
+def test_only_the_open_member_is_buffered():
+    report = {"a": "x" * 500, "b\\\"": [{"c": "}]"}] * 50, "d": None}
+    longest = max(len(json.dumps(key)) + 2 + len(json.dumps(value)) for key, value in report.items())
+    stream = JSONFieldStream()
+    seen = {}
+    for chunk in _chunks(json.dumps(report), 1):
+        seen.update(stream.feed(chunk))
+        assert sum(map(len, stream._pending)) <= longest + 1
+    assert seen == report
+    assert stream._pending == []
+
+
+def test_report_completion_is_streamed_to_on_delta():
+    content = json.dumps({"summary": "s"})
+
+    async def create(**kwargs):
+        assert kwargs["stream"] is True
+
+        async def chunks():
+            for piece in _chunks(content, 4):
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))], usage=None)
+            yield SimpleNamespace(choices=[], usage=SimpleNamespace(prompt_tokens=10))
+
+        return chunks()
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    deltas: list[str] = []
+
+    async def on_delta(text: str) -> None:
+        deltas.append(text)
+
+    result = asyncio.run(openai_client._request_json(client, "gpt-4o-mini", "system", "developer", {}, on_delta=on_delta))
+    assert result == {"summary": "s"}
+    assert "".join(deltas) == content and len(deltas) > 1
+
+
+def test_stream_endpoint_emits_stages_in_order(client, mock_llm, monkeypatch):
+    async def _streaming_llm(messages, on_delta=None, **kwargs):
+        report = await mock_llm(messages)
+        for piece in _chunks(json.dumps(report), 16):
+            await on_delta(piece)
+        return report
+
+    monkeypatch.setattr("app.services.analysis.runner.analyze_chat_with_llm", _streaming_llm)
+    with Path("tests/fixtures/generic_chat.json").open("rb") as handle:
+        upload_id = client.post("/compat/upload", files={"file": ("generic_chat.json", handle, "application/json")}).json()["upload_id"]
+
+    response = client.post(f"/compat/uploads/{upload_id}/analyze/stream")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _events(response.text)
+    names = [name for name, _ in events]
+    assert names[:2] == ["parsed", "preview"]
+    assert names[-1] == "report"
+    assert "token" in names
+    assert events[0][1]["message_count"] == 4
+    assert "highlights" in events[1][1]
+    partial = {data["field"]: data["value"] for name, data in events if name == "partial"}
+    assert partial["mixed_signal_index"] == 72
+    assert events[-1][1]["mixed_signal_index"] == 72
+    assert client.get(f"/compat/reports/{upload_id}").status_code == 200
+
+
+def test_stream_endpoint_reports_parse_failures_as_text(client, monkeypatch):
+    def _unparseable(db, upload_id, headers):
+        raise HTTPException(status_code=422, detail={"message": "Could not parse any messages.", "first_10_lines": []})
+
+    with Path("tests/fixtures/generic_chat.json").open("rb") as handle:
+        upload_id = client.post("/compat/upload", files={"file": ("generic_chat.json", handle, "application/json")}).json()["upload_id"]
+    monkeypatch.setattr(compat, "_reparse_upload", _unparseable)
+
+    events = _events(client.post(f"/compat/uploads/{upload_id}/analyze/stream").text)
+    assert events == [("error", {"detail": "Could not parse any messages."})]
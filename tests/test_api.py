@@ -1,3 +1,4 @@
+import json
 from pathlib import Path
 
 
@@ -28,6 +29,10 @@ def test_end_to_end_flow(client):
     assert get_upload.status_code == 200
     assert get_upload.json()["status"] == "parsed"
 
+    metrics_resp = client.get(f"/uploads/{upload_id}/metrics", headers=headers)
+    assert metrics_resp.status_code == 200
+    assert sum(metrics_resp.json()["timeline_metrics"]["messages_per_day"].values()) == 4
+
     analyze_resp = client.post(f"/uploads/{upload_id}/analyze", headers=headers)
     assert analyze_resp.status_code == 200
     analysis_payload = analyze_resp.json()
@@ -44,3 +49,68 @@ def test_end_to_end_flow(client):
 
     delete_resp = client.delete(f"/uploads/{upload_id}", headers=headers)
     assert delete_resp.status_code == 204
+
+
+def test_statistical_and_hybrid_modes(client, monkeypatch):
+    headers = _auth_headers(client)
+
+    fixture = Path("tests/fixtures/generic_chat.json")
+    with fixture.open("rb") as handle:
+        upload_resp = client.post(
+            "/uploads",
+            headers=headers,
+            files={"file": ("generic_chat.json", handle, "application/json")},
+            data={"platform": "generic", "timezone_name": "UTC"},
+        )
+    upload_id = upload_resp.json()["upload_id"]
+
+    statistical = client.post(f"/uploads/{upload_id}/analyze", params={"mode": "statistical"}, headers=headers)
+    assert statistical.status_code == 200, statistical.text
+    payload = statistical.json()
+    assert 0 <= payload["mixed_signal_index"] <= 100
+    assert len(payload["timeline"]) <= 10
+    assert payload["signals"]
+    assert all(item["excerpt"] for signal in payload["signals"] for item in signal["evidence"])
+
+    async def _unavailable(messages, **kwargs):
+        raise TimeoutError("LLM timed out")
+
+    monkeypatch.setattr("app.services.analysis.runner.analyze_chat_with_llm", _unavailable)
+    hybrid = client.post(f"/uploads/{upload_id}/analyze", params={"mode": "hybrid"}, headers=headers)
+    assert hybrid.status_code == 200, hybrid.text
+    assert hybrid.json()["signals"] == payload["signals"]
+
+    llm_only = client.post(f"/uploads/{upload_id}/analyze", params={"mode": "llm"}, headers=headers)
+    assert llm_only.status_code == 502
+
+    invalid = client.post(f"/uploads/{upload_id}/analyze", params={"mode": "fast"}, headers=headers)
+    assert invalid.status_code == 422
+
+
+def test_append_adds_only_new_messages(client):
+    headers = _auth_headers(client)
+
+    fixture = Path("tests/fixtures/generic_chat.json")
+    with fixture.open("rb") as handle:
+        upload_resp = client.post(
+            "/uploads",
+            headers=headers,
+            files={"file": ("generic_chat.json", handle, "application/json")},
+            data={"platform": "generic", "timezone_name": "UTC"},
+        )
+    upload_id = upload_resp.json()["upload_id"]
+    first = client.post(f"/uploads/{upload_id}/analyze", params={"mode": "statistical"}, headers=headers)
+    assert first.status_code == 200, first.text
+
+    export = json.loads(fixture.read_text())
+    export["messages"].append({"ts": "2025-12-05T09:00:00Z", "sender": "A", "text": "still on for friday?"})
+    append_resp = client.post(
+        f"/uploads/{upload_id}/append",
+        headers=headers,
+        files={"file": ("generic_chat.json", json.dumps(export).encode(), "application/json")},
+    )
+    assert append_resp.status_code == 200, append_resp.text
+    assert append_resp.json() == {"upload_id": upload_id, "appended_count": 1, "message_count": 5}
+
+    second = client.post(f"/uploads/{upload_id}/analyze", params={"mode": "statistical"}, headers=headers)
+    assert second.status_code == 200, second.text
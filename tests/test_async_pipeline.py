@@ -0,0 +1,74 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from sqlalchemy import select
+
+from app.db.session import SessionLocal
+from app.main import create_app
+from app.models.upload import Upload
+from app.models.user import User
+from app.services.ingest import store_parsed_messages
+from app.services.parsing.types import ParsedMessage
+
+IN_FLIGHT = 20
+LLM_LATENCY_SECONDS = 0.5
+
+
+def _seed_uploads(email: str) -> list[str]:
+    start = datetime(2025, 12, 1, 10, tzinfo=timezone.utc)
+    rows = [
+        ParsedMessage(ts=start + timedelta(minutes=idx), sender="A" if idx % 2 else "B", text=f"message {idx}")
+        for idx in range(40)
+    ]
+    with SessionLocal() as db:
+        owner = db.scalar(select(User).where(User.email == email))
+        upload_ids = []
+        for _ in range(IN_FLIGHT):
+            upload = Upload(owner_id=owner.id, platform="generic", timezone="UTC", status="parsed", file_path="", parsing_summary={})
+            db.add(upload)
+            db.flush()
+            store_parsed_messages(db, upload, rows)
+            upload_ids.append(upload.id)
+        db.commit()
+    return upload_ids
+
+
+def test_health_stays_responsive_while_analyses_are_in_flight(mock_llm, monkeypatch):
+    async def _slow_llm(messages, **kwargs):
+        await asyncio.sleep(LLM_LATENCY_SECONDS)
+        return await mock_llm(messages, **kwargs)
+
+    monkeypatch.setattr("app.services.analysis.runner.analyze_chat_with_llm", _slow_llm)
+
+    async def scenario() -> tuple[list, list[float]]:
+        transport = httpx.ASGITransport(app=create_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            credentials = {"email": "load@example.com", "password": "secret123"}
+            assert (await client.post("/auth/register", json=credentials)).status_code == 201
+            token = (await client.post("/auth/login", json=credentials)).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            upload_ids = await asyncio.to_thread(_seed_uploads, credentials["email"])
+
+            analyses = [
+                asyncio.create_task(client.post(f"/uploads/{upload_id}/analyze", headers=headers)) for upload_id in upload_ids
+            ]
+            await asyncio.sleep(0.05)
+            latencies = []
+            while not all(task.done() for task in analyses) and len(latencies) < 30:
+                started = time.perf_counter()
+                assert (await client.get("/health")).status_code == 200
+                latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.02)
+            return await asyncio.gather(*analyses), latencies
+
+    started = time.perf_counter()
+    responses, latencies = asyncio.run(scenario())
+    elapsed = time.perf_counter() - started
+
+    assert all(response.status_code == 200 for response in responses), [r.text for r in responses]
+    # Serialized analyses would take IN_FLIGHT * LLM_LATENCY_SECONDS.
+    assert elapsed < IN_FLIGHT * LLM_LATENCY_SECONDS / 2
+    assert len(latencies) >= 5
+    assert max(latencies) < LLM_LATENCY_SECONDS / 2
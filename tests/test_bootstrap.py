@@ -0,0 +1,77 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from app.services.analysis import bootstrap
+from app.services.analysis.bootstrap import SessionBlocks, bootstrap_intervals
+from app.services.analysis.detectors import DetectorSuite
+from app.services.analysis.scoring import MIXED_SIGNAL_BASE
+from app.services.analysis.sessions import SessionTracker
+
+
+def _fold(message_count: int, per_session: int = 40) -> tuple[DetectorSuite, SessionBlocks]:
+    rng = random.Random(11)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    tracker = SessionTracker(6 * 3600)
+    suite = DetectorSuite()
+    blocks = SessionBlocks()
+    for idx in range(message_count):
+        session, offset = divmod(idx, per_session)
+        sender = "a" if rng.random() < 0.6 else "b"
+        row = {
+            "id": str(idx),
+            "ts": start + timedelta(days=session, minutes=offset * (1 if sender == "a" else 7)),
+            "sender_id": sender,
+            "sender_name": sender.upper(),
+            "sentiment": rng.uniform(-1, 1),
+            "affection": rng.random() < 0.1,
+            "avoidance": rng.random() < 0.1,
+            "hedge": False,
+            "boundary": rng.random() < 0.03,
+            "future_talk": rng.random() < 0.05,
+        }
+        session_start = tracker.update(row)
+        if session_start:
+            blocks.session_started(suite.counters())
+        suite.update(row, session_start)
+    return suite, blocks
+
+
+def test_intervals_bracket_point_scores():
+    suite, blocks = _fold(4000)
+    intervals = bootstrap_intervals(blocks.blocks(suite.counters()), 500)
+    assert MIXED_SIGNAL_BASE in intervals
+    for result in suite.results():
+        low, high = intervals[result.detector]
+        assert 0.0 <= low <= high <= 1.0
+        assert low - 0.02 <= result.score <= high + 0.02
+
+
+def test_session_blocks_sum_to_totals():
+    suite, blocks = _fold(500)
+    totals: dict[str, float] = {}
+    for block in blocks.blocks(suite.counters()):
+        for key, value in block.items():
+            totals[key] = totals.get(key, 0.0) + value
+    assert totals == {key: value for key, value in suite.counters().items() if value}
+
+
+def test_resample_matrix_is_bounded_by_blocks_not_messages(monkeypatch):
+    suite, blocks = _fold(100_000, per_session=25)
+    session_blocks = blocks.blocks(suite.counters())
+    assert len(session_blocks) == 4000
+    merged_shapes = []
+    merge = bootstrap._merge_blocks
+
+    def recording_merge(matrix, max_blocks):
+        merged = merge(matrix, max_blocks)
+        np.testing.assert_allclose(merged.sum(axis=0), matrix.sum(axis=0))
+        merged_shapes.append(merged.shape)
+        return merged
+
+    monkeypatch.setattr(bootstrap, "_merge_blocks", recording_merge)
+    intervals = bootstrap_intervals(session_blocks, 1000)
+    # Resampling works on at most MAX_BLOCKS rows however many messages and sessions there are.
+    assert merged_shapes[0][0] == bootstrap.MAX_BLOCKS
+    assert len(intervals) == 7
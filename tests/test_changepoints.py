@@ -0,0 +1,72 @@
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.services.analysis.changepoints import SessionSeries, detect_change_points, oscillation_score
+from app.services.analysis.detectors import warm_cold_cycles
+from app.services.analysis.sessions import segment_sessions
+
+
+def _phase_rows(phases: list[tuple[int, float, int]]) -> list[dict]:
+    """Rows for consecutive phases of (session_count, sentiment, messages_per_session), one session per day."""
+    rng = random.Random(7)
+    rows: list[dict] = []
+    day = 0
+    start = datetime(2025, 1, 1, 18, tzinfo=timezone.utc)
+    for session_count, sentiment, per_session in phases:
+        for _ in range(session_count):
+            for idx in range(per_session):
+                rows.append(
+                    {
+                        "id": f"m{len(rows)}",
+                        "ts": start + timedelta(days=day, minutes=2 * idx),
+                        "sender_id": "a" if idx % 2 else "b",
+                        "sender_name": "A" if idx % 2 else "B",
+                        "text": "",
+                        "sentiment": max(min(sentiment + rng.uniform(-0.1, 0.1), 1.0), -1.0),
+                        "affection": False,
+                        "avoidance": False,
+                        "hedge": False,
+                        "boundary": False,
+                        "future_talk": False,
+                    }
+                )
+            day += 1
+    return rows
+
+
+def test_detects_mean_shifts_in_both_series():
+    flat = [0.1] * 20 + [0.8] * 20 + [0.1] * 20
+    assert detect_change_points([flat, [1.0] * 60]) == [20, 40]
+    assert detect_change_points([[0.3] * 60, [1.0] * 60]) == []
+    assert detect_change_points([[0.1, 0.9, 0.1]]) == []
+
+
+def test_change_points_cite_boundary_evidence_and_drive_warm_cold_score():
+    rows = _phase_rows([(12, 0.7, 10), (12, -0.5, 3), (12, 0.7, 10), (12, -0.5, 3)])
+    sessions = segment_sessions(rows)
+    series = SessionSeries()
+    starts = {span.start for span in sessions.sessions}
+    for pos, row in enumerate(rows):
+        series.update(row, pos in starts)
+    points = series.change_points(sessions)
+
+    assert [point.session_seq for point in points] == [12, 24, 36]
+    assert [point.direction for point in points] == ["cooler", "warmer", "cooler"]
+    assert all(len(point.evidence_ids) == 2 for point in points)
+    assert oscillation_score(points) == 1.0
+
+    result = warm_cold_cycles(rows, sessions)
+    assert result.score == 1.0
+    assert set(points[0].evidence_ids) <= set(result.evidence_ids)
+
+
+def test_change_point_search_scales_to_large_session_series():
+    rng = random.Random(3)
+    sentiment = [rng.gauss(0.4 if (idx // 5000) % 2 else -0.1, 0.2) for idx in range(50_000)]
+    engagement = [rng.gauss(2.0, 0.3) for _ in range(50_000)]
+    started = time.perf_counter()
+    boundaries = detect_change_points([sentiment, engagement])
+    assert time.perf_counter() - started < 10
+    assert len(boundaries) == 9
+    assert all(abs(at - 5000 * (idx + 1)) <= 20 for idx, at in enumerate(boundaries))
@@ -0,0 +1,192 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select, update
+
+from app.core.config import get_settings
+from app.db.session import SessionLocal
+from app.main import create_app
+from app.models.analysis_lease import AnalysisLease
+from app.services.analysis.coalesce import coalesce_metrics, coalesced_analysis
+from app.routers.compat import _compat_version
+from app.services.analysis.runner import analysis_version
+from app.services.llm.client import LLMOverloadedError
+
+
+def _upload(client) -> str:
+    with Path("tests/fixtures/generic_chat.json").open("rb") as handle:
+        response = client.post("/compat/upload", files={"file": ("generic_chat.json", handle, "application/json")})
+    return response.json()["upload_id"]
+
+
+def _hold_lease(upload_id: str, version: str, expires_in: float) -> None:
+    with SessionLocal() as db:
+        db.add(
+            AnalysisLease(
+                upload_id=upload_id,
+                version=version,
+                holder="other-process",
+                status="running",
+                expires_at=datetime.now(timezone.utc) + timedelta(seconds=expires_in),
+            )
+        )
+        db.commit()
+
+
+def test_concurrent_analyses_of_one_upload_share_a_single_run(client, mock_llm, monkeypatch):
+    calls = []
+
+    async def _slow_llm(messages, **kwargs):
+        calls.append(1)
+        await asyncio.sleep(0.3)
+        return await mock_llm(messages, **kwargs)
+
+    monkeypatch.setattr("app.services.analysis.runner.analyze_chat_with_llm", _slow_llm)
+    upload_id = _upload(client)
+    before = coalesce_metrics()
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=create_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await asyncio.gather(*(http.post(f"/compat/uploads/{upload_id}/analyze") for _ in range(3)))
+
+    responses = asyncio.run(scenario())
+    assert [response.status_code for response in responses] == [200, 200, 200]
+    assert responses[0].json() == responses[1].json() == responses[2].json()
+    assert len(calls) == 1
+    after = coalesce_metrics()
+    assert after["leaders"] - before["leaders"] == 1
+    assert after["followers"] - before["followers"] == 2
+
+
+def test_follower_returns_the_result_of_another_process(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "analysis_lease_poll_seconds", 0.02)
+    upload_id = _upload(client)
+    version = analysis_version("llm")
+    _hold_lease(upload_id, version, expires_in=60)
+
+    async def work(db):
+        raise AssertionError("followers must not recompute")
+
+    async def scenario():
+        follower = asyncio.create_task(coalesced_analysis(upload_id, version, work))
+        await asyncio.sleep(0.1)
+        with SessionLocal() as db:
+            db.execute(
+                update(AnalysisLease)
+                .where(AnalysisLease.upload_id == upload_id)
+                .values(status="succeeded", result_json={"summary": "from elsewhere"})
+            )
+            db.commit()
+        return await follower
+
+    assert asyncio.run(scenario()) == {"summary": "from elsewhere"}
+
+
+def test_expired_lease_is_taken_over(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "analysis_lease_poll_seconds", 0.02)
+    upload_id = _upload(client)
+    _hold_lease(upload_id, analysis_version("llm"), expires_in=-1)
+
+    async def work(db):
+        return {"summary": "recomputed"}
+
+    assert asyncio.run(coalesced_analysis(upload_id, analysis_version("llm"), work)) == {"summary": "recomputed"}
+    with SessionLocal() as db:
+        lease = db.scalar(select(AnalysisLease).where(AnalysisLease.upload_id == upload_id))
+        assert lease.status == "succeeded" and lease.holder != "other-process"
+
+
+def test_cancelling_the_leader_does_not_cancel_followers(client):
+    upload_id = _upload(client)
+    version = analysis_version("llm")
+    runs = []
+
+    async def work(db):
+        runs.append(1)
+        await asyncio.sleep(0.2)
+        return {"summary": "shared"}
+
+    async def scenario():
+        leader = asyncio.create_task(coalesced_analysis(upload_id, version, work))
+        await asyncio.sleep(0.05)
+        followers = [asyncio.create_task(coalesced_analysis(upload_id, version, work)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        results = await asyncio.gather(*followers)
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return results
+
+    assert asyncio.run(scenario()) == [{"summary": "shared"}, {"summary": "shared"}]
+    assert len(runs) == 1
+    with SessionLocal() as db:
+        assert db.scalar(select(AnalysisLease.status).where(AnalysisLease.upload_id == upload_id)) == "succeeded"
+
+
+def test_remote_followers_get_the_leaders_client_error(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "analysis_lease_poll_seconds", 0.02)
+    upload_id = _upload(client)
+    version = analysis_version("llm")
+    detail = {"message": "Could not parse any messages from the uploaded file.", "first_10_lines": []}
+
+    async def rejected(db):
+        raise HTTPException(status_code=422, detail=detail)
+
+    with pytest.raises(HTTPException):
+        asyncio.run(coalesced_analysis(upload_id, version, rejected))
+    with SessionLocal() as db:
+        lease = db.scalar(select(AnalysisLease).where(AnalysisLease.upload_id == upload_id))
+        lease.holder, lease.status = "other-process", "running"
+        db.commit()
+
+    async def work(db):
+        raise AssertionError("followers must not recompute")
+
+    async def scenario():
+        follower = asyncio.create_task(coalesced_analysis(upload_id, version, work))
+        await asyncio.sleep(0.1)
+        with SessionLocal() as db:
+            db.execute(update(AnalysisLease).where(AnalysisLease.upload_id == upload_id).values(status="rejected"))
+            db.commit()
+        return await follower
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(scenario())
+    assert raised.value.status_code == 422
+    assert raised.value.detail == detail
+
+
+def test_remote_followers_get_the_leaders_overload(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "analysis_lease_poll_seconds", 0.02)
+    upload_id = _upload(client)
+    version = _compat_version("llm", False)
+
+    async def overloaded(db):
+        raise LLMOverloadedError("LLM queue is full", retry_after=7.5)
+
+    with pytest.raises(LLMOverloadedError):
+        asyncio.run(coalesced_analysis(upload_id, version, overloaded))
+    with SessionLocal() as db:
+        lease = db.scalar(select(AnalysisLease).where(AnalysisLease.upload_id == upload_id))
+        assert lease.status == "overloaded"
+        lease.holder, lease.status = "other-process", "running"
+        db.commit()
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=create_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            follower = asyncio.create_task(http.post(f"/compat/uploads/{upload_id}/analyze"))
+            await asyncio.sleep(0.1)
+            with SessionLocal() as db:
+                db.execute(update(AnalysisLease).where(AnalysisLease.upload_id == upload_id).values(status="overloaded"))
+                db.commit()
+            return await follower
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "8"
@@ -25,3 +25,19 @@ def test_compat_end_to_end(client):
     assert "confidence" in payload
     assert "timeline" in payload
     assert "stats" in payload
+
+
+def test_compat_statistical_mode_from_body(client):
+    fixture = Path("tests/fixtures/whatsapp_chat.txt")
+    with fixture.open("rb") as handle:
+        upload_resp = client.post("/compat/upload", files={"file": ("whatsapp_chat.txt", handle, "text/plain")})
+    upload_id = upload_resp.json()["upload_id"]
+
+    analyze_resp = client.post(f"/compat/uploads/{upload_id}/analyze", json={"mode": "statistical"})
+    assert analyze_resp.status_code == 200, analyze_resp.text
+    analyzed = analyze_resp.json()
+    assert analyzed["message_count"] == 5
+    assert "highlights" in analyzed
+
+    invalid = client.post(f"/compat/uploads/{upload_id}/analyze", json={"mode": "fast"})
+    assert invalid.status_code == 400
@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta, timezone
+
+from app.services.analysis.evidence import select_evidence_messages
+from app.services.llm.openai_client import _build_analysis_payload
+
+
+def _messages(count: int) -> list[dict]:
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        {"ts": start + timedelta(minutes=idx), "sender": "A" if idx % 2 else "B", "text": "ok sounds good"}
+        for idx in range(count)
+    ]
+
+
+def test_selection_keeps_older_evidence_with_context():
+    messages = _messages(300)
+    messages[10]["text"] = "I need space, this is too much"
+    selected = select_evidence_messages(messages, budget=60, recent_anchor=20)
+    assert len(selected) == 60
+    assert selected == sorted(selected)
+    assert {9, 10, 11} <= set(selected)
+    assert set(range(280, 300)) <= set(selected)
+
+
+def test_short_chats_are_sent_whole():
+    messages = _messages(12)
+    selected = select_evidence_messages(messages, budget=60, recent_anchor=20)
+    payload = _build_analysis_payload(messages, selected, None)
+    assert len(payload["messages"]) == 12
+    assert payload["context_policy"]["omitted_messages"] == 0
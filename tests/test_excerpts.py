@@ -0,0 +1,75 @@
+from sqlalchemy import select
+
+from app.db.session import SessionLocal
+from app.models.excerpt import Excerpt
+from app.models.message import Message
+from tests.test_analytics import _create_upload
+from tests.test_api import _auth_headers
+
+
+def test_llm_evidence_is_indexed_with_message_ids(client):
+    headers = _auth_headers(client)
+    upload_id = _create_upload(client, headers)
+    analyze = client.post(f"/uploads/{upload_id}/analyze", headers=headers)
+    assert analyze.status_code == 200, analyze.text
+
+    with SessionLocal() as db:
+        first = db.scalars(select(Message).where(Message.upload_id == upload_id).order_by(Message.ts)).first()
+        excerpts = db.scalars(select(Excerpt).where(Excerpt.upload_id == upload_id).order_by(Excerpt.position)).all()
+    assert [(e.purpose, e.message_id) for e in excerpts] == [("evidence", first.id), ("timeline", first.id)]
+
+    highlights = client.get(f"/reports/{upload_id}/highlights", headers=headers).json()["highlights"]
+    assert highlights[0]["message_id"] == first.id
+    assert highlights[0]["excerpt"] == "I miss you"
+    assert highlights[0]["sender"] == "A"
+
+    context = client.get(
+        f"/reports/{upload_id}/excerpts/{highlights[0]['excerpt_id']}/context", params={"radius": 1}, headers=headers
+    )
+    assert context.status_code == 200, context.text
+    messages = context.json()["messages"]
+    assert [m["text"] for m in messages] == ["I miss you", "maybe later, busy"]
+    assert [m["is_excerpt"] for m in messages] == [True, False]
+
+    missing = client.get(f"/reports/{upload_id}/excerpts/unknown/context", headers=headers)
+    assert missing.status_code == 404
+
+
+def test_statistical_report_links_evidence_directly(client):
+    headers = _auth_headers(client)
+    upload_id = _create_upload(client, headers)
+    report = client.post(f"/uploads/{upload_id}/analyze", params={"mode": "statistical"}, headers=headers).json()
+    evidence_ids = {item["message_id"] for signal in report["signals"] for item in signal["evidence"]}
+    assert evidence_ids and None not in evidence_ids
+
+    with SessionLocal() as db:
+        indexed = set(db.scalars(select(Excerpt.message_id).where(Excerpt.upload_id == upload_id)).all())
+    assert evidence_ids <= indexed
+
+
+def test_context_keeps_messages_with_tied_timestamps_on_one_side():
+    from datetime import datetime, timezone
+
+    from app.core.security import encrypt_text
+    from app.models.upload import Upload
+    from app.services.analysis.excerpts import excerpt_context
+    from app.services.ingest import store_parsed_messages
+    from app.services.parsing.types import ParsedMessage
+
+    minute = datetime(2025, 6, 1, 21, 14, tzinfo=timezone.utc)
+    with SessionLocal() as db:
+        upload = Upload(platform="whatsapp", timezone="UTC", file_path="unused.txt")
+        db.add(upload)
+        db.flush()
+        store_parsed_messages(db, upload, [ParsedMessage(ts=minute, sender="A", text=text) for text in ("one", "two", "three")])
+        db.flush()
+        tied = db.scalars(select(Message).where(Message.upload_id == upload.id).order_by(Message.id)).all()
+        anchor = tied[1]
+        excerpt = Excerpt(upload_id=upload.id, message_id=anchor.id, encrypted_excerpt=encrypt_text("x"), purpose="evidence")
+        db.add(excerpt)
+        db.commit()
+
+        context = excerpt_context(db, upload.id, excerpt.id, radius=3)
+    ids = [row["message_id"] for row in context["messages"]]
+    assert ids == [message.id for message in tied]
+    assert [row["is_excerpt"] for row in context["messages"]] == [False, True, False]
@@ -0,0 +1,78 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from openai import AsyncOpenAI, RateLimitError
+
+from app.core.config import get_settings
+from app.services.llm import client as llm_client
+from app.services.llm import openai_client
+from app.services.llm.repair import repair_metrics
+from scripts.fake_openai_server import FakeOpenAI, FakeOpenAIConfig, serve_in_thread
+
+
+@pytest.fixture()
+def fake_openai(monkeypatch):
+    """Route the real LLM pipeline to a local stand-in; tests adjust `fake.config` as needed."""
+    fake = FakeOpenAI(FakeOpenAIConfig(latency="fixed", latency_seconds=0.01, seed=7))
+    with serve_in_thread(fake) as base_url:
+        monkeypatch.setattr(get_settings(), "openai_base_url", base_url)
+        monkeypatch.setattr(llm_client, "breaker", llm_client._new_breaker())
+        monkeypatch.setattr(llm_client, "limiter", llm_client._new_limiter())
+        monkeypatch.setattr("app.services.analysis.runner.analyze_chat_with_llm", openai_client.analyze_chat_with_llm)
+        yield fake
+
+
+def _analyze(client) -> dict:
+    with Path("tests/fixtures/generic_chat.json").open("rb") as handle:
+        upload_id = client.post("/compat/upload", files={"file": ("generic_chat.json", handle, "application/json")}).json()["upload_id"]
+    response = client.post(f"/compat/uploads/{upload_id}/analyze")
+    assert response.status_code == 200
+    return client.get(f"/compat/reports/{upload_id}").json()
+
+
+def test_real_pipeline_runs_against_the_stand_in(fake_openai, client):
+    report = _analyze(client)
+    stats = fake_openai.stats()
+    assert stats["kinds"] == {"report": 1}
+    assert stats["statuses"] == {"200": 1}
+    assert stats["prompt_tokens"] > 0 and stats["completion_tokens"] > 0
+    # Evidence quotes the verbatim messages, so verification keeps it.
+    assert report["signals"][0]["evidence"][0]["excerpt"] == "I miss you"
+
+
+def test_malformed_reports_take_the_local_repair_path(fake_openai, client):
+    fake_openai.config.malformed_rate = 1.0
+    before = repair_metrics()
+    report = _analyze(client)
+    assert fake_openai.stats()["injected"]["malformed"] == 1
+    assert repair_metrics()["repaired_locally"] - before["repaired_locally"] == 1
+    assert report["timeline"][0]["type"] in {"warm", "cool", "mixed"}
+
+
+def test_rate_limits_and_stream_usage_are_injected_and_accounted():
+    fake = FakeOpenAI(FakeOpenAIConfig(latency="fixed", latency_seconds=0.01, rate_limit_rate=1.0, retry_after_seconds=2))
+    with serve_in_thread(fake) as base_url:
+
+        async def scenario():
+            client = AsyncOpenAI(api_key="test-key", base_url=base_url, max_retries=0)
+            with pytest.raises(RateLimitError) as limited:
+                await client.chat.completions.create(model="gpt-4o-mini", messages=[{"role": "user", "content": "{}"}])
+            assert limited.value.response.headers["retry-after"] == "2"
+
+            fake.config.rate_limit_rate = 0.0
+            stream = await client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": "{}"}],
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            chunks = [chunk async for chunk in stream]
+            await client.close()
+            return chunks
+
+        chunks = asyncio.run(scenario())
+    text = "".join(chunk.choices[0].delta.content or "" for chunk in chunks if chunk.choices)
+    assert text.startswith('{"mixed_signal_index"')
+    assert chunks[-1].usage.completion_tokens == fake.stats()["completion_tokens"]
+    assert fake.stats()["statuses"] == {"429": 1, "200": 1}
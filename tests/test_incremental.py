@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta, timezone
+
+from app.db.session import SessionLocal
+from app.models.analysis_checkpoint import AnalysisCheckpoint
+from app.models.upload import Upload
+from app.services.analysis.pipeline import _resume_state, run_analysis
+from app.services.ingest import store_parsed_messages
+from app.services.parsing.types import ParsedMessage
+
+TEXTS = [
+    "love you, can't wait to see you",
+    "maybe later, busy this week",
+    "let's do dinner friday?",
+    "not ready to talk about that",
+    "miss you so much",
+    "ok",
+]
+
+
+def _messages(count: int) -> list[ParsedMessage]:
+    start = datetime(2025, 5, 1, 8, tzinfo=timezone.utc)
+    return [
+        ParsedMessage(
+            ts=start + timedelta(hours=3 * idx + (idx % 4)),
+            sender="Alex" if idx % 3 else "Sam",
+            text=TEXTS[idx % len(TEXTS)],
+        )
+        for idx in range(count)
+    ]
+
+
+def _upload(db) -> Upload:
+    upload = Upload(platform="generic", timezone="UTC", file_path="unused.json")
+    db.add(upload)
+    db.flush()
+    return upload
+
+
+def _comparable(result: dict) -> dict:
+    metrics = result["timeline_metrics"]
+    return {
+        "detectors": [(d["name"], d["score"], len(d["evidence_ids"])) for d in result["detectors"]],
+        "mixed_signal_index": result["mixed_signal_index"],
+        "confidence": result["confidence"],
+        "messages_per_day": metrics["messages_per_day"],
+        "initiation_counts": metrics["initiation_counts"],
+        "sessions": metrics["sessions"],
+        "response_counts": {k: v["count"] for k, v in metrics["response_time_stats"].items()},
+    }
+
+
+def test_incremental_analysis_matches_full_recompute():
+    messages = _messages(18)
+    db = SessionLocal()
+    try:
+        incremental = _upload(db)
+        store_parsed_messages(db, incremental, messages[:11])
+        db.commit()
+        run_analysis(db, incremental.id)
+
+        store_parsed_messages(db, incremental, messages[11:])
+        db.commit()
+        appended = run_analysis(db, incremental.id)
+        checkpoint = db.query(AnalysisCheckpoint).filter(AnalysisCheckpoint.upload_id == incremental.id).one()
+        assert checkpoint.message_count == len(messages)
+
+        fresh = _upload(db)
+        store_parsed_messages(db, fresh, messages)
+        db.commit()
+        assert _comparable(appended) == _comparable(run_analysis(db, fresh.id))
+    finally:
+        db.close()
+
+
+def test_unchanged_upload_returns_cached_result(monkeypatch):
+    db = SessionLocal()
+    try:
+        upload = _upload(db)
+        store_parsed_messages(db, upload, _messages(12))
+        db.commit()
+        first = run_analysis(db, upload.id)
+
+        def _no_lookup(*args, **kwargs):
+            raise AssertionError("cached analysis should not decrypt evidence again")
+
+        monkeypatch.setattr("app.services.analysis.pipeline._lookup_messages", _no_lookup)
+        assert run_analysis(db, upload.id) == first
+    finally:
+        db.close()
+
+
+def test_resume_reads_the_persisted_session_index():
+    from app.models.conversation_session import ConversationSession
+
+    messages = _messages(18)
+    db = SessionLocal()
+    try:
+        upload = _upload(db)
+        store_parsed_messages(db, upload, messages[:11])
+        db.commit()
+        run_analysis(db, upload.id)
+        checkpoint = db.query(AnalysisCheckpoint).filter(AnalysisCheckpoint.upload_id == upload.id).one()
+        assert "sessions" not in checkpoint.state_json["sessions"]
+
+        assert _resume_state(db, upload.id, checkpoint) is not None
+
+        # Without the stored spans the checkpoint cannot be resumed and the upload is recomputed in full.
+        db.query(ConversationSession).filter(ConversationSession.upload_id == upload.id).delete()
+        store_parsed_messages(db, upload, messages[11:])
+        db.commit()
+        assert _resume_state(db, upload.id, checkpoint) is None
+        recomputed = run_analysis(db, upload.id)
+        stored = db.query(ConversationSession).filter(ConversationSession.upload_id == upload.id).count()
+        assert stored == recomputed["timeline_metrics"]["sessions"]["session_count"]
+
+        fresh = _upload(db)
+        store_parsed_messages(db, fresh, messages)
+        db.commit()
+        assert _comparable(recomputed) == _comparable(run_analysis(db, fresh.id))
+    finally:
+        db.close()
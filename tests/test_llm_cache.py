@@ -0,0 +1,101 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from sqlalchemy import func, select
+
+from app.db.session import SessionLocal
+from app.models.llm_cache_entry import LLMCacheEntry
+from app.services.llm import openai_client
+from app.services.llm.cache import LLMResponseCache, cache_metrics
+
+MESSAGES = [
+    {"id": "m1", "ts": datetime(2025, 12, 1, 10, tzinfo=timezone.utc), "sender": "A", "text": "I miss you"},
+    {"id": "m2", "ts": datetime(2025, 12, 1, 20, tzinfo=timezone.utc), "sender": "B", "text": "maybe later, busy"},
+]
+REPORT = {
+    "mixed_signal_index": 60,
+    "confidence": 0.7,
+    "summary": "Mixed.",
+    "timeline": [],
+    "stats": {"initiation_percent": 50, "reply_delay_ratio": 1.2, "red_flags": 1},
+    "signals": [
+        {
+            "name": "Warm-cold cycles",
+            "score": 0.6,
+            "explanation": "Warmth then distance.",
+            "evidence": [{"timestamp": "2025-12-01T20:00:00+00:00", "excerpt": "maybe later", "sender": "B"}],
+        }
+    ],
+}
+
+
+class FakeOpenAI:
+    calls = 0
+
+    def __init__(self, **kwargs) -> None:
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, **kwargs):
+        FakeOpenAI.calls += 1
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(REPORT)))])
+
+
+def test_identical_requests_are_served_from_cache(monkeypatch):
+    monkeypatch.setattr(openai_client, "get_openai_client", FakeOpenAI)
+    FakeOpenAI.calls = 0
+    before = cache_metrics()
+    cache = LLMResponseCache()
+    first = asyncio.run(openai_client.analyze_chat_with_llm(MESSAGES, response_cache=cache))
+    second = asyncio.run(openai_client.analyze_chat_with_llm(MESSAGES, response_cache=cache))
+    assert FakeOpenAI.calls == 1
+    assert first == second
+    assert second["signals"][0]["evidence"][0]["message_id"] == "m2"
+
+    asyncio.run(openai_client.analyze_chat_with_llm(MESSAGES, response_cache=cache, refresh=True))
+    assert FakeOpenAI.calls == 2
+
+    changed = [*MESSAGES, {**MESSAGES[1], "id": "m3", "text": "ok"}]
+    asyncio.run(openai_client.analyze_chat_with_llm(changed, response_cache=cache))
+    assert FakeOpenAI.calls == 3
+
+    after = cache_metrics()
+    assert after["hits"] - before["hits"] == 1
+    assert after["misses"] - before["misses"] == 2
+    assert after["bypassed"] - before["bypassed"] == 1
+
+
+def test_expired_and_excess_entries_are_evicted():
+    cache = LLMResponseCache(ttl_seconds=60, max_entries=2)
+    for idx in range(3):
+        cache.put(f"key-{idx}", "gpt-4o-mini", {"idx": idx})
+    with SessionLocal() as db:
+        assert db.scalar(select(func.count(LLMCacheEntry.id))) == 2
+    assert cache.get("key-0") is None
+    assert cache.get("key-2") == {"idx": 2}
+
+    with SessionLocal() as db:
+        stale = db.scalar(select(LLMCacheEntry).where(LLMCacheEntry.key == "key-1"))
+        stale.expires_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+        db.commit()
+    assert cache.get("key-1") is None
+
+
+def test_cache_does_not_touch_the_callers_transaction():
+    cache = LLMResponseCache()
+    now = datetime.now(timezone.utc)
+    with SessionLocal() as db:
+        pending = LLMCacheEntry(
+            key="pending", model="gpt-4o-mini", response_json={}, expires_at=now + timedelta(seconds=60), last_used_at=now
+        )
+        db.add(pending)
+        cache.put("stored", "gpt-4o-mini", {"ok": True})
+        assert cache.get("stored") == {"ok": True}
+        db.rollback()
+
+    with SessionLocal() as db:
+        keys = set(db.scalars(select(LLMCacheEntry.key)))
+        hits = db.scalar(select(LLMCacheEntry.hit_count).where(LLMCacheEntry.key == "stored"))
+    assert keys == {"stored"}
+    assert hits == 1
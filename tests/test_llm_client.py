@@ -0,0 +1,210 @@
+import asyncio
+import contextlib
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from openai import BadRequestError, InternalServerError, RateLimitError
+
+from app.services.llm import client as llm_client
+from app.services.llm.client import AdaptiveLimiter, CircuitBreaker, LLMOverloadedError, LLMUnavailableError, create_with_retries
+
+
+def _error(cls, status: int, headers: dict | None = None):
+    response = httpx.Response(status, headers=headers, request=httpx.Request("POST", "http://llm.test/v1/chat/completions"))
+    return cls("provider error", response=response, body=None)
+
+
+class ScriptedClient:
+    def __init__(self, *outcomes) -> None:
+        self.outcomes = list(outcomes)
+        self.calls = 0
+        self.kwargs: list[dict] = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, **kwargs):
+        self.calls += 1
+        self.kwargs.append(kwargs)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays: list[float] = []
+
+    async def sleep(delay: float) -> None:
+        delays.append(delay)
+
+    monkeypatch.setattr(llm_client.asyncio, "sleep", sleep)
+    monkeypatch.setattr(llm_client, "breaker", CircuitBreaker(failure_threshold=2, reset_seconds=60))
+    monkeypatch.setattr(llm_client, "limiter", _limiter())
+    return delays
+
+
+def _limiter(**overrides) -> AdaptiveLimiter:
+    options = {"initial": 4, "minimum": 1, "maximum": 8, "latency_target": 1.0, "queue_max": 10, "queue_timeout": 1.0}
+    return AdaptiveLimiter(**{**options, **overrides})
+
+
+def test_retries_transient_errors_with_backoff(sleeps):
+    client = ScriptedClient(
+        _error(RateLimitError, 429, {"retry-after": "2"}),
+        _error(InternalServerError, 503),
+        "completion",
+    )
+    assert asyncio.run(create_with_retries(client, model="m", messages=[])) == "completion"
+    assert client.calls == 3
+    assert sleeps[0] == 2.0
+    assert 0 <= sleeps[1] <= 1.0
+
+
+def test_calls_keep_the_clients_connect_timeout(sleeps, monkeypatch):
+    settings = llm_client.get_settings()
+    monkeypatch.setattr(settings, "openai_api_key", "test-key")
+
+    async def shared_timeout():
+        try:
+            return llm_client.get_openai_client().timeout
+        finally:
+            await llm_client.close_openai_client()
+
+    timeout = asyncio.run(shared_timeout())
+    assert timeout.connect == settings.openai_connect_timeout_seconds
+    assert timeout.read == settings.openai_timeout_seconds
+
+    client = ScriptedClient("completion")
+    asyncio.run(create_with_retries(client, model="m", messages=[]))
+    assert "timeout" not in client.kwargs[0]
+
+
+def test_client_errors_are_not_retried(sleeps):
+    client = ScriptedClient(_error(BadRequestError, 400))
+    with pytest.raises(BadRequestError):
+        asyncio.run(create_with_retries(client, model="m", messages=[]))
+    assert client.calls == 1 and not sleeps
+
+
+def test_circuit_opens_after_repeated_failures(sleeps):
+    failures = [_error(InternalServerError, 500) for _ in range(8)]
+    client = ScriptedClient(*failures)
+    for _ in range(2):
+        with pytest.raises(InternalServerError):
+            asyncio.run(create_with_retries(client, model="m", messages=[]))
+    calls = client.calls
+    with pytest.raises(LLMUnavailableError):
+        asyncio.run(create_with_retries(client, model="m", messages=[]))
+    assert client.calls == calls
+    assert llm_client.breaker.state == "open"
+
+
+def test_open_circuit_falls_back_to_statistical_report(client, monkeypatch):
+    from tests.test_analytics import _create_upload
+    from tests.test_api import _auth_headers
+
+    async def _circuit_open(messages, **kwargs):
+        raise LLMUnavailableError("LLM circuit is open")
+
+    monkeypatch.setattr("app.services.analysis.runner.analyze_chat_with_llm", _circuit_open)
+    headers = _auth_headers(client)
+    upload_id = _create_upload(client, headers)
+    response = client.post(f"/uploads/{upload_id}/analyze", headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["signals"]
+
+
+def test_limiter_adapts_to_latency_and_throttling():
+    limiter = _limiter(initial=2, latency_target=1.0)
+
+    async def scenario():
+        for _ in range(20):
+            await limiter.acquire()
+            limiter.release(0.1)
+        assert limiter.limit > 4
+        raised = limiter.limit
+        await limiter.acquire()
+        limiter.release(throttled=True)
+        assert limiter.limit == raised / 2
+        assert limiter.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_streamed_calls_hold_their_slot_until_consumed(monkeypatch):
+    limiter = _limiter(initial=2, maximum=2)
+    monkeypatch.setattr(llm_client, "limiter", limiter)
+    monkeypatch.setattr(llm_client, "breaker", CircuitBreaker(failure_threshold=2, reset_seconds=60))
+    streaming = {"active": 0, "peak": 0}
+
+    async def create(**kwargs):
+        async def chunks():
+            streaming["active"] += 1
+            streaming["peak"] = max(streaming["peak"], streaming["active"])
+            try:
+                for piece in range(3):
+                    await asyncio.sleep(0.01)
+                    yield piece
+            finally:
+                streaming["active"] -= 1
+
+        return chunks()
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    async def consume(early: bool) -> None:
+        stream = await create_with_retries(client, model="m", messages=[], stream=True)
+        async with contextlib.aclosing(stream):
+            async for _ in stream:
+                if early:
+                    break
+
+    async def scenario():
+        await asyncio.gather(*(consume(early=idx % 2 == 0) for idx in range(6)))
+
+    asyncio.run(scenario())
+    assert streaming["peak"] == 2
+    assert limiter.in_flight == 0
+
+
+def test_limiter_queues_then_sheds_load():
+    limiter = _limiter(initial=1, queue_max=1, queue_timeout=0.05)
+
+    async def scenario():
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(LLMOverloadedError) as rejected:
+            await limiter.acquire()
+        assert rejected.value.retry_after >= 1
+        with pytest.raises(LLMOverloadedError):
+            await waiter
+        granted = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        limiter.release(0.1)
+        await granted
+        assert limiter.in_flight == 1
+        assert limiter.snapshot()["rejected"] == 1 and limiter.snapshot()["timeouts"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_saturated_queue_returns_503_or_degrades(client, monkeypatch):
+    from app.core.config import get_settings
+    from tests.test_analytics import _create_upload
+    from tests.test_api import _auth_headers
+
+    async def _overloaded(messages, **kwargs):
+        raise LLMOverloadedError("LLM request queue is full", retry_after=2.5)
+
+    monkeypatch.setattr("app.services.analysis.runner.analyze_chat_with_llm", _overloaded)
+    headers = _auth_headers(client)
+    upload_id = _create_upload(client, headers)
+    assert client.post(f"/uploads/{upload_id}/analyze", headers=headers).status_code == 200
+    assert "limit" in client.get("/metrics").json()["llm_limiter"]
+
+    monkeypatch.setattr(get_settings(), "llm_overload_policy", "reject")
+    response = client.post(f"/uploads/{upload_id}/analyze", headers=headers)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "3"
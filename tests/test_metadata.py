@@ -0,0 +1,51 @@
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.security import decrypt_text
+from app.db.session import SessionLocal
+from app.models.upload import Upload
+from app.services.analysis.metadata import metadata_timeline_metrics
+from app.services.analysis.pipeline import run_analysis
+from app.services.ingest import store_parsed_messages
+from app.services.parsing.types import ParsedMessage
+
+
+def _messages() -> list[ParsedMessage]:
+    start = datetime(2025, 2, 1, 9, tzinfo=timezone.utc)
+    offsets = [0, 4, 9, 30, 31, 600, 605, 640, 2000, 2003, 2010, 4000, 4090, 4100, 4200]
+    return [
+        ParsedMessage(ts=start + timedelta(minutes=offset), sender="Sam" if idx % 3 else "Alex", text=f"hello {idx}")
+        for idx, offset in enumerate(offsets)
+    ]
+
+
+def test_metadata_metrics_match_pipeline_without_decrypting(monkeypatch):
+    db = SessionLocal()
+    try:
+        upload = Upload(platform="generic", timezone="UTC", file_path="unused.json")
+        db.add(upload)
+        db.flush()
+        store_parsed_messages(db, upload, _messages())
+        db.commit()
+        expected = run_analysis(db, upload.id)["timeline_metrics"]
+
+        def _no_decrypt(value):
+            raise AssertionError("metadata analytics must not decrypt messages")
+
+        # Modules import decrypt_text by name, so every bound reference is replaced, not just the definition.
+        with monkeypatch.context() as patch:
+            for module in list(sys.modules.values()):
+                if getattr(module, "decrypt_text", None) is decrypt_text:
+                    patch.setattr(module, "decrypt_text", _no_decrypt)
+            metrics = metadata_timeline_metrics(db, upload.id)
+
+        for key in ("messages_per_day", "messages_per_week", "initiation_counts", "sessions", "streaks"):
+            assert metrics[key] == expected[key]
+        for sender, stats in expected["response_time_stats"].items():
+            assert metrics["response_time_stats"][sender]["count"] == stats["count"]
+            assert metrics["response_time_stats"][sender]["avg_minutes"] == pytest.approx(stats["avg_minutes"], rel=1e-3)
+
+    finally:
+        db.close()
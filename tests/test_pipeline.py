@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta, timezone
+
+from app.services.analysis.pipeline import _moments_of_ambiguity
+from app.services.analysis.types import DetectorResult
+
+
+def _row(mid: str, ts: datetime) -> dict:
+    return {"id": mid, "ts": ts, "sender_id": "a", "sender_name": "A", "text": f"message {mid}"}
+
+
+def test_moments_merge_nearby_evidence_across_detectors():
+    base = datetime(2025, 6, 1, 20, tzinfo=timezone.utc)
+    by_id = {
+        "1": _row("1", base),
+        "2": _row("2", base + timedelta(minutes=30)),
+        "3": _row("3", base + timedelta(minutes=50)),
+        "4": _row("4", base + timedelta(days=40)),
+        "5": _row("5", base + timedelta(days=90)),
+    }
+    detectors = [
+        DetectorResult("warm_cold_cycles", 0.5, "", ["1", "4"]),
+        DetectorResult("boundary_setting_language", 0.4, "", ["2"]),
+        DetectorResult("unresolved_future_talk", 0.3, "", ["3", "5"]),
+    ]
+    moments = _moments_of_ambiguity(by_id, detectors)
+
+    assert len(moments) == 3
+    top = moments[0]
+    assert top["detectors_triggered"] == ["warm_cold_cycles", "boundary_setting_language", "unresolved_future_talk"]
+    assert top["evidence_ids"] == ["1", "2", "3"]
+    assert top["window_start"] == base.isoformat()
+    assert top["window_end"] == (base + timedelta(minutes=50)).isoformat()
+    # Evidence from one detector months apart no longer becomes a single months-long window.
+    assert all(m["window_start"] == m["window_end"] for m in moments[1:])
@@ -0,0 +1,78 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from app.schemas.llm_report import LLMReport
+from app.services.llm import openai_client
+from app.services.llm.repair import repair_metrics, repair_model
+
+MALFORMED = {
+    "mixed_signal_index": "72.6",
+    "confidence": 1.4,
+    "summary": "Mixed.",
+    "timeline": [
+        {"timestamp": "12/01/2025 10:00", "message": "I miss you", "type": "Warm"},
+        {"timestamp": 1764583200000, "message": 42, "tags": "late", "type": "cool"},
+        {"timestamp": "sometime", "message": "dropped", "type": "warm"},
+        {"timestamp": "2025-12-01T12:00:00Z", "message": "dropped", "type": "chilly"},
+    ],
+    "signals": [
+        {
+            "name": "Warm-cold cycles",
+            "score": "80%",
+            "explanation": "Warmth then distance.",
+            "evidence": [{"timestamp": "2025-12-01 20:00", "excerpt": "maybe later", "sender": "B", "message_id": 5}],
+        },
+        {"name": "Slow replies", "score": -0.2, "explanation": "Gaps."},
+    ],
+}
+
+
+def _completion(payload: dict):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(payload)))])
+
+
+def test_mechanical_schema_errors_are_repaired_locally():
+    report = repair_model(LLMReport, MALFORMED)
+    assert report is not None
+    assert report.mixed_signal_index == 73
+    assert report.confidence == 1.0
+    assert [item.type for item in report.timeline] == ["warm", "cool"]
+    assert report.timeline[1].message == "42" and report.timeline[1].tags == ["late"]
+    assert report.timeline[1].timestamp.year == 2025
+    assert report.stats.red_flags == 0
+    assert report.signals[0].score == 0.8
+    assert report.signals[0].evidence[0].message_id == "5"
+    assert report.signals[1].score == 0.0
+
+
+def test_unrepairable_payloads_return_none():
+    assert repair_model(LLMReport, ["not", "an", "object"]) is None
+    assert repair_model(LLMReport, {**MALFORMED, "mixed_signal_index": "high"}) is None
+
+
+def test_llm_repair_only_runs_when_local_repair_fails():
+    calls: list[dict] = []
+    valid = repair_model(LLMReport, MALFORMED).model_dump(mode="json")
+
+    def client_returning(*payloads):
+        async def create(**kwargs):
+            calls.append(kwargs)
+            return _completion(payloads[len(calls) - 1])
+
+        return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    before = repair_metrics()
+    asyncio.run(openai_client._request_report(client_returning(MALFORMED), "gpt-4o-mini", {}))
+    assert len(calls) == 1
+
+    calls.clear()
+    unrepairable = {**MALFORMED, "summary": None, "mixed_signal_index": "high"}
+    report = asyncio.run(openai_client._request_report(client_returning(unrepairable, valid), "gpt-4o-mini", {}))
+    assert len(calls) == 2
+    assert report["mixed_signal_index"] == 73
+
+    after = repair_metrics()
+    assert after["repaired_locally"] - before["repaired_locally"] == 1
+    assert after["llm_repairs"] - before["llm_repairs"] == 1
+    assert after["fixes"]["dropped"] > before["fixes"]["dropped"]
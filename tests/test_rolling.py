@@ -0,0 +1,41 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+from app.services.analysis.features import build_timeline_metrics
+from app.services.analysis.rolling import RollingWindow, lttb
+
+
+def test_count_and_time_windows_match_direct_computation():
+    rng = random.Random(3)
+    values = [rng.uniform(-1, 1) for _ in range(200)]
+    by_count = RollingWindow(size=10)
+    by_time = RollingWindow(span_seconds=3600)
+    for idx, value in enumerate(values):
+        by_count.push(idx * 600.0, value)
+        by_time.push(idx * 600.0, value)
+    assert abs(by_count.mean - sum(values[-10:]) / 10) < 1e-9
+    assert by_time.count == 7
+    assert abs(by_time.mean - sum(values[-7:]) / 7) < 1e-9
+    restored = RollingWindow.from_state(by_count.to_state())
+    assert abs(restored.volatility - by_count.volatility) < 1e-9
+
+
+def test_lttb_keeps_endpoints_and_spikes():
+    points = [(float(x), 0.0) for x in range(1000)]
+    points[500] = (500.0, 10.0)
+    sampled = lttb(points, 20)
+    assert len(sampled) == 20
+    assert sampled[0] == points[0] and sampled[-1] == points[-1]
+    assert (500.0, 10.0) in sampled
+
+
+def test_engagement_output_is_bounded():
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    features = [
+        {"id": str(idx), "ts": start + timedelta(minutes=7 * idx), "sender_id": str(idx % 2), "sender_name": str(idx % 2), "sentiment": (idx % 5) / 5}
+        for idx in range(3000)
+    ]
+    metrics = build_timeline_metrics(features)
+    assert len(metrics["engagement_shifts"]) == 200
+    assert set(metrics["engagement_windows"]) == {"count_10", "count_50", "1h", "1d", "7d"}
+    assert all(len(points) <= 200 for points in metrics["engagement_windows"].values())
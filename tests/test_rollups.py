@@ -0,0 +1,93 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.core.security import encrypt_text
+from app.db.session import SessionLocal
+from app.models.daily_rollup import DailyRollup
+from app.models.message import Message
+from app.models.participant import Participant
+from app.models.upload import Upload
+from app.services.analysis.metadata import metadata_timeline_metrics
+from app.services.analysis.rollups import rollup_timeline_metrics
+from app.services.ingest import store_parsed_messages
+from app.services.parsing.types import ParsedMessage
+
+
+def _messages(days: int, per_day: int = 3) -> list[ParsedMessage]:
+    start = datetime(2022, 1, 1, 8, tzinfo=timezone.utc)
+    return [
+        ParsedMessage(
+            ts=start + timedelta(days=day, minutes=17 * idx),
+            sender="Alex" if (day + idx) % 2 else "Sam",
+            text="hi",
+        )
+        for day in range(days)
+        for idx in range(per_day)
+    ]
+
+
+def _upload(db) -> Upload:
+    upload = Upload(platform="generic", timezone="UTC", file_path="unused.json")
+    db.add(upload)
+    db.flush()
+    return upload
+
+
+def _comparable(metrics: dict) -> dict:
+    return {
+        **{key: metrics[key] for key in ("messages_per_day", "initiation_counts", "sessions", "streaks")},
+        "replies": {name: stats["count"] for name, stats in metrics["response_time_stats"].items()},
+    }
+
+
+def test_rollups_updated_on_append_match_sql_metrics():
+    messages = _messages(40)
+    db = SessionLocal()
+    try:
+        upload = _upload(db)
+        store_parsed_messages(db, upload, messages[:70])
+        db.commit()
+        store_parsed_messages(db, upload, messages[70:])
+        db.commit()
+        assert _comparable(rollup_timeline_metrics(db, upload.id)) == _comparable(metadata_timeline_metrics(db, upload.id))
+    finally:
+        db.close()
+
+
+def test_rollups_backfill_messages_stored_before_they_existed():
+    messages = _messages(10)
+    db = SessionLocal()
+    try:
+        upload = _upload(db)
+        participants = {}
+        for name in ("Alex", "Sam"):
+            participants[name] = Participant(upload_id=upload.id, display_name=name, normalized_id=name.lower())
+            db.add(participants[name])
+        db.flush()
+        for row in messages[:20]:
+            db.add(Message(upload_id=upload.id, ts=row.ts, sender_id=participants[row.sender].id, encrypted_text=encrypt_text(row.text), metadata_json={}))
+        db.commit()
+        assert rollup_timeline_metrics(db, upload.id) is None
+
+        store_parsed_messages(db, upload, messages[20:])
+        db.commit()
+        metrics = rollup_timeline_metrics(db, upload.id)
+        assert sum(metrics["messages_per_day"].values()) == len(messages)
+    finally:
+        db.close()
+
+
+def test_multi_year_chart_data_reads_only_rollups():
+    db = SessionLocal()
+    try:
+        upload = _upload(db)
+        store_parsed_messages(db, upload, _messages(3 * 365, per_day=2))
+        db.commit()
+        assert db.query(DailyRollup).filter(DailyRollup.upload_id == upload.id).count() == 2 * 3 * 365
+
+        started = time.perf_counter()
+        metrics = rollup_timeline_metrics(db, upload.id)
+        assert time.perf_counter() - started < 0.5
+        assert len(metrics["messages_per_day"]) == 3 * 365
+    finally:
+        db.close()
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, timezone
+
+from app.db.session import SessionLocal
+from app.models.conversation_session import ConversationSession
+from app.models.upload import Upload
+from app.services.analysis.sessions import (
+    DEFAULT_SESSION_GAP_SECONDS,
+    choose_gap_threshold,
+    save_session_index,
+    segment_sessions,
+)
+
+
+def _rows(day_count: int = 10, per_session: int = 8) -> list[dict]:
+    rows = []
+    start = datetime(2025, 3, 1, 9, tzinfo=timezone.utc)
+    for day in range(day_count):
+        for idx in range(per_session):
+            sender = "a" if (idx + day) % 2 else "b"
+            rows.append(
+                {
+                    "id": f"m{day}-{idx}",
+                    "ts": start + timedelta(days=day, minutes=3 * idx),
+                    "sender_id": sender,
+                    "sender_name": sender.upper(),
+                }
+            )
+    return rows
+
+
+def test_gap_threshold_separates_bursts_from_pauses():
+    gaps = [120.0] * 40 + [86400.0] * 10
+    threshold = choose_gap_threshold(gaps)
+    assert 120 < threshold < 86400
+    assert choose_gap_threshold([60.0, 3600.0]) == DEFAULT_SESSION_GAP_SECONDS
+
+
+def test_segment_sessions_finds_daily_conversations():
+    rows = _rows()
+    index = segment_sessions(rows)
+    assert len(index.sessions) == 10
+    assert [span.initiator_name for span in index.sessions[:2]] == ["B", "A"]
+    assert index.session_of_positions()[8] == 1
+
+
+def test_session_index_is_persisted_from_sequence():
+    rows = _rows()
+    db = SessionLocal()
+    try:
+        upload = Upload(platform="generic", timezone="UTC", file_path="unused.json")
+        db.add(upload)
+        db.commit()
+
+        first = segment_sessions(rows[:-8])
+        save_session_index(db, upload.id, first)
+        db.commit()
+        assert db.query(ConversationSession).filter(ConversationSession.upload_id == upload.id).count() == 9
+
+        full = segment_sessions(rows, first.gap_seconds)
+        save_session_index(db, upload.id, full, from_seq=len(first.sessions) - 1)
+        db.commit()
+        stored = (
+            db.query(ConversationSession)
+            .filter(ConversationSession.upload_id == upload.id)
+            .order_by(ConversationSession.seq)
+            .all()
+        )
+        assert [s.first_message_id for s in stored] == [s.first_message_id for s in full.sessions]
+    finally:
+        db.close()
@@ -0,0 +1,41 @@
+import random
+
+from app.services.analysis.sketches import LatencySketch, merge_response_time_stats, summarize_sketch
+
+
+def _exact_quantile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def test_quantiles_within_relative_error():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(2.0, 1.5) for _ in range(20000)]
+    sketch = LatencySketch()
+    for value in values:
+        sketch.add(value)
+    for q in (0.5, 0.9, 0.99):
+        exact = _exact_quantile(values, q)
+        assert abs(sketch.quantile(q) - exact) <= exact * 0.02
+    assert len(sketch.buckets) <= sketch.max_buckets
+    assert sum(row["count"] for row in sketch.histogram()) == len(values)
+
+
+def test_serialized_sketches_merge_like_a_single_pass():
+    rng = random.Random(11)
+    first = [rng.expovariate(1 / 30) for _ in range(500)]
+    second = [rng.expovariate(1 / 300) for _ in range(700)]
+    left, right, combined = LatencySketch(), LatencySketch(), LatencySketch()
+    for value in first:
+        left.add(value)
+        combined.add(value)
+    for value in second:
+        right.add(value)
+        combined.add(value)
+
+    merged = merge_response_time_stats({"A": summarize_sketch(left)}, {"A": summarize_sketch(right)})["A"]
+    expected = summarize_sketch(combined)
+    assert merged["count"] == 1200
+    assert merged["p90_minutes"] == expected["p90_minutes"]
+    assert merged["histogram"] == expected["histogram"]
+    assert LatencySketch.from_dict(merged["sketch"]).to_dict()["keys"] == expected["sketch"]["keys"]
@@ -0,0 +1,66 @@
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from app.db.session import SessionLocal
+from app.models.upload import Upload
+from app.services.analysis.pipeline import iter_messages, run_analysis
+from app.services.ingest import store_parsed_messages
+from app.services.parsing.types import ParsedMessage
+
+WORDS = ["love you", "maybe later", "busy today", "let's plan dinner", "not ready", "miss you", "ok"]
+
+
+def _messages(count: int, sessions: int = 30) -> list[ParsedMessage]:
+    start = datetime(2024, 3, 1, 8, tzinfo=timezone.utc)
+    per_session = count // sessions
+    return [
+        ParsedMessage(
+            ts=start + timedelta(days=idx // per_session, seconds=20 * (idx % per_session)),
+            sender="Alex" if idx % 3 else "Sam",
+            text=f"{WORDS[idx % len(WORDS)]} {idx}",
+        )
+        for idx in range(count)
+    ]
+
+
+def _analysis_peak(count: int) -> int:
+    db = SessionLocal()
+    try:
+        upload = Upload(platform="generic", timezone="UTC", file_path="unused.json")
+        db.add(upload)
+        db.flush()
+        store_parsed_messages(db, upload, _messages(count))
+        db.commit()
+        upload_id = upload.id
+        db.expunge_all()
+
+        tracemalloc.start()
+        run_analysis(db, upload_id)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak
+    finally:
+        db.close()
+
+
+def test_iter_messages_pages_in_time_order():
+    db = SessionLocal()
+    try:
+        upload = Upload(platform="generic", timezone="UTC", file_path="unused.json")
+        db.add(upload)
+        db.flush()
+        store_parsed_messages(db, upload, _messages(90))
+        db.commit()
+        rows = list(iter_messages(db, upload.id, page_size=7))
+        assert len(rows) == 90
+        assert [row["ts"] for row in rows] == sorted(row["ts"] for row in rows)
+        assert rows[0]["text"] == "love you 0"
+    finally:
+        db.close()
+
+
+def test_analysis_memory_does_not_grow_with_chat_length():
+    small = _analysis_peak(2_000)
+    large = _analysis_peak(8_000)
+    # Four times the messages in the same sessions: the streamed fold keeps peak memory roughly flat.
+    assert large < small * 1.5
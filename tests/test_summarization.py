@@ -0,0 +1,81 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from app.services.llm import openai_client
+
+
+class FakeSummarizer:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.chunk_calls = 0
+        self.active = 0
+        self.peak = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, **kwargs):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.02)
+        self.active -= 1
+        if kwargs.get("response_format"):
+            self.chunk_calls += 1
+            content = json.dumps({"summary": "x" * 400, "notable_events": []})
+        else:
+            content = "merged " + "y" * 300
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+BUDGET_TOKENS = 6000
+
+
+def _messages(count: int) -> list[dict]:
+    # Every 53rd message is detector evidence; those after the first 3000 rank higher, so an append pushes
+    # older evidence out of the verbatim selection all across the history.
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    messages = []
+    for idx in range(count):
+        text = f"message {idx} " + "word " * 30
+        if idx % 53 == 0:
+            text = "maybe later, busy" if idx < 3000 else "I love you and miss you, but maybe later, busy, not ready"
+        messages.append({"ts": start + timedelta(minutes=idx), "sender": "A" if idx % 2 else "B", "text": text})
+    return messages
+
+
+def _compress(client: FakeSummarizer, messages: list[dict], cache: dict[str, str]) -> str | None:
+    selected = openai_client._select_verbatim(messages, BUDGET_TOKENS)
+    return asyncio.run(openai_client._compress_context(client, messages, selected, "gpt-4o-mini", cache))
+
+
+def test_chunks_are_summarized_concurrently_and_reduced():
+    messages = _messages(3000)
+    client = FakeSummarizer()
+    cache: dict[str, str] = {}
+    summary = _compress(client, messages, cache)
+
+    chunks = openai_client._summary_chunks(messages, set(openai_client._select_verbatim(messages, BUDGET_TOKENS)))
+    assert len(chunks) > openai_client.SUMMARY_REDUCE_FANIN
+    assert client.peak > 1
+    assert summary.startswith("merged")
+    assert len(summary) <= openai_client.MAX_CONTEXT_SUMMARY_CHARS
+    assert client.calls == len(cache) > len(chunks)
+
+
+def test_append_only_summarizes_new_chunks():
+    messages = _messages(3000)
+    cache: dict[str, str] = {}
+    _compress(FakeSummarizer(), messages, cache)
+    before = set(openai_client._select_verbatim(messages, BUDGET_TOKENS))
+
+    appended = _messages(3400)
+    after = set(openai_client._select_verbatim(appended, BUDGET_TOKENS))
+    assert len((before ^ after) & set(range(3000))) > 10
+    client = FakeSummarizer()
+    _compress(client, appended, cache)
+
+    chunks = openai_client._summary_chunks(appended, after)
+    # Only the new tail and the chunks whose own verbatim rows changed are summarized again; the shifted
+    # selection elsewhere in the history must not move every later boundary.
+    assert client.chunk_calls < len(chunks) // 2
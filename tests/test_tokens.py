@@ -0,0 +1,50 @@
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from app.services.llm import openai_client
+from app.services.llm.tokens import clip_to_tokens, estimate_json_tokens, estimate_tokens
+
+
+def _messages(texts: list[str]) -> list[dict]:
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [{"ts": start + timedelta(minutes=idx), "sender": "A" if idx % 2 else "B", "text": text} for idx, text in enumerate(texts)]
+
+
+def test_estimates_track_typical_bpe_counts():
+    # Reference counts from a cl100k tokenizer.
+    assert 10 <= estimate_tokens("Hey, are we still on for dinner tomorrow night?") <= 13
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("internationalization") >= 3
+    assert estimate_tokens("你好世界") >= 4
+    clipped = clip_to_tokens("word " * 500, 40)
+    assert estimate_tokens(clipped) <= 40 and len(clipped) > 100
+
+
+def test_verbatim_selection_fits_the_token_budget():
+    short = openai_client._select_verbatim(_messages(["ok"] * 2000), 4000)
+    long = openai_client._select_verbatim(_messages(["this is a much longer message " * 20] * 2000), 4000)
+    assert len(short) > 3 * len(long)
+    for selected, texts in ((short, ["ok"] * 2000), (long, ["this is a much longer message " * 20] * 2000)):
+        payload = openai_client._build_analysis_payload(_messages(texts), selected, None)
+        assert estimate_json_tokens(payload["messages"]) <= 4000
+    assert short[-1] == 1999
+
+
+def test_prompt_token_estimates_are_logged_with_actual_usage(caplog):
+    completion = SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps({"summary": "s"})))],
+        usage=SimpleNamespace(prompt_tokens=42),
+    )
+
+    async def create(**kwargs):
+        return completion
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    with caplog.at_level(logging.INFO, logger="app.services.llm.openai_client"):
+        asyncio.run(openai_client._summarize_chunk(client, "gpt-4o-mini", json.dumps({"messages": []})))
+    record = next(r for r in caplog.records if r.getMessage() == "llm_prompt_tokens")
+    assert record.actual_prompt_tokens == 42
+    assert record.estimated_prompt_tokens > 0
@@ -0,0 +1,68 @@
+from app.services.analysis.verification import QuoteIndex, verify_report_evidence
+
+MESSAGES = [
+    {"id": "m1", "text": "I miss you so much, can we talk tonight?"},
+    {"id": "m2", "text": "maybe later, busy"},
+    {"id": "m3", "text": "ok"},
+]
+
+
+def _report(*excerpts: str) -> dict:
+    return {
+        "signals": [{"name": "Warm-cold cycles", "evidence": [{"excerpt": text, "sender": "A"} for text in excerpts]}],
+        "timeline": [{"message": "Maybe later,  busy"}],
+    }
+
+
+def test_quote_index_matches_normalized_and_elided_quotes():
+    index = QuoteIndex(MESSAGES)
+    assert index.find("can we talk") == 0
+    assert index.find('"I MISS YOU   so much"') == 0
+    assert index.find("I miss you... talk tonight") == 0
+    assert index.find("ok") == 2
+    assert index.find("I miss you... busy") is None
+    assert index.find("we should break up") is None
+
+
+def test_unverified_evidence_is_dropped_or_flagged():
+    dropped = verify_report_evidence(_report("can we talk tonight", "you never listen"), MESSAGES, mode="drop")
+    evidence = dropped["signals"][0]["evidence"]
+    assert [(item["excerpt"], item["message_id"], item["verified"]) for item in evidence] == [("can we talk tonight", "m1", True)]
+    assert dropped["timeline"][0]["message_id"] == "m2"
+
+    flagged = verify_report_evidence(_report("can we talk tonight", "you never listen"), MESSAGES, mode="flag")
+    assert [item["verified"] for item in flagged["signals"][0]["evidence"]] == [True, False]
+
+
+def test_lookups_confirm_only_a_few_candidates_on_large_uploads():
+    messages = [{"id": str(idx), "text": f"message number {idx} about dinner plans and weekend {idx % 97}"} for idx in range(50_000)]
+    index = QuoteIndex(messages)
+    candidate_sizes = []
+    candidates = index._candidates
+
+    def recording_candidates(fragment):
+        found = candidates(fragment)
+        candidate_sizes.append(len(found))
+        return found
+
+    index._candidates = recording_candidates
+    for idx in range(0, 50_000, 100):
+        assert index.find(f"number {idx} about dinner") == idx
+    # Posting-list intersection leaves a couple of substring checks per lookup, not a scan of 50k texts.
+    assert max(candidate_sizes) <= 2
+
+
+def test_repeated_quotes_resolve_to_the_quoted_message():
+    messages = [
+        {"id": "m1", "text": "I miss you", "ts": "2025-12-01T10:00:00+00:00", "sender": "A"},
+        {"id": "m2", "text": "ok", "ts": "2025-12-01T11:00:00+00:00", "sender": "B"},
+        {"id": "m3", "text": "I miss you", "ts": "2025-12-03T22:15:00+00:00", "sender": "A"},
+        {"id": "m4", "text": "I miss you", "ts": "2025-12-03T22:16:00+00:00", "sender": "B"},
+    ]
+    report = {
+        "signals": [{"name": "x", "evidence": [{"excerpt": "I miss you", "timestamp": "2025-12-03T22:15:00Z", "sender": "B"}]}],
+        "timeline": [{"message": "I miss you", "timestamp": "2025-12-03T22:14:00Z"}],
+    }
+    verified = verify_report_evidence(report, messages)
+    assert verified["signals"][0]["evidence"][0]["message_id"] == "m4"
+    assert verified["timeline"][0]["message_id"] == "m3"